@@ -5,7 +5,7 @@ import pymysql
 import pandas as pd
 import re
 from qr_handler import QRHandler
-from utils import Config, Constants, get_db_connection, load_training_data, format_program_dates, process_eor_excel, process_training_excel
+from utils import Config, Constants, get_db_connection, init_request_db, load_training_data, format_program_dates, process_eor_excel, process_training_excel
 from attendance_app import attendance_bp
 from target import target_bp
 from user_technician import user_tech_bp
@@ -18,6 +18,10 @@ from cd_data_store import bp as cd_data_bp
 from factory_data import factory_bp
 from user_routes import user_bp
 from user_auth import user_auth
+from db_metrics import metrics_bp
+from report_jobs import report_jobs_bp
+from db_migrations import check_schema
+from data_cache import bump_data_version
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -35,6 +39,8 @@ app.register_blueprint(cd_data_bp)
 app.register_blueprint(ciro_bp, url_prefix='/ciro')
 
 app.register_blueprint(user_auth, url_prefix='/auth')
+app.register_blueprint(metrics_bp)
+app.register_blueprint(report_jobs_bp)
 
 # Set configuration from utils
 app.config.update({
@@ -47,6 +53,12 @@ app.config.update({
     'EOR_FILENAME': Config.EOR_FILENAME
 })
 
+# Release request-scoped database connections at the end of each request
+init_request_db(app)
+
+# Warn about missing indexes on the hot tables (apply with `python db_migrations.py`)
+check_schema()
+
 # Initialize QR Handler
 qr_handler = QRHandler(app)
 attendance_bp.qr_handler = qr_handler
@@ -78,7 +90,7 @@ def require_login():
     - Endpoint is feedback.clubbed_form (public access)
     Otherwise, redirect to login.
     """
-    allowed_routes = ['user_auth.login', 'user_auth.logout', 'static', 'home', 'feedback.clubbed_form', 'feedback.feedback_form', 'feedback.submit_feedback', 'feedback.submit_clubbed_feedback', 'feedback.verify_employee', 'feedback.success']
+    allowed_routes = ['user_auth.login', 'user_auth.logout', 'static', 'home', 'feedback.clubbed_form', 'feedback.feedback_form', 'feedback.submit_feedback', 'feedback.submit_clubbed_feedback', 'feedback.verify_employee', 'feedback.success', 'db_metrics.metrics']
 
     # Allow all attendance blueprint routes
     if request.endpoint and request.endpoint.startswith('attendance.'):
@@ -297,6 +309,7 @@ def schedule_program():
                 """, (qr_filename, program_id))
                 
                 conn.commit()
+                bump_data_version('training_programs')
                 flash('Training program scheduled successfully with attendance QR code!', 'success')
                 return redirect(url_for('view_program', program_id=program_id))
                 
@@ -410,6 +423,7 @@ def toggle_qr_status(program_id):
                 WHERE id = %s
             """, (new_status, program_id))
             conn.commit()
+            bump_data_version('training_programs')
             
             status_msg = "activated" if new_status else "deactivated"
             flash(f'QR code {status_msg} successfully!', 'success')
@@ -667,6 +681,7 @@ def delete_program(program_id):
             # Delete from database
             cursor.execute("DELETE FROM training_programs WHERE id = %s", (program_id,))
             conn.commit()
+            bump_data_version('training_programs')
             
         flash('Training program deleted successfully', 'success')
     except Exception as e:
@@ -1039,6 +1054,7 @@ def edit_program(program_id):
                 """, (qr_filename, program_id))
                 
                 conn.commit()
+                bump_data_version('training_programs')
                 flash('Training program updated successfully!', 'success')
                 return redirect(url_for('view_program', program_id=program_id))
                 
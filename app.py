@@ -11,9 +11,14 @@ from factory_data import factory_bp
 from user_routes import user_bp
 from user_auth import user_auth
 from view_master_data import view_bp
+from utils import init_request_db
+from db_metrics import metrics_bp
+from db_migrations import check_schema
 
 app = Flask(__name__)
 app.secret_key = 'your_secret_key_here'
+init_request_db(app)
+check_schema()
 
 # Register all blueprints
 app.register_blueprint(admin_bp, url_prefix='/admin')
@@ -28,6 +33,7 @@ app.register_blueprint(user_tech_bp, url_prefix='/user_tech')
 app.register_blueprint(cd_data_bp)
 app.register_blueprint(user_auth)
 app.register_blueprint(view_bp)
+app.register_blueprint(metrics_bp)
 
 @app.route('/')
 def home():
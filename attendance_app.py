@@ -5,6 +5,8 @@ import os
 import re
 import pymysql
 from utils import Config, Constants, get_db_connection, load_eor_data
+from data_cache import bump_data_version
+from rollups import add_to_rollup, add_to_employee_hours
 
 attendance_bp = Blueprint('attendance', __name__, 
                          template_folder='templates',
@@ -170,8 +172,10 @@ def calculate_learning_hours(program_hours, day1, day2, day3):
 
 def get_program_by_qr(qr_code):
     """Get program details by QR code"""
+    conn = None
     try:
-        with get_db_connection().cursor(pymysql.cursors.DictCursor) as cursor:
+        conn = get_db_connection()
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
             cursor.execute("""
                 SELECT 
                     id AS program_id, training_name, pmo_training_category, pl_category,
@@ -214,11 +218,16 @@ def get_program_by_qr(qr_code):
     except Exception as e:
         current_app.logger.error(f"Error fetching program by QR: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def get_program_by_id(program_id):
     """Get program details by program ID"""
+    conn = None
     try:
-        with get_db_connection().cursor(pymysql.cursors.DictCursor) as cursor:
+        conn = get_db_connection()
+        with conn.cursor(pymysql.cursors.DictCursor) as cursor:
             cursor.execute("""
                 SELECT 
                     id AS program_id, training_name, pmo_training_category, pl_category,
@@ -261,6 +270,9 @@ def get_program_by_id(program_id):
     except Exception as e:
         current_app.logger.error(f"Error fetching program by ID {program_id}: {e}")
         return None
+    finally:
+        if conn:
+            conn.close()
 
 def save_attendance(data):
     """Save attendance record to database"""
@@ -322,7 +334,15 @@ def save_attendance(data):
             start_time = convert_to_time(data.get('start_time'))
             end_time = convert_to_time(data.get('end_time'))
             
+            # The attendance row, its dashboard rollup cell and the employee's hours ledger change together
+            conn.begin()
             if existing:
+                # Lock the record and take its current state out of its rollup cell and ledger row
+                cursor.execute("SELECT id FROM master_data WHERE id = %s FOR UPDATE", (existing['id'],))
+                add_to_rollup(cursor, 'master_data', "id = %s", (existing['id'],), sign=-1)
+                add_to_employee_hours(cursor, 'master_data', "id = %s", (existing['id'],), sign=-1)
+                row_id = existing['id']
+
                 # Update existing record
                 cursor.execute(f"""
                     UPDATE master_data
@@ -385,8 +405,12 @@ def save_attendance(data):
                     clean_value(data.get('cordi_name')),
                     clean_value(data.get('email'))
                 ))
+                row_id = cursor.lastrowid
             
+            add_to_rollup(cursor, 'master_data', "id = %s", (row_id,))
+            add_to_employee_hours(cursor, 'master_data', "id = %s", (row_id,))
             conn.commit()
+            bump_data_version('master_data')
             return {'success': True, 'learning_hours': calculated_hours}, True
             
     except Exception as e:
@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify, render_template, flash, redirect, url_for
 import pandas as pd
 from utils import get_db_connection
+from data_cache import bump_data_version
+from rollups import insert_master_data
 from datetime import datetime
 
 bp = Blueprint('cd_data_store', __name__, url_prefix='/cd_data_store')
@@ -487,8 +489,15 @@ def insert_data(table_name, data):
                 """
 
         values_list = [[row.get(col) for col in insert_columns] for row in data]
-        cursor.executemany(sql, values_list)
+        if table_name == 'master_data':
+            # Uploaded rows, their dashboard rollup cells and the hours ledger of their
+            # employees change together
+            conn.begin()
+            insert_master_data(cursor, insert_columns, values_list)
+        else:
+            cursor.executemany(sql, values_list)
         conn.commit()
+        bump_data_version(table_name)
         return True, f"Processed {len(data)} records into {table_name}"
     except Exception as e:
         conn.rollback()
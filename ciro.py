@@ -5,6 +5,9 @@ import pandas as pd
 import numpy as np
 from utils import get_db_connection
 import pymysql.cursors
+from ciro_reports import build_summary_report
+from exports import WIDTH_SAMPLE_ROWS, XLSX_MIMETYPE, file_response
+from http_cache import conditional_on
 
 # Create the blueprint with explicit name and url_prefix
 ciro_bp = Blueprint('ciro', __name__, 
@@ -547,12 +550,16 @@ def training_detail(program_title, program_date):
                           all_programs=all_programs)
 
 def safe_max_len(series, col_name):
-    """Safely calculate the maximum length of values in a series for column width adjustment"""
+    """Safely calculate the maximum length of values in a series for column width adjustment.
+
+    Only the first WIDTH_SAMPLE_ROWS values are measured, so wide exports size their columns
+    in constant time.
+    """
     if series.empty:
         return len(col_name)
     
     # Convert to string and handle NaN values
-    str_series = series.astype(str)
+    str_series = series.head(WIDTH_SAMPLE_ROWS).astype(str)
     # Replace 'nan' strings with empty strings to avoid counting them
     str_series = str_series.replace('nan', '')
     
@@ -566,6 +573,7 @@ def safe_max_len(series, col_name):
     return max(len_series.max(), len(col_name))
 
 @ciro_bp.route('/export/summary')
+@conditional_on('feedback_responses')
 def export_summary():
     conn = None
     cursor = None
@@ -760,6 +768,7 @@ def export_summary():
             conn.close()
 
 @ciro_bp.route('/export/detail/<program_title>/<program_date>')
+@conditional_on('feedback_responses')
 def export_detail(program_title, program_date):
     conn = None
     cursor = None
@@ -946,6 +955,7 @@ def export_detail(program_title, program_date):
             conn.close()
 
 @ciro_bp.route('/export/individual/<int:response_id>')
+@conditional_on('feedback_responses')
 def export_individual(response_id):
     conn = None
     cursor = None
@@ -1131,313 +1141,16 @@ def export_individual(response_id):
             conn.close()
 
 @ciro_bp.route('/export/summary-report/<program_title>/<program_date>')
+@conditional_on('feedback_responses')
 def export_summary_report(program_title, program_date):
-    conn = None
-    cursor = None
+    """Summary, trainer, section and text feedback sheets for one training session"""
     try:
-        conn = get_db_connection()
-        # Disable ONLY_FULL_GROUP_BY mode
-        with conn.cursor() as cursor:
-            cursor.execute("SET SESSION sql_mode = (SELECT REPLACE(@@sql_mode, 'ONLY_FULL_GROUP_BY', ''))")
-        
-        conn.begin()
-        cursor = conn.cursor(pymysql.cursors.DictCursor)
-        
-        # Create Excel file with multiple sheets
-        output = BytesIO()
-        with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-            # Sheet 1: Summary
-            summary_query = """
-                SELECT 
-                    program_title,
-                    program_date,
-                    pmo_training_category,
-                    pl_category,
-                    brsr_sq_123_category,
-                    COUNT(DISTINCT id) as response_count,
-                    COALESCE(AVG((sec1_q1 + sec1_q2 + sec2_q1 + sec2_q2 + sec2_q3 + sec3_q1 + 
-                        sec5_q1 + sec5_q2 + sec6_q1 + sec6_q2 + sec7_q1 + sec7_q2)/12.0), 0) as csi,
-                    COALESCE((
-                        SELECT AVG(avg_score)
-                        FROM (
-                            SELECT (AVG(trainer1_q1) + AVG(trainer1_q2) + AVG(trainer1_q3) + AVG(trainer1_q4))/4 as avg_score
-                                FROM feedback_responses 
-                                WHERE program_title = fr.program_title 
-                                AND program_date = fr.program_date
-                                AND trainer1_name IS NOT NULL
-                            UNION ALL
-                            SELECT (AVG(trainer2_q1) + AVG(trainer2_q2) + AVG(trainer2_q3) + AVG(trainer2_q4))/4 as avg_score
-                                FROM feedback_responses 
-                                WHERE program_title = fr.program_title 
-                                AND program_date = fr.program_date
-                                AND trainer2_name IS NOT NULL
-                            UNION ALL
-                            SELECT (AVG(trainer3_q1) + AVG(trainer3_q2) + AVG(trainer3_q3) + AVG(trainer3_q4))/4 as avg_score
-                                FROM feedback_responses 
-                                WHERE program_title = fr.program_title 
-                                AND program_date = fr.program_date
-                                AND trainer3_name IS NOT NULL
-                            UNION ALL
-                            SELECT (AVG(trainer4_q1) + AVG(trainer4_q2) + AVG(trainer4_q3) + AVG(trainer4_q4))/4 as avg_score
-                                FROM feedback_responses 
-                                WHERE program_title = fr.program_title 
-                                AND program_date = fr.program_date
-                                AND trainer4_name IS NOT NULL
-                        ) as trainer_avgs
-                    ), 0) as tfi,
-                    COALESCE((COALESCE(AVG((sec1_q1 + sec1_q2 + sec2_q1 + sec2_q2 + sec2_q3 + sec3_q1 + 
-                        sec5_q1 + sec5_q2 + sec6_q1 + sec6_q2 + sec7_q1 + sec7_q2)/12.0), 0) + 
-                    COALESCE((
-                        SELECT AVG(avg_score)
-                        FROM (
-                            SELECT (AVG(trainer1_q1) + AVG(trainer1_q2) + AVG(trainer1_q3) + AVG(trainer1_q4))/4 as avg_score
-                                FROM feedback_responses 
-                                WHERE program_title = fr.program_title 
-                                AND program_date = fr.program_date
-                                AND trainer1_name IS NOT NULL
-                            UNION ALL
-                            SELECT (AVG(trainer2_q1) + AVG(trainer2_q2) + AVG(trainer2_q3) + AVG(trainer2_q4))/4 as avg_score
-                                FROM feedback_responses 
-                                WHERE program_title = fr.program_title 
-                                AND program_date = fr.program_date
-                                AND trainer2_name IS NOT NULL
-                            UNION ALL
-                            SELECT (AVG(trainer3_q1) + AVG(trainer3_q2) + AVG(trainer3_q3) + AVG(trainer3_q4))/4 as avg_score
-                                FROM feedback_responses 
-                                WHERE program_title = fr.program_title 
-                                AND program_date = fr.program_date
-                                AND trainer3_name IS NOT NULL
-                            UNION ALL
-                            SELECT (AVG(trainer4_q1) + AVG(trainer4_q2) + AVG(trainer4_q3) + AVG(trainer4_q4))/4 as avg_score
-                                FROM feedback_responses 
-                                WHERE program_title = fr.program_title 
-                                AND program_date = fr.program_date
-                                AND trainer4_name IS NOT NULL
-                        ) as trainer_avgs
-                    ), 0)) / 2.0, 0) as avg_score,
-                    AVG(sec1_q1) as sec1_q1_avg,
-                    AVG(sec1_q2) as sec1_q2_avg,
-                    AVG(sec2_q1) as sec2_q1_avg,
-                    AVG(sec2_q2) as sec2_q2_avg,
-                    AVG(sec2_q3) as sec2_q3_avg,
-                    AVG(sec3_q1) as sec3_q1_avg,
-                    AVG(sec5_q1) as sec5_q1_avg,
-                    AVG(sec5_q2) as sec5_q2_avg,
-                    AVG(sec6_q1) as sec6_q1_avg,
-                    AVG(sec6_q2) as sec6_q2_avg,
-                    AVG(sec7_q1) as sec7_q1_avg,
-                    AVG(sec7_q2) as sec7_q2_avg
-                FROM feedback_responses fr
-                WHERE program_title = %s AND program_date = %s
-                GROUP BY program_title, program_date, pmo_training_category, pl_category, brsr_sq_123_category
-            """
-            
-            # Prepare arguments - we need 18 arguments (9 pairs of program_title, program_date)
-            args = (program_title, program_date, program_title, program_date, program_title, program_date, 
-                    program_title, program_date, program_title, program_date, program_title, program_date,
-                    program_title, program_date, program_title, program_date, program_title, program_date)
-            
-            cursor.execute(summary_query, args)
-            summary_data = cursor.fetchall()
-            summary_df = pd.DataFrame(summary_data)
-            
-            if summary_df.empty:
-                flash("No summary data found for this training session", "warning")
-                return redirect(url_for('ciro.dashboard'))
-            
-            # Format dates in DataFrame - handle None values
-            summary_df['program_date'] = summary_df['program_date'].apply(lambda x: x.strftime('%d-%m-%Y') if pd.notna(x) else "N/A")
-            
-            # Rename columns in summary sheet
-            summary_df = summary_df.rename(columns={
-                'program_title': 'Training Name',
-                'program_date': 'Program Date',
-                'pmo_training_category': 'PMO Training Category',
-                'pl_category': 'PL Category',
-                'brsr_sq_123_category': 'BRSR SQ 123 Category',
-                'response_count': 'Response Count',
-                'csi': 'CSI',
-                'tfi': 'TFI',
-                'avg_score': 'Average Score'
-            })
-            
-            summary_df.to_excel(writer, sheet_name='Summary', index=False)
-            
-            # Get workbook and worksheet objects for summary sheet
-            workbook = writer.book
-            worksheet = writer.sheets['Summary']
-            
-            # Add header format
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'valign': 'top',
-                'fg_color': '#003366',
-                'font_color': 'white',
-                'border': 1
-            })
-            
-            # Write the column headers with the defined format
-            for col_num, value in enumerate(summary_df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Auto-adjust columns' width using safe function
-            for i, col in enumerate(summary_df.columns):
-                max_len = safe_max_len(summary_df[col], col)
-                worksheet.set_column(i, i, max_len + 2)
-            
-            # Sheet 2: Trainer Feedback
-            trainer_query = """
-                SELECT 
-                    trainer_name,
-                    AVG(q1) as knowledge_avg,
-                    AVG(q2) as presentation_avg,
-                    AVG(q3) as query_handling_avg,
-                    AVG(q4) as overall_avg,
-                    COUNT(*) as response_count
-                FROM (
-                    SELECT trainer1_name as trainer_name, trainer1_q1 as q1, trainer1_q2 as q2, trainer1_q3 as q3, trainer1_q4 as q4
-                    FROM feedback_responses
-                    WHERE program_title = %s AND program_date = %s AND trainer1_name IS NOT NULL
-                    
-                    UNION ALL
-                    
-                    SELECT trainer2_name as trainer_name, trainer2_q1 as q1, trainer2_q2 as q2, trainer2_q3 as q3, trainer2_q4 as q4
-                    FROM feedback_responses
-                    WHERE program_title = %s AND program_date = %s AND trainer2_name IS NOT NULL
-                    
-                    UNION ALL
-                    
-                    SELECT trainer3_name as trainer_name, trainer3_q1 as q1, trainer3_q2 as q2, trainer3_q3 as q3, trainer3_q4 as q4
-                    FROM feedback_responses
-                    WHERE program_title = %s AND program_date = %s AND trainer3_name IS NOT NULL
-                    
-                    UNION ALL
-                    
-                    SELECT trainer4_name as trainer_name, trainer4_q1 as q1, trainer4_q2 as q2, trainer4_q3 as q3, trainer4_q4 as q4
-                    FROM feedback_responses
-                    WHERE program_title = %s AND program_date = %s AND trainer4_name IS NOT NULL
-                ) as all_trainers
-                GROUP BY trainer_name
-            """
-            
-            trainer_args = (program_title, program_date, program_title, program_date, 
-                            program_title, program_date, program_title, program_date)
-            cursor.execute(trainer_query, trainer_args)
-            trainer_data = cursor.fetchall()
-            trainer_df = pd.DataFrame(trainer_data)
-            
-            # Rename columns in trainer feedback sheet
-            trainer_df = trainer_df.rename(columns={
-                'trainer_name': 'Trainer Name',
-                'knowledge_avg': 'Knowledge Average',
-                'presentation_avg': 'Presentation Average',
-                'query_handling_avg': 'Query Handling Average',
-                'overall_avg': 'Overall Average',
-                'response_count': 'Response Count'
-            })
-            
-            trainer_df.to_excel(writer, sheet_name='Trainer Feedback', index=False)
-            
-            # Get worksheet for trainer feedback
-            worksheet = writer.sheets['Trainer Feedback']
-            
-            # Write the column headers with the defined format
-            for col_num, value in enumerate(trainer_df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Auto-adjust columns' width using safe function
-            for i, col in enumerate(trainer_df.columns):
-                max_len = safe_max_len(trainer_df[col], col)
-                worksheet.set_column(i, i, max_len + 2)
-            
-            # Sheet 3: Section Averages
-            if not summary_df.empty:
-                section_df = pd.DataFrame({
-                    'Section': [
-                        'Section 1: प्रशिक्षणार्थ्याची पूर्वतयारी (Participant Preparation)',
-                        'Section 2: कार्यक्रमात समाविष्ट करण्यात आलेली माहिती (Program Content)',
-                        'Section 3: कामामध्ये वापर (Use in Work)',
-                        'Section 5: कार्यक्रमाचे संयोजन व इतर व्यवस्था (Program Organization)',
-                        'Section 6: कार्यक्रमा बाबत (Program Details)',
-                        'Section 7: कार्यक्रमाचे सर्वसाधारण मूल्यमापन (Overall Evaluation)'
-                    ],
-                    'Average Score': [
-                        (summary_df.iloc[0]['sec1_q1_avg'] + summary_df.iloc[0]['sec1_q2_avg'])/2,
-                        (summary_df.iloc[0]['sec2_q1_avg'] + summary_df.iloc[0]['sec2_q2_avg'] + summary_df.iloc[0]['sec2_q3_avg'])/3,
-                        summary_df.iloc[0]['sec3_q1_avg'],
-                        (summary_df.iloc[0]['sec5_q1_avg'] + summary_df.iloc[0]['sec5_q2_avg'])/2,
-                        (summary_df.iloc[0]['sec6_q1_avg'] + summary_df.iloc[0]['sec6_q2_avg'])/2,
-                        (summary_df.iloc[0]['sec7_q1_avg'] + summary_df.iloc[0]['sec7_q2_avg'])/2
-                    ]
-                })
-                
-                section_df.to_excel(writer, sheet_name='Section Averages', index=False)
-                
-                # Get worksheet for section averages
-                worksheet = writer.sheets['Section Averages']
-                
-                # Write the column headers with the defined format
-                for col_num, value in enumerate(section_df.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-                
-                # Auto-adjust columns' width using safe function
-                for i, col in enumerate(section_df.columns):
-                    max_len = safe_max_len(section_df[col], col)
-                    worksheet.set_column(i, i, max_len + 2)
-            
-            # Sheet 4: Text Feedback
-            text_query = """
-                SELECT 
-                    participants_name as Participants_Name,
-                    sec7_q3_text as Most_Relevant_Topic,
-                    sec7_q4_text as Missing_Topics,
-                    suggestions as Suggestions
-                FROM feedback_responses
-                WHERE program_title = %s AND program_date = %s
-                AND (sec7_q3_text != '' OR sec7_q4_text != '' OR suggestions != '')
-                ORDER BY created_at ASC  -- Changed from DESC to ASC to show data in entry order
-            """
-            
-            cursor.execute(text_query, (program_title, program_date))
-            text_data = cursor.fetchall()
-            text_df = pd.DataFrame(text_data)
-            
-            # Format column names to capitalize first letter and remove underscores
-            text_df.columns = [col.replace('_', ' ').title() for col in text_df.columns]
-            
-            text_df.to_excel(writer, sheet_name='Text Feedback', index=False)
-            
-            # Get worksheet for text feedback
-            worksheet = writer.sheets['Text Feedback']
-            
-            # Write the column headers with the defined format
-            for col_num, value in enumerate(text_df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Auto-adjust columns' width using safe function
-            for i, col in enumerate(text_df.columns):
-                max_len = safe_max_len(text_df[col], col)
-                worksheet.set_column(i, i, max_len + 2)
-        
-        conn.commit()
-        output.seek(0)
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'CIRO_Summary_Report_{program_title}_{program_date}.xlsx'
-        )
-    
+        path = build_summary_report(program_title, program_date)
+        if path is None:
+            flash("No summary data found for this training session", "warning")
+            return redirect(url_for('ciro.dashboard'))
+        return file_response(path, f'CIRO_Summary_Report_{program_title}_{program_date}.xlsx', XLSX_MIMETYPE)
     except Exception as e:
-        if conn:
-            conn.rollback()
         print(f"Error in export_summary_report: {str(e)}")
         flash(f"An error occurred during export: {str(e)}", "danger")
-        return redirect(url_for('ciro.dashboard'))
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
\ No newline at end of file
+        return redirect(url_for('ciro.dashboard'))
\ No newline at end of file
@@ -0,0 +1,243 @@
+"""CIRO summary report pack for one training session.
+
+The session and trainer aggregates are computed once, in two grouped queries, instead of the
+per-trainer correlated AVG subqueries the summary sheet used to repeat for every group:
+
+- session_aggregates(): response counts, CSI and question averages per category group
+- trainer_aggregates(): sums and counts per trainer slot and name, from which the Trainer
+  Feedback sheet (per name) and TFI (mean of the slot averages) are both derived
+
+Each sheet is written with xlsxwriter in constant_memory mode, so rows are flushed to disk as
+they are written, and columns are sized from the first WIDTH_SAMPLE_ROWS rows only.
+"""
+import os
+import tempfile
+from itertools import chain, islice
+
+import xlsxwriter
+
+from exports import WIDTH_SAMPLE_ROWS, MAX_COLUMN_WIDTH, stream_query
+from utils import get_db_connection
+
+CSI_QUESTIONS = ('sec1_q1', 'sec1_q2', 'sec2_q1', 'sec2_q2', 'sec2_q3', 'sec3_q1',
+                 'sec5_q1', 'sec5_q2', 'sec6_q1', 'sec6_q2', 'sec7_q1', 'sec7_q2')
+TRAINER_SLOTS = (1, 2, 3, 4)
+TRAINER_QUESTIONS = ('q1', 'q2', 'q3', 'q4')
+
+HEADER_FORMAT = {
+    'bold': True,
+    'text_wrap': True,
+    'valign': 'top',
+    'fg_color': '#003366',
+    'font_color': 'white',
+    'border': 1
+}
+
+SUMMARY_HEADINGS = {
+    'program_title': 'Training Name',
+    'program_date': 'Program Date',
+    'pmo_training_category': 'PMO Training Category',
+    'pl_category': 'PL Category',
+    'brsr_sq_123_category': 'BRSR SQ 123 Category',
+    'response_count': 'Response Count',
+    'csi': 'CSI',
+    'tfi': 'TFI',
+    'avg_score': 'Average Score',
+    **{f"{question}_avg": f"{question}_avg" for question in CSI_QUESTIONS}
+}
+
+TRAINER_HEADINGS = {
+    'trainer_name': 'Trainer Name',
+    'knowledge_avg': 'Knowledge Average',
+    'presentation_avg': 'Presentation Average',
+    'query_handling_avg': 'Query Handling Average',
+    'overall_avg': 'Overall Average',
+    'response_count': 'Response Count'
+}
+
+# Section heading: questions averaged for it
+SECTIONS = {
+    'Section 1: प्रशिक्षणार्थ्याची पूर्वतयारी (Participant Preparation)': ('sec1_q1', 'sec1_q2'),
+    'Section 2: कार्यक्रमात समाविष्ट करण्यात आलेली माहिती (Program Content)': ('sec2_q1', 'sec2_q2', 'sec2_q3'),
+    'Section 3: कामामध्ये वापर (Use in Work)': ('sec3_q1',),
+    'Section 5: कार्यक्रमाचे संयोजन व इतर व्यवस्था (Program Organization)': ('sec5_q1', 'sec5_q2'),
+    'Section 6: कार्यक्रमा बाबत (Program Details)': ('sec6_q1', 'sec6_q2'),
+    'Section 7: कार्यक्रमाचे सर्वसाधारण मूल्यमापन (Overall Evaluation)': ('sec7_q1', 'sec7_q2')
+}
+
+SECTION_HEADINGS = {'section': 'Section', 'average': 'Average Score'}
+
+TEXT_HEADINGS = {
+    'participants_name': 'Participants Name',
+    'sec7_q3_text': 'Most Relevant Topic',
+    'sec7_q4_text': 'Missing Topics',
+    'suggestions': 'Suggestions'
+}
+
+def _number(value):
+    return None if value is None else float(value)
+
+def _mean(values):
+    values = [value for value in values if value is not None]
+    return sum(values) / len(values) if values else None
+
+def session_aggregates(cursor, program_title, program_date):
+    """Response count, CSI and per-question averages for each category group of a session"""
+    csi_sum = ' + '.join(CSI_QUESTIONS)
+    question_avgs = ',\n'.join(f"AVG({question}) as {question}_avg" for question in CSI_QUESTIONS)
+    cursor.execute(f"""
+        SELECT
+            program_title,
+            program_date,
+            pmo_training_category,
+            pl_category,
+            brsr_sq_123_category,
+            COUNT(DISTINCT id) as response_count,
+            AVG(({csi_sum})/12.0) as csi,
+            {question_avgs}
+        FROM feedback_responses
+        WHERE program_title = %s AND program_date = %s
+        GROUP BY program_title, program_date, pmo_training_category, pl_category, brsr_sq_123_category
+    """, (program_title, program_date))
+    return cursor.fetchall()
+
+def trainer_aggregates(cursor, program_title, program_date):
+    """Per trainer slot and name: rated responses and the sum and count of each question"""
+    slot_selects = ' UNION ALL '.join(
+        f"""SELECT {slot} as slot, trainer{slot}_name as trainer_name,
+                   {', '.join(f'trainer{slot}_{q} as {q}' for q in TRAINER_QUESTIONS)}
+            FROM feedback_responses
+            WHERE program_title = %s AND program_date = %s AND trainer{slot}_name IS NOT NULL"""
+        for slot in TRAINER_SLOTS
+    )
+    sums = ', '.join(f"SUM({q}) as {q}_sum, COUNT({q}) as {q}_count" for q in TRAINER_QUESTIONS)
+    cursor.execute(f"""
+        SELECT slot, trainer_name, COUNT(*) as response_count, {sums}
+        FROM ({slot_selects}) as all_trainers
+        GROUP BY slot, trainer_name
+    """, (program_title, program_date) * len(TRAINER_SLOTS))
+    return cursor.fetchall()
+
+def _question_averages(rows):
+    """AVG of each trainer question over `rows` of trainer_aggregates()"""
+    averages = []
+    for q in TRAINER_QUESTIONS:
+        count = sum(row[f"{q}_count"] for row in rows)
+        averages.append(float(sum(row[f"{q}_sum"] or 0 for row in rows)) / count if count else None)
+    return averages
+
+def trainer_feedback(trainer_rows):
+    """Trainer Feedback rows: the question averages of each trainer over all slots"""
+    by_name = {}
+    for row in trainer_rows:
+        by_name.setdefault(row['trainer_name'], []).append(row)
+    records = []
+    for name, rows in by_name.items():
+        knowledge, presentation, query_handling, overall = _question_averages(rows)
+        records.append({
+            'trainer_name': name,
+            'knowledge_avg': knowledge,
+            'presentation_avg': presentation,
+            'query_handling_avg': query_handling,
+            'overall_avg': overall,
+            'response_count': sum(row['response_count'] for row in rows)
+        })
+    return records
+
+def training_feedback_index(trainer_rows):
+    """TFI: the mean over trainer slots of each slot's average question score"""
+    slot_scores = []
+    for slot in TRAINER_SLOTS:
+        averages = _question_averages([row for row in trainer_rows if row['slot'] == slot])
+        # A slot scores only when every question has ratings, as in SQL where NULL + x is NULL
+        if all(average is not None for average in averages):
+            slot_scores.append(sum(averages) / len(averages))
+    return _mean(slot_scores)
+
+def summary_records(groups, tfi):
+    records = []
+    for group in groups:
+        csi = _number(group['csi']) or 0
+        record = dict(group)
+        record['program_date'] = group['program_date'].strftime('%d-%m-%Y') if group['program_date'] else "N/A"
+        record['csi'] = csi
+        record['tfi'] = tfi or 0
+        record['avg_score'] = (csi + (tfi or 0)) / 2.0
+        for question in CSI_QUESTIONS:
+            record[f"{question}_avg"] = _number(group[f"{question}_avg"])
+        records.append(record)
+    return records
+
+def section_records(group):
+    records = []
+    for section, questions in SECTIONS.items():
+        averages = [_number(group[f"{question}_avg"]) for question in questions]
+        average = None if None in averages else sum(averages) / len(averages)
+        records.append({'section': section, 'average': average})
+    return records
+
+def _column_widths(column_headings, sample):
+    widths = []
+    for key, header in column_headings.items():
+        lengths = [len(str(record.get(key))) for record in sample if record.get(key) is not None]
+        widths.append(min(max(lengths + [len(header)]) + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+def write_sheet(workbook, name, column_headings, records, header_format):
+    """Write `records` (any iterable of dicts) to a new sheet, sized from a bounded sample.
+
+    In constant_memory mode rows go to disk as they are written, so the column widths are set
+    first from the leading WIDTH_SAMPLE_ROWS records.
+    """
+    records = iter(records)
+    sample = list(islice(records, WIDTH_SAMPLE_ROWS))
+    worksheet = workbook.add_worksheet(name)
+    for col, width in enumerate(_column_widths(column_headings, sample)):
+        worksheet.set_column(col, col, width)
+    for col, header in enumerate(column_headings.values()):
+        worksheet.write(0, col, header, header_format)
+    keys = list(column_headings.keys())
+    for row_num, record in enumerate(chain(sample, records), 1):
+        for col, key in enumerate(keys):
+            value = record.get(key)
+            if value is not None:
+                worksheet.write(row_num, col, value)
+
+def build_summary_report(program_title, program_date):
+    """Write the CIRO summary pack of a session to a temporary xlsx file and return its path.
+
+    Returns None when the session has no feedback responses.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            groups = session_aggregates(cursor, program_title, program_date)
+            if not groups:
+                return None
+            trainer_rows = trainer_aggregates(cursor, program_title, program_date)
+    finally:
+        conn.close()
+
+    text_rows = stream_query("""
+        SELECT participants_name, sec7_q3_text, sec7_q4_text, suggestions
+        FROM feedback_responses
+        WHERE program_title = %s AND program_date = %s
+        AND (sec7_q3_text != '' OR sec7_q4_text != '' OR suggestions != '')
+        ORDER BY created_at ASC
+    """, (program_title, program_date))
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='ciro_')
+    os.close(fd)
+    try:
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+        header_format = workbook.add_format(HEADER_FORMAT)
+        write_sheet(workbook, 'Summary', SUMMARY_HEADINGS,
+                    summary_records(groups, training_feedback_index(trainer_rows)), header_format)
+        write_sheet(workbook, 'Trainer Feedback', TRAINER_HEADINGS, trainer_feedback(trainer_rows), header_format)
+        write_sheet(workbook, 'Section Averages', SECTION_HEADINGS, section_records(groups[0]), header_format)
+        write_sheet(workbook, 'Text Feedback', TEXT_HEADINGS, text_rows, header_format)
+        workbook.close()
+    except Exception:
+        os.remove(path)
+        raise
+    return path
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Per-table data versions. Writers call bump_data_version() after committing; cached results
+# are keyed by the versions of the tables they read, so a bump makes older entries unreachable
+# and they age out of the LRU. Versions are per process: other worker processes only see a
+# write once their entries expire (TTL).
+_versions = {}
+_changed_at = {}
+_versions_lock = threading.Lock()
+
+def bump_data_version(*tables):
+    """Record that the given tables changed"""
+    with _versions_lock:
+        now = time.time()
+        for table in tables:
+            _versions[table] = _versions.get(table, 0) + 1
+            _changed_at[table] = now
+
+def get_data_versions(tables):
+    with _versions_lock:
+        return tuple(_versions.get(table, 0) for table in tables)
+
+def get_data_changed_at(tables):
+    """Wall-clock time of the latest write this process has seen to any of `tables`, 0 if none"""
+    with _versions_lock:
+        return max((_changed_at.get(table, 0) for table in tables), default=0)
+
+def normalize_filters(filters):
+    """Hashable, order-independent form of a filter dict; empty values are dropped"""
+    return tuple(sorted((key, str(value)) for key, value in filters.items() if value not in (None, '')))
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+
+    def __init__(self, maxsize=128, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def get(self, key):
+        """Return (True, value) for a live entry, else (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_compute(self, key, tables, compute, cache_if=None):
+        """Cached value for `key` at the current versions of `tables`, computing it on a miss.
+
+        Results rejected by `cache_if` (e.g. partial results after a query error) are returned
+        but not stored. Concurrent misses for the same key wait for the first caller instead of
+        all recomputing; if that caller stores nothing, each waiter computes for itself.
+        """
+        key = (key, get_data_versions(tables))
+        hit, value = self.get(key)
+        if hit:
+            return value
+
+        with self._lock:
+            event = self._pending.get(key)
+            owner = event is None
+            if owner:
+                event = self._pending[key] = threading.Event()
+
+        if not owner:
+            event.wait(self.ttl)
+            hit, value = self.get(key)
+            return value if hit else compute()
+
+        try:
+            value = compute()
+            if cache_if is None or cache_if(value):
+                self.set(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+            event.set()
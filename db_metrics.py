@@ -0,0 +1,266 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Blueprint, Response, render_template, session, flash, redirect, url_for, request, g, has_request_context
+from pymysql.cursors import SSCursor
+
+metrics_bp = Blueprint('db_metrics', __name__)
+
+MAX_TRACKED_STATEMENTS = 500  # Distinct (endpoint, statement) pairs kept before lumping into <other>
+STATEMENT_TEXT_LIMIT = 400  # Characters of normalized SQL kept per statement
+
+_lock = threading.Lock()
+_local = threading.local()
+_endpoint_stats = {}
+_statement_stats = {}
+
+_WHITESPACE = re.compile(r'\s+')
+_NUMBER = re.compile(r'\b\d+\b')
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'")
+_PLACEHOLDER_LIST = re.compile(r'%s(?:\s*,\s*%s)+')
+
+def _new_endpoint_entry():
+    return {'requests': 0, 'queries': 0, 'query_seconds': 0.0, 'rows': 0, 'connections_opened': 0, 'max_queries_per_request': 0}
+
+def normalize_sql(sql):
+    """Collapse a statement into a stable key: literals, numbers and IN lists become placeholders"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    sql = _STRING.sub('?', str(sql))
+    sql = _NUMBER.sub('?', sql)
+    sql = _PLACEHOLDER_LIST.sub('%s, ...', sql)
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return sql[:STATEMENT_TEXT_LIMIT]
+
+def current_endpoint():
+    """Endpoint the running query is attributed to"""
+    label = getattr(_local, 'label', None)
+    if label:
+        return label
+    if has_request_context():
+        return request.endpoint or 'unknown'
+    return 'background'
+
+@contextmanager
+def metrics_label(name):
+    """Attribute queries run in this block (e.g. a worker thread or CLI job) to `name`"""
+    previous = getattr(_local, 'label', None)
+    _local.label = name
+    try:
+        yield
+    finally:
+        _local.label = previous
+
+def _request_counter():
+    if not has_request_context():
+        return None
+    counter = getattr(request, '_sql_query_count', None)
+    if counter is None:
+        counter = [0]
+        request._sql_query_count = counter
+    return counter
+
+def record_query(sql, seconds, rows):
+    endpoint = current_endpoint()
+    key = (endpoint, normalize_sql(sql))
+    counter = _request_counter()
+    if counter is not None:
+        counter[0] += 1
+    with _lock:
+        entry = _endpoint_stats.setdefault(endpoint, _new_endpoint_entry())
+        entry['queries'] += 1
+        entry['query_seconds'] += seconds
+        entry['rows'] += rows
+
+        stmt = _statement_stats.get(key)
+        if stmt is None:
+            if len(_statement_stats) >= MAX_TRACKED_STATEMENTS:
+                key = (endpoint, '<other>')
+                stmt = _statement_stats.get(key)
+            if stmt is None:
+                stmt = _statement_stats[key] = {'calls': 0, 'total_seconds': 0.0, 'max_seconds': 0.0, 'rows': 0}
+        stmt['calls'] += 1
+        stmt['total_seconds'] += seconds
+        stmt['max_seconds'] = max(stmt['max_seconds'], seconds)
+        stmt['rows'] += rows
+    return key
+
+def record_rows(key, rows):
+    """Add rows fetched later from an unbuffered cursor to the statement that produced them"""
+    with _lock:
+        stmt = _statement_stats.get(key)
+        if stmt is not None:
+            stmt['rows'] += rows
+        entry = _endpoint_stats.get(key[0])
+        if entry is not None:
+            entry['rows'] += rows
+
+def record_connection_opened():
+    endpoint = current_endpoint()
+    with _lock:
+        _endpoint_stats.setdefault(endpoint, _new_endpoint_entry())['connections_opened'] += 1
+
+def record_request_finished():
+    counter = _request_counter()
+    queries = counter[0] if counter else 0
+    endpoint = current_endpoint()
+    with _lock:
+        entry = _endpoint_stats.setdefault(endpoint, _new_endpoint_entry())
+        entry['requests'] += 1
+        entry['max_queries_per_request'] = max(entry['max_queries_per_request'], queries)
+
+def reset_metrics():
+    with _lock:
+        _endpoint_stats.clear()
+        _statement_stats.clear()
+
+def get_endpoint_stats():
+    with _lock:
+        return {endpoint: dict(entry) for endpoint, entry in _endpoint_stats.items()}
+
+def get_top_statements(limit=50, endpoint=None):
+    """Statements ranked by total time spent in them"""
+    with _lock:
+        items = [
+            dict(stmt, endpoint=key[0], sql=key[1])
+            for key, stmt in _statement_stats.items()
+            if endpoint is None or key[0] == endpoint
+        ]
+    for item in items:
+        item['avg_seconds'] = item['total_seconds'] / item['calls'] if item['calls'] else 0.0
+    items.sort(key=lambda item: item['total_seconds'], reverse=True)
+    return items[:limit]
+
+class InstrumentedCursor:
+    """Cursor proxy that times every statement and counts the rows it returns"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._unbuffered = isinstance(cursor, SSCursor)
+        self._last_key = None
+
+    def _timed(self, method, sql, *args):
+        start = time.perf_counter()
+        try:
+            return method(sql, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            rows = 0 if self._unbuffered else max(self._cursor.rowcount or 0, 0)
+            self._last_key = record_query(sql, elapsed, rows)
+
+    def execute(self, query, args=None):
+        return self._timed(self._cursor.execute, query, args)
+
+    def executemany(self, query, args):
+        return self._timed(self._cursor.executemany, query, args)
+
+    def callproc(self, procname, args=()):
+        return self._timed(self._cursor.callproc, procname, args)
+
+    def _fetched(self, rows):
+        if self._unbuffered and self._last_key is not None and rows:
+            record_rows(self._last_key, rows)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._fetched(1 if row is not None else 0)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_cursor', '_unbuffered', '_last_key'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+def instrument_cursor(cursor):
+    return InstrumentedCursor(cursor)
+
+@metrics_bp.teardown_app_request
+def _finish_request_metrics(exc=None):
+    # Dashboard widget workers run under copies of the request context; count the request once
+    if g.get('_fanout_worker'):
+        return
+    if request.endpoint and request.endpoint != 'static':
+        record_request_finished()
+
+def _prom_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+@metrics_bp.route('/metrics')
+def metrics():
+    """Prometheus text exposition of per-endpoint SQL counters and pool gauges"""
+    stats = get_endpoint_stats()
+    series = [
+        ('sql_endpoint_requests_total', 'counter', 'Requests served per endpoint', 'requests'),
+        ('sql_queries_total', 'counter', 'SQL statements executed per endpoint', 'queries'),
+        ('sql_query_seconds_total', 'counter', 'Time spent executing SQL per endpoint', 'query_seconds'),
+        ('sql_rows_total', 'counter', 'Rows returned or affected per endpoint', 'rows'),
+        ('sql_connections_opened_total', 'counter', 'New database connections opened per endpoint', 'connections_opened'),
+        ('sql_max_queries_per_request', 'gauge', 'Most SQL statements seen in a single request', 'max_queries_per_request'),
+    ]
+    lines = []
+    for name, kind, help_text, field in series:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for endpoint, entry in sorted(stats.items()):
+            lines.append(f'{name}{{endpoint="{_prom_label(endpoint)}"}} {entry[field]}')
+
+    from utils import get_db_pool
+    pool_stats = get_db_pool().stats()
+    lines.append('# HELP db_pool_connections Pooled database connections by state')
+    lines.append('# TYPE db_pool_connections gauge')
+    for state in ('open', 'idle', 'in_use', 'max_size'):
+        lines.append(f'db_pool_connections{{state="{state}"}} {pool_stats[state]}')
+
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+@metrics_bp.route('/admin/sql_metrics', methods=['GET', 'POST'])
+def sql_metrics():
+    """Admin page ranking endpoints and statements by database time"""
+    if not (session.get('logged_in') and session.get('role') == 'Admin'):
+        flash('Admin access required', 'error')
+        return redirect(url_for('user_auth.login'))
+
+    if request.method == 'POST':
+        reset_metrics()
+        flash('SQL metrics reset', 'success')
+        return redirect(url_for('db_metrics.sql_metrics'))
+
+    selected_endpoint = request.args.get('endpoint') or None
+    endpoints = sorted(get_endpoint_stats().items(), key=lambda item: item[1]['query_seconds'], reverse=True)
+    for _, entry in endpoints:
+        entry['avg_queries'] = entry['queries'] / entry['requests'] if entry['requests'] else 0
+        entry['avg_seconds'] = entry['query_seconds'] / entry['requests'] if entry['requests'] else 0
+
+    from utils import get_db_pool
+    return render_template(
+        'admin/sql_metrics.html',
+        endpoints=endpoints,
+        statements=get_top_statements(limit=100, endpoint=selected_endpoint),
+        selected_endpoint=selected_endpoint,
+        pool_stats=get_db_pool().stats()
+    )
@@ -0,0 +1,182 @@
+"""Declarative columns and indexes for the hot tables.
+
+Run `python db_migrations.py` to add anything missing, or `python db_migrations.py --check`
+to only report. The app calls check_schema() at startup and prints a warning per missing item.
+"""
+import sys
+
+from utils import Config, get_db_connection
+
+# (table, column, definition). Generated columns are maintained by MySQL on every write path
+# (attendance saves, CD uploads, manual edits), so no application code has to set them.
+COLUMNS = [
+    # April-March fiscal year of start_date, the fiscal-year dimension the summary tables in
+    # rollups.py are built on. The dashboard filters do not need it (they use a start_date
+    # range), so the app works before this has run. Adding a STORED column rebuilds the table once.
+    ('master_data', 'fiscal_year',
+     "SMALLINT GENERATED ALWAYS AS (YEAR(start_date) - IF(MONTH(start_date) < 4, 1, 0)) STORED"),
+]
+
+# (table, index name, columns). A column may carry a prefix length, e.g. 'training_name(100)';
+# TEXT/BLOB columns without one get TEXT_PREFIX_LENGTH automatically.
+INDEXES = [
+    # Dashboard filters: fiscal-year range on start_date, then factory / employee group
+    ('master_data', 'idx_master_start_factory_group', ('start_date', 'factory', 'employee_group')),
+    # Keyset pages of the default table view (employee group, newest id first; the fiscal-year
+    # range is checked on the rows read)
+    ('master_data', 'idx_master_group_id', ('employee_group', 'id')),
+    ('master_data', 'idx_master_per_no_training', ('per_no', 'training_name')),
+    ('master_data', 'idx_master_training_start', ('training_name', 'start_date')),
+    ('master_data', 'idx_master_program_per_no', ('program_id', 'per_no')),
+    # TNI joins and year/factory filters
+    ('tni_data', 'idx_tni_year_training_factory', ('year', 'training_name', 'factory')),
+    ('tni_data', 'idx_tni_per_no_year', ('per_no', 'year')),
+    # CIRO correlated subqueries look feedback rows up by program
+    ('feedback_responses', 'idx_feedback_program', ('program_title', 'program_date')),
+    ('eor_data', 'idx_eor_per_no', ('per_no',)),
+    ('eor_data', 'idx_eor_factory_per_no', ('factory', 'per_no')),
+    ('training_programs', 'idx_programs_qr_code_path', ('qr_code_path',)),
+    ('training_programs', 'idx_programs_start_date', ('start_date',)),
+]
+
+# (table, key column, command that builds it). Summary tables maintained by the application;
+# when one is missing the readers fall back to the source tables, which works but is slow. The
+# key column is the unique key writers upsert their deltas on.
+DERIVED_TABLES = [
+    ('master_data_rollup', 'cell_key', 'python rollups.py'),
+    ('employee_hours', 'cell_key', 'python rollups.py'),
+]
+
+TEXT_PREFIX_LENGTH = 191
+_TEXT_TYPES = {'tinytext', 'text', 'mediumtext', 'longtext', 'tinyblob', 'blob', 'mediumblob', 'longblob'}
+
+def _column_name(spec):
+    return spec.split('(', 1)[0].strip()
+
+def _existing_tables(cursor):
+    cursor.execute(
+        "SELECT table_name AS table_name FROM information_schema.tables WHERE table_schema = %s",
+        (Config.DB_NAME,)
+    )
+    return {row['table_name'] for row in cursor.fetchall()}
+
+def _column_types(cursor, table):
+    cursor.execute(
+        "SELECT column_name AS column_name, data_type AS data_type FROM information_schema.columns "
+        "WHERE table_schema = %s AND table_name = %s",
+        (Config.DB_NAME, table)
+    )
+    return {row['column_name']: row['data_type'].lower() for row in cursor.fetchall()}
+
+def find_missing_columns(cursor):
+    """Declared columns not yet present, as (table, column, definition)"""
+    tables = _existing_tables(cursor)
+    return [
+        (table, column, definition)
+        for table, column, definition in COLUMNS
+        if table in tables and column not in _column_types(cursor, table)
+    ]
+
+def _existing_indexes(cursor, table):
+    """Column lists of every index on `table`, in index order"""
+    cursor.execute(
+        "SELECT index_name AS index_name, column_name AS column_name FROM information_schema.statistics "
+        "WHERE table_schema = %s AND table_name = %s ORDER BY index_name, seq_in_index",
+        (Config.DB_NAME, table)
+    )
+    indexes = {}
+    for row in cursor.fetchall():
+        indexes.setdefault(row['index_name'], []).append(row['column_name'])
+    return indexes
+
+def _is_covered(columns, existing):
+    # An index whose leading columns match the declared ones serves the same queries
+    wanted = [_column_name(c) for c in columns]
+    return any(cols[:len(wanted)] == wanted for cols in existing.values())
+
+def find_missing_indexes(cursor):
+    """Declared indexes not yet present, as (table, name, columns); tables that do not exist are skipped"""
+    tables = _existing_tables(cursor)
+    missing = []
+    cache = {}
+    for table, name, columns in INDEXES:
+        if table not in tables:
+            continue
+        if table not in cache:
+            cache[table] = _existing_indexes(cursor, table)
+        if name not in cache[table] and not _is_covered(columns, cache[table]):
+            missing.append((table, name, columns))
+    return missing
+
+def _index_ddl(cursor, table, name, columns):
+    types = _column_types(cursor, table)
+    parts = []
+    for spec in columns:
+        column = _column_name(spec)
+        if column not in types:
+            raise ValueError(f"Column {table}.{column} does not exist")
+        if '(' not in spec and types[column] in _TEXT_TYPES:
+            spec = f"{column}({TEXT_PREFIX_LENGTH})"
+        parts.append(spec.replace(column, f"`{column}`", 1))
+    return f"ALTER TABLE `{table}` ADD INDEX `{name}` ({', '.join(parts)}), ALGORITHM=INPLACE, LOCK=NONE"
+
+def apply_migrations():
+    """Create every missing declared column and index; safe to run repeatedly. Returns the names created."""
+    created = []
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            # Columns first: some declared indexes cover generated columns
+            for table, column, definition in find_missing_columns(cursor):
+                try:
+                    print(f"Adding column {column} to {table}")
+                    cursor.execute(f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}")
+                    created.append(column)
+                except Exception as e:
+                    print(f"Error adding column {column} to {table}: {str(e)}")
+
+            for table, name, columns in find_missing_indexes(cursor):
+                try:
+                    ddl = _index_ddl(cursor, table, name, columns)
+                    print(f"Creating index {name} on {table}")
+                    cursor.execute(ddl)
+                    created.append(name)
+                except Exception as e:
+                    print(f"Error creating index {name} on {table}: {str(e)}")
+        return created
+    finally:
+        conn.close()
+
+def check_schema():
+    """Print a warning for each declared column or index that is missing; returns the missing list"""
+    try:
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                missing_columns = find_missing_columns(cursor)
+                missing = find_missing_indexes(cursor)
+                tables = _existing_tables(cursor)
+                keyed = {table for table, key_column, _ in DERIVED_TABLES
+                         if table in tables and key_column in _column_types(cursor, table)}
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"Error checking database indexes: {str(e)}")
+        return []
+
+    for table, column, _ in missing_columns:
+        print(f"Warning: missing column {column} on {table}; run `python db_migrations.py`")
+    for table, name, columns in missing:
+        print(f"Warning: missing index {name} on {table} ({', '.join(columns)}); run `python db_migrations.py`")
+    for table, key_column, command in DERIVED_TABLES:
+        if table not in tables:
+            print(f"Warning: missing summary table {table}; run `{command}`")
+        elif table not in keyed:
+            print(f"Warning: summary table {table} has no {key_column} key; run `{command}`")
+    return missing_columns + missing
+
+if __name__ == '__main__':
+    if '--check' in sys.argv:
+        sys.exit(1 if check_schema() else 0)
+    created = apply_migrations()
+    print(f"Created {len(created)} column(s)/index(es)" if created else "All declared columns and indexes present")
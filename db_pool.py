@@ -0,0 +1,283 @@
+import re
+import threading
+import time
+import weakref
+from collections import deque
+
+import pymysql
+from pymysql.constants import SERVER_STATUS
+
+# SET statements that change the connection's session; SET GLOBAL / PERSIST do not
+_SESSION_SET = re.compile(r"\s*SET\s+(?!GLOBAL\s|PERSIST\s|PERSIST_ONLY\s)", re.I)
+# Variables assigned by a session SET, e.g. SET SESSION sql_mode = ..., @@wait_timeout = ...
+_SESSION_ASSIGNMENT = re.compile(
+    r"(?:^\s*SET|,)\s*(?:SESSION\s+|LOCAL\s+|@@SESSION\.|@@LOCAL\.|@@)?([A-Za-z_]\w*)\s*:?=", re.I
+)
+
+
+class PoolExhaustedError(pymysql.err.OperationalError):
+    """Raised when no pooled connection becomes free within the checkout timeout"""
+
+
+class ConnectionPool:
+    """Bounded pool of pymysql connections with health checks and max-lifetime recycling.
+
+    Connections are lent out wrapped in a PooledConnection; calling close() on the
+    wrapper hands the connection back to the pool instead of closing the socket.
+    Session variables a borrower SETs are put back to their defaults on release, so they
+    do not leak into the next checkout; a session change that cannot be undone that way
+    (SET NAMES, user variables) closes the connection instead.
+    `on_open` is called after every new physical connection and `cursor_wrapper`, if
+    given, wraps every cursor handed out (used for query instrumentation).
+    """
+
+    def __init__(self, creator, max_size=10, timeout=30, recycle=1800, ping_interval=60,
+                 on_open=None, cursor_wrapper=None):
+        self._creator = creator
+        self.on_open = on_open
+        self.cursor_wrapper = cursor_wrapper
+        self.max_size = max_size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_interval = ping_interval
+
+        # Idle entries are (raw_connection, created_at, last_used); used LIFO so the
+        # connections that stay open are the ones most recently known to be healthy.
+        self._idle = deque()
+        self._size = 0
+        # Re-entrant so a leaked-connection finalizer that fires during garbage
+        # collection inside a locked section cannot deadlock its own thread.
+        self._cond = threading.Condition(threading.RLock())
+
+    def get_connection(self, cursorclass=None):
+        """Check out a connection, blocking up to `timeout` seconds if the pool is exhausted.
+
+        `cursorclass` overrides the default cursor type for conn.cursor() on this checkout,
+        e.g. pymysql.cursors.Cursor for callers that unpack rows as tuples.
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    entry = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError(
+                        f"No database connection available after {self.timeout}s "
+                        f"(pool size {self.max_size})"
+                    )
+                self._cond.wait(remaining)
+
+        try:
+            if entry is None:
+                raw, created_at = self._open()
+            else:
+                raw, created_at = self._validate(entry)
+        except Exception:
+            self._forget()
+            raise
+
+        return PooledConnection(self, raw, created_at, cursorclass)
+
+    def release(self, raw, created_at, discard=False, session_vars=()):
+        """Return a lent connection; broken, dirty or expired connections are closed instead.
+
+        `session_vars` are the session variables the borrower changed (None for a change
+        that cannot be reset).
+        """
+        if not discard:
+            discard = not self._reset(raw, session_vars) or self._expired(created_at)
+
+        if discard:
+            self._close_quietly(raw)
+            self._forget()
+            return
+
+        with self._cond:
+            self._idle.append((raw, created_at, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection (lent connections are closed when returned)"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for raw, _, _ in idle:
+            self._close_quietly(raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'open': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle)
+            }
+
+    def _open(self):
+        raw = self._creator()
+        if self.on_open is not None:
+            self.on_open()
+        return raw, time.monotonic()
+
+    def _validate(self, entry):
+        raw, created_at, last_used = entry
+        now = time.monotonic()
+
+        if self._expired(created_at):
+            self._close_quietly(raw)
+            return self._open()
+
+        if now - last_used >= self.ping_interval:
+            try:
+                raw.ping(reconnect=False)
+            except Exception:
+                self._close_quietly(raw)
+                return self._open()
+
+        return raw, created_at
+
+    def _expired(self, created_at):
+        return self.recycle is not None and time.monotonic() - created_at >= self.recycle
+
+    def _reset(self, raw, session_vars=()):
+        """Leave the connection as a fresh checkout would expect it; False if unusable"""
+        try:
+            if not raw.open or None in session_vars:
+                return False
+            if raw.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+                raw.rollback()
+            if session_vars:
+                with raw.cursor() as cursor:
+                    cursor.execute("SET SESSION " + ", ".join(f"{name} = DEFAULT" for name in sorted(session_vars)))
+            if not raw.get_autocommit():
+                raw.autocommit(True)
+            return True
+        except Exception:
+            return False
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+
+def _release_leaked(pool, state):
+    # Finalizer for wrappers that were dropped without close(); see PooledConnection
+    if state['raw'] is not None:
+        raw, state['raw'] = state['raw'], None
+        pool.release(raw, state['created_at'], session_vars=state['session_vars'])
+
+
+def note_session_changes(session_vars, query):
+    """Add the session variables `query` assigns to `session_vars` (None if they cannot be told)"""
+    if not isinstance(query, str) or not _SESSION_SET.match(query):
+        return
+    names = _SESSION_ASSIGNMENT.findall(query)
+    if names:
+        session_vars.update(name.lower() for name in names)
+    else:
+        session_vars.add(None)
+
+
+class SessionTrackingCursor:
+    """Cursor proxy that records the session variables its statements change"""
+
+    def __init__(self, cursor, session_vars):
+        self._cursor = cursor
+        self._session_vars = session_vars
+
+    def execute(self, query, args=None):
+        note_session_changes(self._session_vars, query)
+        return self._cursor.execute(query, args)
+
+    def executemany(self, query, args):
+        note_session_changes(self._session_vars, query)
+        return self._cursor.executemany(query, args)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        if name in ('_cursor', '_session_vars'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._cursor, name, value)
+
+
+class PooledConnection:
+    """Wrapper around a lent pymysql connection; close() returns it to the pool"""
+
+    def __init__(self, pool, raw, created_at, cursorclass=None):
+        self._pool = pool
+        self._cursorclass = cursorclass
+        self._state = {'raw': raw, 'created_at': created_at, 'session_vars': set()}
+        self._finalizer = weakref.finalize(self, _release_leaked, pool, self._state)
+
+    @property
+    def raw(self):
+        raw = self._state['raw']
+        if raw is None:
+            raise pymysql.err.Error("Already closed")
+        return raw
+
+    @property
+    def open(self):
+        return self._state['raw'] is not None and self._state['raw'].open
+
+    def cursor(self, cursor=None):
+        cursor = cursor or self._cursorclass
+        cur = self.raw.cursor(cursor) if cursor else self.raw.cursor()
+        # Keep the wrapper alive while any of its cursors are, so call sites like
+        # `with get_db_connection().cursor() as cursor:` do not hand the connection
+        # back to the pool mid-query.
+        cur._pooled_connection = self
+        if self._pool.cursor_wrapper is not None:
+            cur = self._pool.cursor_wrapper(cur)
+        return SessionTrackingCursor(cur, self._state['session_vars'])
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        self._finalizer.detach()
+        raw, self._state['raw'] = self._state['raw'], None
+        if raw is not None:
+            self._pool.release(raw, self._state['created_at'], session_vars=self._state['session_vars'])
+
+    def discard(self):
+        """Close the underlying socket instead of returning it to the pool"""
+        self._finalizer.detach()
+        raw, self._state['raw'] = self._state['raw'], None
+        if raw is not None:
+            self._pool.release(raw, self._state['created_at'], discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
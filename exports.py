@@ -0,0 +1,208 @@
+"""Constant-memory report exports.
+
+Rows are read from an unbuffered server-side cursor on a dedicated connection and written
+straight into a write-only workbook on disk; the finished file is then sent in chunks and
+deleted. Memory stays flat however many rows a report has, and no pooled connection is held
+while the client downloads.
+
+Reports can also be downloaded as CSV (streamed while the rows are read) or Parquet (written
+one row group at a time); export_response() picks the writer for `?format=`.
+"""
+import csv
+import io
+import os
+import tempfile
+from itertools import chain, islice
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pymysql.cursors
+from flask import Response, stream_with_context
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+
+from report_jobs import note_progress
+from utils import get_db_connection
+
+FETCH_BATCH_SIZE = 2000  # Rows pulled from the server per round trip
+WIDTH_SAMPLE_ROWS = 500  # Rows inspected to size the columns
+FILE_CHUNK_SIZE = 64 * 1024  # Bytes per chunk of the streamed response
+MAX_COLUMN_WIDTH = 60
+CSV_FLUSH_ROWS = 1000  # CSV rows encoded per chunk of the streamed response
+PARQUET_ROW_GROUP_SIZE = 10000  # Rows buffered per Parquet row group
+PROGRESS_ROWS = 1000  # Rows between progress notes to a running report job
+
+EXPORT_FORMATS = ('xlsx', 'csv', 'parquet')
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_MIMETYPE = 'text/csv'
+PARQUET_MIMETYPE = 'application/vnd.apache.parquet'
+GOLD_FILL = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
+
+def stream_query(query, params=None, batch_size=FETCH_BATCH_SIZE):
+    """Yield the rows of `query` as dicts from an unbuffered cursor on its own connection"""
+    conn = get_db_connection(pymysql.cursors.SSDictCursor)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params or [])
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+    finally:
+        conn.close()
+
+def _estimate_widths(column_headings, sample):
+    widths = []
+    for key, header in column_headings.items():
+        max_length = max([len(str(header))] + [len(str(record.get(key, ''))) for record in sample])
+        widths.append(min((max_length + 2) * 1.2, MAX_COLUMN_WIDTH))
+    return widths
+
+def _write_sheet(wb, title, records, column_headings, header_fill, as_text, rows_done):
+    records = iter(records)
+    sample = list(islice(records, WIDTH_SAMPLE_ROWS))
+
+    ws = wb.create_sheet(title)
+    for index, width in enumerate(_estimate_widths(column_headings, sample), 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+    header = []
+    for value in column_headings.values():
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal='center')
+        if header_fill is not None:
+            cell.fill = header_fill
+        header.append(cell)
+    ws.append(header)
+
+    keys = list(column_headings.keys())
+    for record in chain(sample, records):
+        if as_text:
+            ws.append([str(record.get(key, '')) for key in keys])
+        else:
+            ws.append([record.get(key) for key in keys])
+        rows_done += 1
+        if rows_done % PROGRESS_ROWS == 0:
+            note_progress(rows_done)
+    return rows_done
+
+def write_xlsx_sheets(sheets, header_fill=None, as_text=True):
+    """Write `sheets`, given as (title, records, column_headings), to one temporary xlsx file.
+
+    Values are written as text, as create_excel_workbook does, unless `as_text` is False. Column
+    widths are estimated from the first WIDTH_SAMPLE_ROWS records of each sheet, which are the
+    only ones held in memory at once. Returns the file's path.
+    """
+    wb = Workbook(write_only=True)
+    rows_done = 0
+    for title, records, column_headings in sheets:
+        rows_done = _write_sheet(wb, title, records, column_headings, header_fill, as_text, rows_done)
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx', prefix='export_')
+    os.close(fd)
+    try:
+        wb.save(path)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+def write_xlsx(records, column_headings, title="Report", header_fill=None, as_text=True):
+    """Write `records` (any iterable of dicts) to a one-sheet temporary xlsx file and return its path"""
+    return write_xlsx_sheets([(title, records, column_headings)], header_fill, as_text)
+
+def _file_chunks(path):
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def file_response(path, filename, mimetype):
+    """Chunked attachment response for a temporary file, which is deleted once the response closes"""
+    response = Response(_file_chunks(path), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.call_on_close(lambda: _remove_quietly(path))
+    return response
+
+def xlsx_response(records, column_headings, filename, title="Report", header_fill=None, as_text=True):
+    """Stream `records` into a write-only workbook and return it as a chunked download"""
+    path = write_xlsx(records, column_headings, title, header_fill, as_text)
+    return file_response(path, filename, XLSX_MIMETYPE)
+
+def _csv_chunks(records, column_headings):
+    keys = list(column_headings.keys())
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(column_headings.values())
+    for count, record in enumerate(records, 1):
+        writer.writerow([record.get(key, '') for key in keys])
+        if count % CSV_FLUSH_ROWS == 0:
+            note_progress(count)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue().encode('utf-8')
+
+def csv_response(records, column_headings, filename):
+    """CSV download generated while `records` is read, headed by the column headings"""
+    records = iter(records)
+    # Read the first row up front so a failing query is reported before the download starts
+    first = list(islice(records, 1))
+    response = Response(stream_with_context(_csv_chunks(chain(first, records), column_headings)), mimetype=CSV_MIMETYPE)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def _text(value):
+    return None if value is None else str(value)
+
+def write_parquet(records, column_headings):
+    """Write `records` to a temporary Parquet file in row groups and return its path.
+
+    Columns are named by the column headings and hold text, as in the xlsx exports.
+    """
+    keys = list(column_headings.keys())
+    schema = pa.schema([(header, pa.string()) for header in column_headings.values()])
+    records = iter(records)
+    rows_done = 0
+
+    fd, path = tempfile.mkstemp(suffix='.parquet', prefix='export_')
+    os.close(fd)
+    try:
+        with pq.ParquetWriter(path, schema) as writer:
+            while True:
+                batch = list(islice(records, PARQUET_ROW_GROUP_SIZE))
+                if not batch:
+                    break
+                columns = [pa.array([_text(record.get(key)) for record in batch], pa.string()) for key in keys]
+                writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+                rows_done += len(batch)
+                note_progress(rows_done)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+def get_export_format(args):
+    """Export format requested with ?format=, xlsx unless csv or parquet is asked for"""
+    export_format = (args.get('format') or 'xlsx').lower()
+    return export_format if export_format in EXPORT_FORMATS else 'xlsx'
+
+def export_response(records, column_headings, filename, export_format='xlsx', title="Report",
+                    header_fill=None, as_text=True):
+    """Download `records` in `export_format`; `filename` is given without its extension"""
+    if export_format == 'csv':
+        return csv_response(records, column_headings, f"{filename}.csv")
+    if export_format == 'parquet':
+        return file_response(write_parquet(records, column_headings), f"{filename}.parquet", PARQUET_MIMETYPE)
+    return xlsx_response(records, column_headings, f"{filename}.xlsx", title, header_fill, as_text)
@@ -1,9 +1,14 @@
 from flask import Blueprint, render_template, request, send_file, jsonify, flash, redirect, url_for, session
 import pandas as pd
+import csv
+import io
 from io import BytesIO
 from datetime import datetime, date, time, timedelta
 import json
 from utils import get_db_connection
+from data_cache import bump_data_version
+from http_cache import conditional_on
+from learning_hours import get_learning_hours
 factory_bp = Blueprint('factory_data', __name__, url_prefix='/factory-data')
 def format_timedelta_to_time(td):
     """Convert timedelta to time string in HH:MM format"""
@@ -36,49 +41,6 @@ def serialize_nomination(nom):
             serialized[key] = value
     
     return serialized
-def get_total_she_hours(per_no, cursor, exclude_training_name=None):
-    """Calculate the total SHE (Safety+Health) learning hours from master_data for an employee"""
-    query = """
-        SELECT learning_hours
-        FROM master_data
-        WHERE per_no = %s
-        AND pmo_training_category = 'SHE (Safety+Health)'
-    """
-    params = [per_no]
-    
-    # Exclude the current training they didn't attend
-    if exclude_training_name:
-        query += " AND training_name != %s"
-        params.append(exclude_training_name)
-    
-    cursor.execute(query, params)
-    records = cursor.fetchall()
-    
-    # Sum all SHE learning hours
-    total_she_hours = sum(record['learning_hours'] or 0 for record in records)
-    
-    return total_she_hours
-def get_total_learning_hours(per_no, cursor, exclude_training_name=None):
-    """Calculate the total learning hours from all categories for an employee"""
-    query = """
-        SELECT learning_hours
-        FROM master_data
-        WHERE per_no = %s
-    """
-    params = [per_no]
-    
-    # Exclude the current training they didn't attend
-    if exclude_training_name:
-        query += " AND training_name != %s"
-        params.append(exclude_training_name)
-    
-    cursor.execute(query, params)
-    records = cursor.fetchall()
-    
-    # Sum all learning hours
-    total_hours = sum(record['learning_hours'] or 0 for record in records)
-    
-    return total_hours
 @factory_bp.before_request
 def check_session():
     """Check if user is logged in and has factory location in session, except for endpoints that don't require it."""
@@ -239,23 +201,15 @@ def factory_data():
                                             suffixes=('_tni', '_attended'),
                                             indicator=True)
                         
+                        # SHE and total learning hours of every TNI employee in one query
+                        hours = get_learning_hours(merged['per_no'], cursor, training_details['training_name'])
+                        
                         # Create attendance data with status
                         attendance_data = []
                         for _, row in merged.iterrows():
                             status = "Attended" if row['_merge'] == 'both' else "Not Attended"
                             nomination_status = nomination_statuses.get(row['per_no'], None)
-                            
-                            # Get SHE and total learning hours for this employee
-                            she_hours = get_total_she_hours(
-                                row['per_no'], 
-                                cursor, 
-                                training_details['training_name']
-                            )
-                            total_hours = get_total_learning_hours(
-                                row['per_no'], 
-                                cursor, 
-                                training_details['training_name']
-                            )
+                            employee_hours = hours[str(row['per_no'])]
                             
                             attendance_data.append({
                                 'per_no': row['per_no'],
@@ -263,24 +217,15 @@ def factory_data():
                                 'training_name': row['training_name'],
                                 'status': status,
                                 'nomination_status': nomination_status,
-                                'she_hours': she_hours,
-                                'total_learning_hours': total_hours
+                                'she_hours': employee_hours['she_hours'],
+                                'total_learning_hours': employee_hours['total_learning_hours']
                             })
                     else:
                         # If no one attended, all are not attended
+                        hours = get_learning_hours(tni_df['per_no'], cursor, training_details['training_name'])
                         attendance_data = []
                         for _, row in tni_df.iterrows():
-                            # Get SHE and total learning hours for this employee
-                            she_hours = get_total_she_hours(
-                                row['per_no'], 
-                                cursor, 
-                                training_details['training_name']
-                            )
-                            total_hours = get_total_learning_hours(
-                                row['per_no'], 
-                                cursor, 
-                                training_details['training_name']
-                            )
+                            employee_hours = hours[str(row['per_no'])]
                             
                             attendance_data.append({
                                 'per_no': row['per_no'],
@@ -288,8 +233,8 @@ def factory_data():
                                 'training_name': row['training_name'],
                                 'status': 'Not Attended',
                                 'nomination_status': nomination_statuses.get(row['per_no'], None),
-                                'she_hours': she_hours,
-                                'total_learning_hours': total_hours
+                                'she_hours': employee_hours['she_hours'],
+                                'total_learning_hours': employee_hours['total_learning_hours']
                             })
     finally:
         conn.close()
@@ -329,68 +274,30 @@ def download_factory_data():
             
         training_name = training_result['training_name']
         
-        # Fetch TNI employees
+        # TNI employees of this factory with no attendance record for the training
         cursor.execute("""
-            SELECT per_no, name, training_name
-            FROM tni_data
-            WHERE factory = %s AND training_name = %s
+            SELECT t.per_no, t.name, t.training_name
+            FROM tni_data t
+            WHERE t.factory = %s AND t.training_name = %s
+            AND NOT EXISTS (
+                SELECT 1 FROM master_data m
+                WHERE m.per_no = t.per_no AND m.training_name = t.training_name
+            )
         """, (selected_factory, training_name))
-        tni_employees = cursor.fetchall()
+        not_attended = cursor.fetchall()
         
-        # Fetch attended employees
-        cursor.execute("""
-            SELECT per_no, participants_name AS name, training_name
-            FROM master_data
-            WHERE training_name = %s
-        """, (training_name,))
-        attended_employees = cursor.fetchall()
-        
-        # Process data for download
-        tni_df = pd.DataFrame(tni_employees)
-        attended_df = pd.DataFrame(attended_employees)
-        
-        if not tni_df.empty:
-            if not attended_df.empty:
-                merged = tni_df.merge(attended_df,
-                                    on=['per_no', 'training_name'],
-                                    how='left',
-                                    suffixes=('_tni', '_attended'),
-                                    indicator=True)
-                not_attended_df = merged[merged['_merge'] == 'left_only'][
-                    ['per_no', 'name_tni', 'training_name']]
-                not_attended_df = not_attended_df.rename(columns={'name_tni': 'name'})
-            else:
-                not_attended_df = tni_df
-            
-            # Add training hours information for each employee
-            she_hours_list = []
-            total_hours_list = []
-            
-            for _, row in not_attended_df.iterrows():
-                she_hours = get_total_she_hours(
-                    row['per_no'], 
-                    cursor, 
-                    training_name
-                )
-                total_hours = get_total_learning_hours(
-                    row['per_no'], 
-                    cursor, 
-                    training_name
-                )
-                she_hours_list.append(she_hours)
-                total_hours_list.append(total_hours)
-            
-            not_attended_df['she_hours'] = she_hours_list
-            not_attended_df['total_learning_hours'] = total_hours_list
-        else:
-            not_attended_df = pd.DataFrame(columns=[
-                'per_no', 'name', 'training_name', 'she_hours', 'total_learning_hours'
-            ])
+        # SHE and total learning hours of all of them in one query
+        hours = get_learning_hours([row['per_no'] for row in not_attended], cursor, training_name)
         
         # Convert to CSV
-        output = BytesIO()
-        not_attended_df.to_csv(output, index=False, encoding='utf-8-sig')
-        output.seek(0)
+        text = io.StringIO()
+        writer = csv.writer(text)
+        writer.writerow(['per_no', 'name', 'training_name', 'she_hours', 'total_learning_hours'])
+        for row in not_attended:
+            employee_hours = hours[str(row['per_no'])]
+            writer.writerow([row['per_no'], row['name'], row['training_name'],
+                             employee_hours['she_hours'], employee_hours['total_learning_hours']])
+        output = BytesIO(text.getvalue().encode('utf-8-sig'))
         
         return send_file(output,
                      mimetype='text/csv',
@@ -476,6 +383,7 @@ def share_nomination():
         """, (factory, training_id, per_no, name))
         
         conn.commit()
+        bump_data_version('nominations')
         return jsonify({'success': True, 'message': 'Nomination shared successfully'})
         
     except Exception as e:
@@ -485,6 +393,7 @@ def share_nomination():
     finally:
         conn.close()
 @factory_bp.route('/get_nominations/<int:training_id>')
+@conditional_on('nominations', 'training_programs', 'master_data')
 def get_nominations(training_id):
     # Check if user is logged in
     if 'logged_in' not in session or not session['logged_in']:
@@ -516,25 +425,11 @@ def get_nominations(training_id):
                 factory_counts[factory] = 0
             factory_counts[factory] += 1
         
-        # Add SHE Hours and Total Learning Hours to each nomination
-        for nom in nominations:
-            # Calculate SHE Hours for this employee
-            she_hours = get_total_she_hours(
-                nom['per_no'], 
-                cursor, 
-                nom['training_name']  # Exclude current training
-            )
-            
-            # Calculate Total Learning Hours for this employee
-            total_hours = get_total_learning_hours(
-                nom['per_no'], 
-                cursor, 
-                nom['training_name']  # Exclude current training
-            )
-            
-            # Add these values to the nomination dictionary
-            nom['she_hours'] = she_hours
-            nom['total_learning_hours'] = total_hours
+        # Add SHE Hours and Total Learning Hours to each nomination, excluding the current training
+        if nominations:
+            hours = get_learning_hours([nom['per_no'] for nom in nominations], cursor, nominations[0]['training_name'])
+            for nom in nominations:
+                nom.update(hours[str(nom['per_no'])])
         
         # Convert to serializable format
         serialized_nominations = []
@@ -585,6 +480,7 @@ def update_nomination_status():
         """, (status, nomination_id))
         
         conn.commit()
+        bump_data_version('nominations')
         return jsonify({'success': True, 'message': f'Nomination {status.lower()} successfully'})
         
     except Exception as e:
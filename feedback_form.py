@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from datetime import datetime
 import pymysql
 from utils import get_db_connection, Config
+from data_cache import bump_data_version
 import os
 import pandas as pd
 import uuid
@@ -255,6 +256,7 @@ def submit_feedback():
 
             cursor.execute(query, values)
             conn.commit()
+            bump_data_version('feedback_responses')
 
         flash('Feedback submitted successfully!', 'success')
         return redirect(url_for('feedback.success'))
@@ -558,6 +560,7 @@ def submit_clubbed_feedback():
 
                 cursor.execute(query, values)
                 conn.commit()
+                bump_data_version('feedback_responses')
 
         flash('Feedback submitted successfully for all programs!', 'success')
         return redirect(url_for('feedback.success'))
@@ -0,0 +1,79 @@
+"""Conditional GET for views built from tables tracked by data_cache.
+
+A view decorated with @conditional_on(*tables) gets an ETag and Last-Modified derived from the
+data versions of those tables, the request's arguments and the session scope. A client that
+sends back a matching If-None-Match (or a fresh If-Modified-Since) gets a bodyless 304 before
+the view runs, so repeated refreshes and re-downloads of unchanged data never reach MySQL.
+
+Versions are per process, so an ETag also carries a process token and a time window of
+Config.ETAG_TTL seconds: writes made in another worker process are picked up once the window
+rolls over, the same bound the result caches use.
+"""
+import hashlib
+import json
+import math
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import Response, make_response, request, session
+from werkzeug.http import is_resource_modified
+
+from data_cache import get_data_changed_at, get_data_versions
+from utils import Config
+
+# Session keys that change what a view returns (login state and factory-scoped roles)
+SCOPE_SESSION_KEYS = ('logged_in', 'role', 'factory_location')
+
+_process_token = uuid.uuid4().hex
+_started_at = time.time()
+
+def data_validators(tables):
+    """(etag, last_modified) of the current request's view over `tables`"""
+    window = int(time.time() // Config.ETAG_TTL)
+    payload = json.dumps([
+        _process_token,
+        window,
+        request.endpoint,
+        request.view_args,
+        sorted(request.args.items(multi=True)),
+        [session.get(key) for key in SCOPE_SESSION_KEYS],
+        list(tables),
+        get_data_versions(tables)
+    ], default=str)
+    etag = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+    changed_at = max(get_data_changed_at(tables), _started_at, window * Config.ETAG_TTL)
+    # Rounded up to whole seconds so a write is never dated before a response it follows
+    last_modified = datetime.fromtimestamp(math.ceil(changed_at), tz=timezone.utc)
+    return etag, last_modified
+
+def _is_failure(response):
+    if response.status_code != 200:
+        return True
+    # Some JSON views report errors in the body with a 200
+    body = response.get_json(silent=True) if response.is_json else None
+    return isinstance(body, dict) and body.get('success') is False
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+
+def conditional_on(*tables):
+    """Answer unchanged GETs of the decorated view with 304 Not Modified"""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            # Validators are taken before the view reads, so a write during it changes the next ETag
+            etag, last_modified = data_validators(tables)
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = Response(status=304)
+                _set_validators(response, etag, last_modified)
+                return response
+            response = make_response(view(*args, **kwargs))
+            if not _is_failure(response):
+                _set_validators(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,44 @@
+"""Learning hours of many employees at once, for nomination and TNI follow-up lists.
+
+get_learning_hours() answers SHE and total hours for a list of employees with one grouped
+query over master_data (per_no is indexed, see db_migrations.INDEXES) instead of two lookups
+per employee. The employee_hours ledger cannot serve these lists: their hours leave out the
+training being nominated for, which the ledger has already summed in.
+"""
+from rollups import SHE_CATEGORY
+
+HOURS_BATCH_SIZE = 1000  # Employees per grouped query
+
+def get_learning_hours(per_nos, cursor, exclude_training_name=None):
+    """{str(per_no): {'she_hours', 'total_learning_hours'}} for each employee in `per_nos`.
+
+    Hours of `exclude_training_name` are left out; employees without records get 0 for both.
+    Each requested per_no is matched the way MySQL compares it (ignoring case and trailing
+    spaces) but answered under its own key, so callers look up the value they passed in.
+    """
+    per_nos = sorted({str(per_no) for per_no in per_nos})
+    hours = {per_no: {'she_hours': 0, 'total_learning_hours': 0} for per_no in per_nos}
+    for i in range(0, len(per_nos), HOURS_BATCH_SIZE):
+        batch = per_nos[i:i + HOURS_BATCH_SIZE]
+        # Requested values are grouped by position: values MySQL considers equal still each
+        # get their row
+        requested = ' UNION ALL '.join(['SELECT %s AS position, %s AS per_no'] * len(batch))
+        query = f"""
+            SELECT requested.position,
+                SUM(CASE WHEN m.pmo_training_category = %s THEN COALESCE(m.learning_hours, 0) ELSE 0 END) as she_hours,
+                SUM(COALESCE(m.learning_hours, 0)) as total_learning_hours
+            FROM ({requested}) AS requested
+            JOIN master_data m ON m.per_no = requested.per_no
+        """
+        params = [SHE_CATEGORY] + [value for position, per_no in enumerate(batch) for value in (position, per_no)]
+        if exclude_training_name:
+            query += " WHERE m.training_name != %s"
+            params.append(exclude_training_name)
+        query += " GROUP BY requested.position"
+        cursor.execute(query, params)
+        for row in cursor.fetchall():
+            hours[batch[row['position']]] = {
+                'she_hours': row['she_hours'] or 0,
+                'total_learning_hours': row['total_learning_hours'] or 0
+            }
+    return hours
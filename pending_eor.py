@@ -0,0 +1,118 @@
+"""Pending EOR: employees on the EOR roll with no permanent training record in master_data.
+
+Every mode runs one NOT EXISTS anti-join on per_no (indexed on both tables, see
+db_migrations.INDEXES), so nothing loads the full EOR or learner lists into Python:
+
+- get_pending_eor_counts() for tiles (EOR headcount and pending count in one pass)
+- list_pending_eor() for a page of employees, or all of them
+- iter_pending_eor() streams rows from an unbuffered cursor for downloads
+
+`filters` may hold factory, gender, employee_group and bc_no; each is applied to both the EOR
+rows and the training records they are matched against, as the dashboard tiles always did.
+`eor_employee_group` restricts only the EOR side (e.g. 'Permanent').
+"""
+import pymysql.cursors
+
+from utils import get_db_connection, get_request_connection
+
+PENDING_EOR_COLUMNS = ('per_no', 'participants_name', 'bc_no', 'gender', 'employee_group', 'department', 'factory')
+
+STREAM_BATCH_SIZE = 1000  # Rows fetched per round trip by iter_pending_eor()
+
+def _matching_conditions(alias, filters):
+    conditions = []
+    params = []
+    if filters.get('factory') and filters['factory'] != 'All':
+        conditions.append(f"{alias}.factory = %s")
+        params.append(filters['factory'])
+    if filters.get('gender') and filters['gender'] != 'All':
+        conditions.append(f"{alias}.gender = %s")
+        params.append(filters['gender'])
+    if filters.get('employee_group'):
+        conditions.append(f"{alias}.employee_group = %s")
+        params.append(filters['employee_group'])
+    if filters.get('bc_no'):
+        conditions.append(f"{alias}.bc_no = %s")
+        params.append(filters['bc_no'])
+    return ''.join(f" AND {condition}" for condition in conditions), params
+
+def _trained_subquery(filters):
+    """Correlated NOT EXISTS body: a permanent training record for e.per_no"""
+    conditions, params = _matching_conditions('m', filters)
+    return f"""
+        SELECT 1 FROM master_data m
+        WHERE m.per_no = e.per_no
+        AND m.employee_group = 'PERMANENT'
+        {conditions}
+    """, params
+
+def _eor_conditions(filters, eor_employee_group=None):
+    conditions, params = _matching_conditions('e', filters)
+    if eor_employee_group:
+        conditions += " AND e.employee_group = %s"
+        params.append(eor_employee_group)
+    return f"e.per_no IS NOT NULL AND e.per_no != ''{conditions}", params
+
+def _pending_query(filters, eor_employee_group=None):
+    eor_where, eor_params = _eor_conditions(filters, eor_employee_group)
+    trained_sql, trained_params = _trained_subquery(filters)
+    query = f"""
+        SELECT {', '.join(f'e.{column}' for column in PENDING_EOR_COLUMNS)}
+        FROM eor_data e
+        WHERE {eor_where}
+        AND NOT EXISTS ({trained_sql})
+        ORDER BY e.per_no
+    """
+    return query, eor_params + trained_params
+
+def get_pending_eor_counts(filters, eor_employee_group=None):
+    """{'eor_count', 'pending_eor_count'}: distinct EOR employees and those not yet trained"""
+    eor_where, eor_params = _eor_conditions(filters, eor_employee_group)
+    trained_sql, trained_params = _trained_subquery(filters)
+    query = f"""
+        SELECT
+            COUNT(DISTINCT e.per_no) as eor_count,
+            COUNT(DISTINCT CASE WHEN NOT EXISTS ({trained_sql}) THEN e.per_no END) as pending_eor_count
+        FROM eor_data e
+        WHERE {eor_where}
+    """
+    conn = get_request_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, trained_params + eor_params)
+            row = cursor.fetchone() or {}
+    finally:
+        conn.close()
+    return {
+        'eor_count': int(row.get('eor_count') or 0),
+        'pending_eor_count': int(row.get('pending_eor_count') or 0)
+    }
+
+def list_pending_eor(filters, eor_employee_group=None, limit=None, offset=0):
+    """Pending EOR rows ordered by per_no; one page when `limit` is given, otherwise all"""
+    query, params = _pending_query(filters, eor_employee_group)
+    if limit is not None:
+        query += " LIMIT %s OFFSET %s"
+        params += [int(limit), int(offset)]
+    conn = get_request_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            return list(cursor.fetchall())
+    finally:
+        conn.close()
+
+def iter_pending_eor(filters, eor_employee_group=None):
+    """Yield pending EOR rows from an unbuffered cursor on a dedicated connection"""
+    query, params = _pending_query(filters, eor_employee_group)
+    conn = get_db_connection(pymysql.cursors.SSDictCursor)
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield from rows
+    finally:
+        conn.close()
@@ -0,0 +1,288 @@
+"""Background generation of the slowest report downloads.
+
+Submitting a report records a job in the report_jobs table and hands it to a small thread
+pool; the client polls the status endpoint and downloads the finished file from disk. A job
+replays the report's normal download route with the submitter's filters and session, so the
+file is exactly what the synchronous download would have produced.
+
+Finished files are reused for identical filters and user scope until one of the tables the
+report reads is written (see data_cache.bump_data_version) or REPORT_JOB_TTL passes, which
+bounds staleness for writes made in other worker processes.
+
+Queued and running jobs only live in the thread pool of the process that accepted them, so a
+job row records that process as its runner. An identical submit only joins a pending job of
+its own process; one left behind by a restarted or other worker is never waited on, and
+is marked failed once REPORT_JOB_TIMEOUT passes.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import Blueprint, current_app, jsonify, request, send_file, session, url_for
+from werkzeug.http import parse_options_header
+
+from data_cache import get_data_changed_at
+from db_metrics import metrics_label
+from utils import Config, get_db_connection
+
+report_jobs_bp = Blueprint('report_jobs', __name__)
+
+JOBS_TABLE = 'report_jobs'
+PROGRESS_UPDATE_INTERVAL = 2  # Seconds between progress writes to the job row
+
+# Report name: (download endpoint, tables the report reads)
+REPORTS = {
+    'unique_learners': ('view_bp.download_unique_learners', ('master_data',)),
+    'completed_16_hours': ('view_bp.download_completed_16_hours', ('master_data', 'eor_data')),
+    'incomplete_16_hours': ('view_bp.download_incomplete_16_hours', ('master_data', 'eor_data')),
+    'tni_remaining': ('view_bp.download_tni_remaining', ('master_data', 'tni_data')),
+    'ciro_summary': ('ciro.export_summary', ('feedback_responses',)),
+    'hours_pack': ('view_bp.download_hours_pack', ('master_data', 'eor_data')),
+}
+
+# Session keys that decide what a report contains (factory-scoped roles see one factory)
+SCOPE_SESSION_KEYS = ('role', 'factory_location')
+
+JOBS_TABLE_DDL = f"""
+    CREATE TABLE IF NOT EXISTS `{JOBS_TABLE}` (
+        id CHAR(32) NOT NULL PRIMARY KEY,
+        report VARCHAR(64) NOT NULL,
+        params_key CHAR(64) NOT NULL,
+        params TEXT,
+        status VARCHAR(16) NOT NULL,
+        runner CHAR(32),
+        rows_done INT NOT NULL DEFAULT 0,
+        file_path VARCHAR(512),
+        filename VARCHAR(255),
+        mimetype VARCHAR(128),
+        error TEXT,
+        created_by VARCHAR(100),
+        created_at DATETIME NOT NULL,
+        started_at DATETIME,
+        finished_at DATETIME,
+        KEY idx_report_jobs_key (params_key, created_at)
+    )
+"""
+
+_job_executor = ThreadPoolExecutor(max_workers=Config.REPORT_JOB_WORKERS, thread_name_prefix='report-job')
+# Identifies this process's thread pool on the jobs it accepts
+_runner_token = uuid.uuid4().hex
+_local = threading.local()
+_table_ready = False
+_table_lock = threading.Lock()
+
+def ensure_jobs_table():
+    global _table_ready
+    if _table_ready:
+        return
+    with _table_lock:
+        if _table_ready:
+            return
+        conn = get_db_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(JOBS_TABLE_DDL)
+                cursor.execute(f"SHOW COLUMNS FROM {JOBS_TABLE} LIKE 'runner'")
+                if cursor.fetchone() is None:
+                    cursor.execute(f"ALTER TABLE {JOBS_TABLE} ADD COLUMN runner CHAR(32) AFTER status")
+        finally:
+            conn.close()
+        _table_ready = True
+        fail_abandoned_jobs()
+
+def fail_abandoned_jobs():
+    """Mark queued/running jobs failed once no runner can still be working on them"""
+    cutoff = datetime.now() - timedelta(seconds=Config.REPORT_JOB_TIMEOUT)
+    _execute(
+        f"""UPDATE {JOBS_TABLE} SET status = 'failed', error = %s, finished_at = %s
+            WHERE status IN ('queued', 'running') AND (runner IS NULL OR created_at < %s)""",
+        ('Report worker stopped before the job finished', datetime.now(), cutoff)
+    )
+
+def _execute(query, params=None):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, params or [])
+            return cursor.fetchall()
+    finally:
+        conn.close()
+
+def _update_job(job_id, **fields):
+    assignments = ', '.join(f"{column} = %s" for column in fields)
+    _execute(f"UPDATE {JOBS_TABLE} SET {assignments} WHERE id = %s", list(fields.values()) + [job_id])
+
+def get_job(job_id):
+    ensure_jobs_table()
+    rows = _execute(f"SELECT * FROM {JOBS_TABLE} WHERE id = %s", (job_id,))
+    return rows[0] if rows else None
+
+def note_progress(rows_done):
+    """Record rows written so far by the report running in this thread; a no-op outside jobs"""
+    job = getattr(_local, 'job', None)
+    if job is None:
+        return
+    now = time.monotonic()
+    if now - job['reported_at'] < PROGRESS_UPDATE_INTERVAL:
+        return
+    job['reported_at'] = now
+    try:
+        _update_job(job['id'], rows_done=rows_done)
+    except Exception as e:
+        print(f"Error updating report job progress: {str(e)}")
+
+def _params_key(report, args, scope):
+    payload = json.dumps([report, sorted(args), sorted(scope.items())], default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _is_reusable(job, tables):
+    now = datetime.now()
+    if job['status'] in ('queued', 'running'):
+        # Another process's pool, or that of a worker that has since restarted, may never run it
+        return (job['runner'] == _runner_token
+                and job['created_at'] > now - timedelta(seconds=Config.REPORT_JOB_TIMEOUT))
+    if job['status'] != 'done' or not job['file_path'] or not os.path.exists(job['file_path']):
+        return False
+    if job['finished_at'] <= now - timedelta(seconds=Config.REPORT_JOB_TTL):
+        return False
+    # The report read the tables when it started; any write seen since makes it stale
+    return job['started_at'].timestamp() > get_data_changed_at(tables)
+
+def purge_expired_jobs():
+    """Delete finished jobs and their files once they can no longer be reused"""
+    cutoff = datetime.now() - timedelta(seconds=max(Config.REPORT_JOB_TTL, Config.REPORT_JOB_TIMEOUT))
+    expired = _execute(f"SELECT id, file_path FROM {JOBS_TABLE} WHERE created_at < %s", (cutoff,))
+    for job in expired:
+        if job['file_path'] and os.path.exists(job['file_path']):
+            try:
+                os.remove(job['file_path'])
+            except OSError as e:
+                print(f"Error removing report file {job['file_path']}: {str(e)}")
+    if expired:
+        _execute(f"DELETE FROM {JOBS_TABLE} WHERE created_at < %s", (cutoff,))
+
+def submit_report(report):
+    """Queue `report` with the current request's filters, or return a reusable job for them"""
+    endpoint, tables = REPORTS[report]
+    ensure_jobs_table()
+    purge_expired_jobs()
+    fail_abandoned_jobs()
+
+    args = list(request.args.items(multi=True))
+    scope = {key: session.get(key) for key in SCOPE_SESSION_KEYS}
+    params_key = _params_key(report, args, scope)
+
+    recent = _execute(
+        f"SELECT * FROM {JOBS_TABLE} WHERE params_key = %s ORDER BY created_at DESC LIMIT 1",
+        (params_key,)
+    )
+    if recent and _is_reusable(recent[0], tables):
+        return recent[0]
+
+    job_id = uuid.uuid4().hex
+    path = url_for(endpoint)
+    _execute(
+        f"""INSERT INTO {JOBS_TABLE} (id, report, params_key, params, status, runner, created_by, created_at)
+            VALUES (%s, %s, %s, %s, 'queued', %s, %s, %s)""",
+        (job_id, report, params_key, json.dumps({'path': path, 'args': args}), _runner_token,
+         session.get('username'), datetime.now())
+    )
+    session_data = {key: value for key, value in session.items() if key != '_flashes'}
+    _job_executor.submit(_run_job, current_app._get_current_object(), job_id, report, path, args, session_data)
+    return get_job(job_id)
+
+def _run_job(app, job_id, report, path, args, session_data):
+    _local.job = {'id': job_id, 'reported_at': 0.0}
+    file_path = None
+    try:
+        _update_job(job_id, status='running', started_at=datetime.now())
+        with metrics_label(f"report_job.{report}"), app.test_request_context(path, query_string=args):
+            session.update(session_data)
+            response = app.full_dispatch_request()
+            try:
+                disposition, options = parse_options_header(response.headers.get('Content-Disposition', ''))
+                if response.status_code != 200 or disposition != 'attachment':
+                    messages = [message for _, message in session.get('_flashes', [])]
+                    raise RuntimeError('; '.join(messages) or f"Report returned HTTP {response.status_code}")
+
+                filename = options.get('filename') or f"{report}.xlsx"
+                os.makedirs(Config.REPORT_JOB_DIR, exist_ok=True)
+                file_path = os.path.join(Config.REPORT_JOB_DIR, job_id + os.path.splitext(filename)[1])
+                with open(file_path, 'wb') as f:
+                    for chunk in response.iter_encoded():
+                        f.write(chunk)
+            finally:
+                response.close()
+
+        _update_job(job_id, status='done', file_path=file_path, filename=filename,
+                    mimetype=response.mimetype, finished_at=datetime.now())
+    except Exception as e:
+        print(f"Error running report job {job_id} ({report}): {str(e)}")
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+        try:
+            _update_job(job_id, status='failed', error=str(e), finished_at=datetime.now())
+        except Exception as update_error:
+            print(f"Error recording report job failure: {str(update_error)}")
+    finally:
+        _local.job = None
+
+def _job_status(job):
+    status = {
+        'job_id': job['id'],
+        'report': job['report'],
+        'status': job['status'],
+        'rows_done': job['rows_done'],
+        'error': job['error'],
+        'created_at': job['created_at'].isoformat() if job['created_at'] else None,
+        'started_at': job['started_at'].isoformat() if job['started_at'] else None,
+        'finished_at': job['finished_at'].isoformat() if job['finished_at'] else None,
+        'status_url': url_for('report_jobs.job_status', job_id=job['id']),
+    }
+    if job['status'] == 'done':
+        status['download_url'] = url_for('report_jobs.download_job', job_id=job['id'])
+    return status
+
+@report_jobs_bp.route('/reports/<report>/submit', methods=['GET', 'POST'])
+def submit(report):
+    """Queue a report with the query-string filters; returns the job as JSON"""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Login required'}), 401
+    if report not in REPORTS:
+        return jsonify({'error': f"Unknown report {report}"}), 404
+    try:
+        job = submit_report(report)
+        return jsonify(_job_status(job)), 202 if job['status'] != 'done' else 200
+    except Exception as e:
+        print(f"Error submitting report job: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@report_jobs_bp.route('/reports/jobs/<job_id>')
+def job_status(job_id):
+    """Status and progress of a report job"""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Login required'}), 401
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_status(job))
+
+@report_jobs_bp.route('/reports/jobs/<job_id>/download')
+def download_job(job_id):
+    """Finished report file of a job"""
+    if not session.get('logged_in'):
+        return jsonify({'error': 'Login required'}), 401
+    job = get_job(job_id)
+    if job is None or job['status'] != 'done' or not job['file_path'] or not os.path.exists(job['file_path']):
+        return jsonify({'error': 'Report file not available'}), 404
+    return send_file(
+        os.path.abspath(job['file_path']),
+        as_attachment=True,
+        download_name=job['filename'],
+        mimetype=job['mimetype']
+    )
@@ -0,0 +1,306 @@
+"""Pre-aggregated master_data summaries for the dashboard tiles and hours reports.
+
+master_data_rollup holds one row per (fiscal year, month, factory, training, PMO category,
+PL category, employee group, gender) cell with its participant count and learning hours. Both
+are additive, so they can be summed across cells; distinct counts (unique learners, programs)
+are not stored and still come from master_data.
+
+employee_hours is the learning-hours ledger of permanent employees: SHE, PMO and total hours
+per (per_no, fiscal year, factory, PMO category), so the 16-hour / SHE 6+ / PMO 10+ tiles are
+counts over the ledger instead of a walk over every training record.
+
+Writers add the rows they write to their cells as deltas, in the same transaction as their
+master_data change (see add_to_rollup and add_to_employee_hours). A delta is an upsert on the
+row's unique key and only reads the writer's own rows, so concurrent attendance saves for one
+program serialize on the summary row instead of locking each other's master_data rows and
+deadlocking.
+`python rollups.py` rebuilds both tables, and recreates them when their schema is outdated.
+"""
+import threading
+import time
+
+from db_migrations import _index_ddl
+from utils import get_db_connection
+
+ROLLUP_TABLE = 'master_data_rollup'
+EMPLOYEE_HOURS_TABLE = 'employee_hours'
+
+ROLLUP_DIMENSIONS = ('fiscal_year', 'calendar_month', 'factory', 'training_name',
+                     'pmo_training_category', 'pl_category', 'employee_group', 'gender')
+
+# Unique key of a summary row. Dimensions can be NULL, which a plain UNIQUE key would treat as
+# distinct, so the key is a hash over all of them with NULLs kept apart from ''.
+SUMMARY_KEY_COLUMN = 'cell_key'
+
+# Temporary table uploads are staged in, so their summary deltas are computed from the new
+# rows alone
+UPLOAD_STAGING_TABLE = 'master_data_upload'
+
+# Secondary indexes on the rollup; the dashboard always filters by fiscal year
+ROLLUP_INDEXES = [
+    ('idx_rollup_fy_factory_group', ('fiscal_year', 'factory', 'employee_group')),
+    ('idx_rollup_fy_training', ('fiscal_year', 'training_name')),
+]
+
+# Dashboard filters that only touch master_data columns that are not rollup dimensions;
+# any of these being set means the query has to read master_data
+ROW_LEVEL_FILTER_KEYS = ('per_no', 'bc_no', 'month_report_pmo_21_20', 'month_cd_key_26_25',
+                         'tni_status', 'start_date', 'end_date')
+
+EMPLOYEE_HOURS_DIMENSIONS = ('per_no', 'fiscal_year', 'factory', 'pmo_training_category')
+# Employee details carried on each ledger row for the hours reports
+EMPLOYEE_HOURS_DETAILS = ('participants_name', 'bc_no', 'gender', 'employee_group', 'department')
+
+EMPLOYEE_HOURS_INDEXES = [
+    ('idx_employee_hours_fy_factory', ('fiscal_year', 'factory', 'per_no')),
+    ('idx_employee_hours_per_no', ('per_no', 'fiscal_year')),
+]
+
+# Hours filters the ledger cannot answer: anything finer than employee / fiscal year /
+# factory / PMO category
+LEDGER_ROW_LEVEL_FILTER_KEYS = ('bc_no', 'calendar_month', 'month_report_pmo_21_20', 'month_cd_key_26_25',
+                                'tni_status', 'training_name', 'start_date', 'end_date',
+                                'month_range_start', 'month_range_end')
+
+SHE_CATEGORY = 'SHE (Safety+Health)'
+
+ROLLUP_CHECK_INTERVAL = 60  # Seconds before re-checking for a summary table that was missing
+
+# SQL form of view_master_data.calculate_learning_hours(); program_hours is learning_hours,
+# as in build_base_query
+LEARNING_HOURS_SQL = """
+    CASE
+        WHEN learning_hours IS NOT NULL AND learning_hours != '' AND learning_hours != 0
+            THEN TRUNCATE(learning_hours, 0)
+        WHEN COALESCE(learning_hours, 0) <= 8
+            THEN IF(day_1_attendance, COALESCE(learning_hours, 0), 0)
+        ELSE LEAST(
+            (IF(day_1_attendance, 1, 0) + IF(day_2_attendance, 1, 0) + IF(day_3_attendance, 1, 0)) * 8,
+            learning_hours
+        )
+    END
+"""
+
+_DIMENSION_COLUMNS = ', '.join(ROLLUP_DIMENSIONS)
+
+_ROLLUP_MEASURES = f"""
+    COUNT(id) as participant_count,
+    COALESCE(SUM({LEARNING_HOURS_SQL}), 0) as learning_hours
+"""
+
+_EMPLOYEE_HOURS_COLUMNS = ', '.join(EMPLOYEE_HOURS_DIMENSIONS + EMPLOYEE_HOURS_DETAILS)
+
+def _employee_hours_select(source_table, scale=''):
+    """Ledger rows of the permanent employees in `source_table`, hours prefixed by `scale`"""
+    return f"""
+        SELECT {', '.join(EMPLOYEE_HOURS_DIMENSIONS)},
+            {', '.join(f"MAX({column}) as {column}" for column in EMPLOYEE_HOURS_DETAILS)},
+            {scale}COALESCE(SUM(CASE WHEN pmo_training_category = '{SHE_CATEGORY}' THEN {LEARNING_HOURS_SQL} ELSE 0 END), 0) as she_hours,
+            {scale}COALESCE(SUM(CASE WHEN pmo_training_category = '{SHE_CATEGORY}' THEN 0 ELSE {LEARNING_HOURS_SQL} END), 0) as pmo_hours,
+            {scale}COALESCE(SUM({LEARNING_HOURS_SQL}), 0) as total_hours
+        FROM {source_table}
+        WHERE employee_group = 'PERMANENT' AND per_no IS NOT NULL AND per_no != ''
+    """
+
+_available = {}
+_available_lock = threading.Lock()
+
+def summary_table_available(table, cursor=None):
+    """True once `table` exists; a missing table is re-checked every ROLLUP_CHECK_INTERVAL.
+
+    Writers pass their `cursor`: they re-check a missing table on every write, so a table
+    created by `python rollups.py` while the app runs never misses a delta.
+    """
+    with _available_lock:
+        value, checked_at = _available.get(table, (False, 0.0))
+        if value or (cursor is None and time.monotonic() - checked_at < ROLLUP_CHECK_INTERVAL):
+            return value
+
+    available = False
+    if cursor is not None:
+        cursor.execute("SHOW TABLES LIKE %s", (table,))
+        available = cursor.fetchone() is not None
+    else:
+        try:
+            conn = get_db_connection()
+            try:
+                with conn.cursor() as check_cursor:
+                    check_cursor.execute("SHOW TABLES LIKE %s", (table,))
+                    available = check_cursor.fetchone() is not None
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"Error checking summary table {table}: {str(e)}")
+
+    with _available_lock:
+        _available[table] = (available, time.monotonic())
+    return available
+
+def rollups_available(cursor=None):
+    return summary_table_available(ROLLUP_TABLE, cursor)
+
+def employee_hours_available(cursor=None):
+    return summary_table_available(EMPLOYEE_HOURS_TABLE, cursor)
+
+def rollup_supports(filters, group_by=None):
+    """Whether a master_data aggregate with these filters and grouping can be read from the rollup"""
+    if any(filters.get(key) for key in ROW_LEVEL_FILTER_KEYS):
+        return False
+    if any(column not in ROLLUP_DIMENSIONS for column in (group_by or [])):
+        return False
+    return rollups_available()
+
+def add_to_rollup(cursor, source_table, where_sql, params, sign=1):
+    """Add the rows of `source_table` matched by `where_sql` to their rollup cells, or take
+    them out with sign=-1; run inside the writer's transaction.
+
+    `source_table` is master_data (with `where_sql` selecting the writer's own, already locked
+    rows by id) or an upload staging table with master_data's structure. A row whose
+    dimensions change is taken out before the change and added back after it. A cell left
+    with no rows keeps participant_count = 0 until the next rebuild; readers skip such cells.
+    """
+    if not rollups_available(cursor):
+        return
+    cursor.execute(
+        f"INSERT INTO {ROLLUP_TABLE} ({_DIMENSION_COLUMNS}, participant_count, learning_hours) "
+        f"SELECT {_DIMENSION_COLUMNS}, %s * COUNT(id), %s * COALESCE(SUM({LEARNING_HOURS_SQL}), 0) "
+        f"FROM {source_table} WHERE {where_sql} GROUP BY {_DIMENSION_COLUMNS} "
+        f"ON DUPLICATE KEY UPDATE "
+        f"participant_count = {ROLLUP_TABLE}.participant_count + VALUES(participant_count), "
+        f"learning_hours = {ROLLUP_TABLE}.learning_hours + VALUES(learning_hours)",
+        [sign, sign] + list(params)
+    )
+
+def add_to_employee_hours(cursor, source_table, where_sql, params, sign=1):
+    """Add the hours of the rows of `source_table` matched by `where_sql` to their employees'
+    ledger rows, or take them out with sign=-1; same contract as add_to_rollup()"""
+    if not employee_hours_available(cursor):
+        return
+    details = ', '.join(f"{column} = COALESCE(VALUES({column}), {EMPLOYEE_HOURS_TABLE}.{column})"
+                        for column in EMPLOYEE_HOURS_DETAILS)
+    hours = ', '.join(f"{column} = {EMPLOYEE_HOURS_TABLE}.{column} + VALUES({column})"
+                      for column in ('she_hours', 'pmo_hours', 'total_hours'))
+    cursor.execute(
+        f"INSERT INTO {EMPLOYEE_HOURS_TABLE} ({_EMPLOYEE_HOURS_COLUMNS}, she_hours, pmo_hours, total_hours) "
+        f"{_employee_hours_select(source_table, '%s * ')} AND ({where_sql}) "
+        f"GROUP BY {', '.join(EMPLOYEE_HOURS_DIMENSIONS)} "
+        f"ON DUPLICATE KEY UPDATE {details}, {hours}",
+        [sign, sign, sign] + list(params)
+    )
+
+def insert_master_data(cursor, columns, values_list):
+    """Insert uploaded rows into master_data and add them to the summaries; run inside the
+    writer's transaction.
+
+    The rows are staged in a temporary copy of master_data first, so the summary deltas read
+    only the new rows and no existing master_data row is locked for the rest of the upload.
+    """
+    columns_sql = ', '.join(columns)
+    cursor.execute(f"CREATE TEMPORARY TABLE {UPLOAD_STAGING_TABLE} LIKE master_data")
+    try:
+        cursor.executemany(
+            f"INSERT INTO {UPLOAD_STAGING_TABLE} ({columns_sql}) VALUES ({', '.join(['%s'] * len(columns))})",
+            values_list
+        )
+        cursor.execute(
+            f"INSERT INTO master_data ({columns_sql}) SELECT {columns_sql} FROM {UPLOAD_STAGING_TABLE} ORDER BY id"
+        )
+        add_to_rollup(cursor, UPLOAD_STAGING_TABLE, "1=1", ())
+        add_to_employee_hours(cursor, UPLOAD_STAGING_TABLE, "1=1", ())
+    finally:
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {UPLOAD_STAGING_TABLE}")
+
+def ledger_supports(filters):
+    """Whether per-employee hours for these filters can be read from the employee_hours ledger"""
+    if any(filters.get(key) for key in LEDGER_ROW_LEVEL_FILTER_KEYS):
+        return False
+    if any(filters.get(key) not in (None, '', 'All') for key in ('gender', 'pl_category')):
+        return False
+    return employee_hours_available()
+
+def _create_summary_table(cursor, table, measures_sql, source_columns, key_columns, indexes):
+    # Columns taken from master_data are copied with CREATE ... SELECT so types and collations
+    # (and therefore filter comparisons) match the source table exactly
+    cursor.execute(f"""
+        CREATE TABLE {table} (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            {measures_sql}
+        ) SELECT {source_columns} FROM master_data WHERE 1=0
+    """)
+    cursor.execute(f"""
+        ALTER TABLE {table}
+            ADD COLUMN {SUMMARY_KEY_COLUMN} CHAR(64) GENERATED ALWAYS AS
+                (SHA2(JSON_ARRAY({', '.join(key_columns)}), 256)) STORED,
+            ADD UNIQUE KEY uq_{table}_{SUMMARY_KEY_COLUMN} ({SUMMARY_KEY_COLUMN})
+    """)
+    for name, columns in indexes:
+        cursor.execute(_index_ddl(cursor, table, name, columns))
+
+def _summary_table_current(cursor, table):
+    """Whether `table` has the unique key the writers' delta upserts rely on"""
+    cursor.execute(f"SHOW COLUMNS FROM {table} LIKE %s", (SUMMARY_KEY_COLUMN,))
+    return cursor.fetchone() is not None
+
+def _rebuild_summary_table(table, create, insert_sql):
+    """Create `table` if needed and recompute it in one transaction.
+
+    Readers keep seeing the previous contents until the commit; concurrent writers wait on the
+    summary rows and add their deltas after it. A table from before the unique key existed is
+    dropped and created again. Returns the number of rows written.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW TABLES LIKE %s", (table,))
+            exists = cursor.fetchone() is not None
+            if exists and not _summary_table_current(cursor, table):
+                print(f"Recreating {table} with its unique key")
+                cursor.execute(f"DROP TABLE {table}")
+                exists = False
+            if not exists:
+                print(f"Creating {table}")
+                create(cursor)
+
+            conn.begin()
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(insert_sql)
+            rows = cursor.rowcount
+            conn.commit()
+
+        with _available_lock:
+            _available[table] = (True, time.monotonic())
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def rebuild_rollups():
+    """Rebuild master_data_rollup; returns the number of cells written"""
+    return _rebuild_summary_table(
+        ROLLUP_TABLE,
+        lambda cursor: _create_summary_table(cursor, ROLLUP_TABLE, """
+            participant_count INT NOT NULL DEFAULT 0,
+            learning_hours DECIMAL(14, 2) NOT NULL DEFAULT 0
+        """, _DIMENSION_COLUMNS, ROLLUP_DIMENSIONS, ROLLUP_INDEXES),
+        f"INSERT INTO {ROLLUP_TABLE} ({_DIMENSION_COLUMNS}, participant_count, learning_hours) "
+        f"SELECT {_DIMENSION_COLUMNS}, {_ROLLUP_MEASURES} FROM master_data GROUP BY {_DIMENSION_COLUMNS}"
+    )
+
+def rebuild_employee_hours():
+    """Rebuild the employee_hours ledger; returns the number of ledger rows written"""
+    return _rebuild_summary_table(
+        EMPLOYEE_HOURS_TABLE,
+        lambda cursor: _create_summary_table(cursor, EMPLOYEE_HOURS_TABLE, """
+            she_hours DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            pmo_hours DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            total_hours DECIMAL(12, 2) NOT NULL DEFAULT 0
+        """, _EMPLOYEE_HOURS_COLUMNS, EMPLOYEE_HOURS_DIMENSIONS, EMPLOYEE_HOURS_INDEXES),
+        f"INSERT INTO {EMPLOYEE_HOURS_TABLE} ({_EMPLOYEE_HOURS_COLUMNS}, she_hours, pmo_hours, total_hours) "
+        f"{_employee_hours_select('master_data')} GROUP BY {', '.join(EMPLOYEE_HOURS_DIMENSIONS)}"
+    )
+
+if __name__ == '__main__':
+    print(f"Rebuilt {ROLLUP_TABLE}: {rebuild_rollups()} cell(s)")
+    print(f"Rebuilt {EMPLOYEE_HOURS_TABLE}: {rebuild_employee_hours()} row(s)")
@@ -0,0 +1,373 @@
+"""Table-driven downloads for the user_technician program tables.
+
+Each table is described once in EXPORT_SPECS: the headings written (in order), how the
+download's query-string filters map onto columns, the progress tabs some pages offer, and the
+few value formats that differ from the raw column. Rows are selected with the column list from
+cd_data_store.TABLE_CONFIGS and streamed from a server-side cursor into the export writer, so
+even the FST and induction tables download in constant memory.
+
+Filter matches:
+    'equals'         column = value, unless the value is 'all' (the default)
+    'number'         as 'equals', with the value compared as a number
+    'academic_year'  joining-year column = first part of '2023/24'
+    'contains'       column LIKE %value%, when given
+    'from' / 'to'    column >= / <= value, when given
+"""
+from datetime import date, datetime
+
+import pandas as pd
+
+from cd_data_store import TABLE_CONFIGS
+from exports import export_response, stream_query
+
+RESULT_PENDING_VALUES = "('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')"
+
+def _result_pending(column):
+    return f"({column} IS NULL OR {column} = '' OR {column} IN {RESULT_PENDING_VALUES})"
+
+def _stage_pending(previous_column, column):
+    """Passed or failed the previous stage, still waiting on this one"""
+    return f"({previous_column} IN ('Pass', 'Fail') AND {_result_pending(column)})"
+
+EXPORT_SPECS = {
+    'induction': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('ticket_no', 'Ticket No'), ('name', 'Name'), ('gender', 'Gender'),
+            ('employee_category', 'Employee Category'), ('plant_location', 'Plant Location'),
+            ('joined_year', 'Academic Year'), ('date_from', 'Date From'), ('date_to', 'Date To'),
+            ('shift', 'Shift'), ('learning_hours', 'Learning Hours'), ('training_name', 'Training Name'),
+            ('batch_number', 'Batch Number'), ('training_venue_name', 'Training Venue Name'),
+            ('faculty_name', 'Faculty Name'), ('subject_name', 'Subject Name'), ('remark', 'Remark'),
+        ],
+        'filters': [
+            ('plant', 'plant_location', 'equals'),
+            ('batch', 'batch_number', 'equals'),
+            ('hours', 'learning_hours', 'number'),
+            ('gender', 'gender', 'equals'),
+            ('category', 'employee_category', 'equals'),
+            ('academic_year', 'joined_year', 'academic_year'),
+            ('faculty', 'faculty_name', 'equals'),
+            ('shift', 'shift', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+            ('startDate', 'date_from', 'from'),
+            ('endDate', 'date_to', 'to'),
+        ],
+        'formats': {'joined_year': 'academic_year', 'date_from': 'date', 'date_to': 'date', 'learning_hours': 'integer'},
+        'filename': 'induction_data',
+    },
+    'fst': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('ticket_no', 'Ticket No'), ('name', 'Name'), ('gender', 'Gender'),
+            ('employee_category', 'Employee Category'), ('plant_location', 'Plant Location'),
+            ('joined_year', 'Academic Year'), ('date_from', 'Date From'), ('date_to', 'Date To'),
+            ('shift', 'Shift'), ('learning_hours', 'Learning Hours'), ('training_name', 'Training Name'),
+            ('batch_number', 'Batch Number'), ('training_venue_name', 'Training Venue Name'),
+            ('faculty_name', 'Faculty Name'), ('fst_cell_name', 'FST Cell Name'), ('remark', 'Remark'),
+        ],
+        'filters': [
+            ('plant', 'plant_location', 'equals'),
+            ('batch', 'batch_number', 'equals'),
+            ('hours', 'learning_hours', 'equals'),
+            ('gender', 'gender', 'equals'),
+            ('category', 'employee_category', 'equals'),
+            ('academic_year', 'joined_year', 'academic_year'),
+            ('faculty', 'faculty_name', 'equals'),
+            ('shift', 'shift', 'equals'),
+            ('fst_cell', 'fst_cell_name', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+            ('startDate', 'date_from', 'from'),
+            ('endDate', 'date_to', 'to'),
+        ],
+        'formats': {'joined_year': 'academic_year', 'date_from': 'date', 'date_to': 'date'},
+        'filename': 'fst_data',
+    },
+    'pragati': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('ticket_no', 'Ticket No'), ('name', 'Name'), ('gender', 'Gender'),
+            ('employee_category', 'Employee Category'), ('factory', 'Factory'),
+            ('course_joining_year', 'Course Joining Year'), ('date_of_joining', 'Date of Joining'),
+            ('pragati_batch_number', 'Pragati Batch No'), ('diploma_name', 'Diploma Name'),
+            ('first_year_result', '1st Year Result'), ('second_year_result', '2nd Year Result'),
+            ('final_result', 'Final Result'), ('training_name', 'Training Name'), ('remark', 'Remark'),
+        ],
+        'filters': [
+            ('factory', 'factory', 'equals'),
+            ('batch', 'pragati_batch_number', 'equals'),
+            ('diploma', 'diploma_name', 'equals'),
+            ('gender', 'gender', 'equals'),
+            ('category', 'employee_category', 'equals'),
+            ('course_year', 'course_joining_year', 'equals'),
+            ('final_result', 'final_result', 'equals'),
+            ('training', 'training_name', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+            ('startDate', 'date_of_joining', 'from'),
+            ('endDate', 'date_of_joining', 'to'),
+        ],
+        'tabs': {
+            # Final result not yet declared
+            'live': "(final_result IS NULL OR final_result = '')",
+            # All three result columns empty
+            'first-year': "(first_year_result IS NULL OR first_year_result = '') "
+                          "AND (second_year_result IS NULL OR second_year_result = '') "
+                          "AND (final_result IS NULL OR final_result = '')",
+            # First year result filled, second and final empty
+            'second-year': "(first_year_result IS NOT NULL AND first_year_result != '') "
+                           "AND (second_year_result IS NULL OR second_year_result = '') "
+                           "AND (final_result IS NULL OR final_result = '')",
+        },
+        'formats': {'date_of_joining': 'date'},
+        'filename': 'pragati_data',
+    },
+    'fta': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('ticket_no', 'Ticket No'), ('name', 'Name'), ('gender', 'Gender'),
+            ('joining_year', 'Academic Year'), ('date_of_joining', 'Date of Joining'),
+            ('fta_batch_number', 'FTA Batch Number'), ('date_of_separation', 'Date of Separation'),
+            ('trade', 'Trade'), ('all_women_batch', 'All Women Batch'),
+            ('second_year_inplant_shop', 'Second Year Implant Shop'), ('faculty_name', 'Faculty Name'),
+            ('final_result', 'Final Result'), ('training_name', 'Training Name'),
+        ],
+        'filters': [
+            ('gender', 'gender', 'equals'),
+            ('academic_year', 'joining_year', 'academic_year'),
+            ('faculty', 'faculty_name', 'equals'),
+            ('fta_batch', 'fta_batch_number', 'equals'),
+            ('trade', 'trade', 'equals'),
+            ('all_women_batch', 'all_women_batch', 'equals'),
+            ('second_year_inplant', 'second_year_inplant_shop', 'equals'),
+            ('final_result', 'final_result', 'equals'),
+            ('training_name', 'training_name', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+            ('startDate', 'date_of_joining', 'from'),
+            ('endDate', 'date_of_separation', 'to'),
+        ],
+        'formats': {'joining_year': 'academic_year', 'date_of_joining': 'date', 'date_of_separation': 'date'},
+        'filename': 'fta_data',
+    },
+    'jta': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('ticket_no', 'Ticket No'), ('name', 'Name'), ('gender', 'Gender'),
+            ('joining_year', 'Academic Year'), ('date_of_joining', 'Date of Joining'),
+            ('jta_batch_number', 'JTA Batch Number'), ('date_of_separation', 'Date of Separation'),
+            ('trade', 'Trade'), ('final_result', 'Final Result'), ('training_name', 'Training Name'),
+            ('employee_category', 'Employee Category'), ('status', 'Status'),
+        ],
+        'filters': [
+            ('gender', 'gender', 'equals'),
+            ('academic_year', 'joining_year', 'academic_year'),
+            ('jta_batch', 'jta_batch_number', 'equals'),
+            ('trade', 'trade', 'equals'),
+            ('final_result', 'final_result', 'equals'),
+            ('training_name', 'training_name', 'equals'),
+            ('employee_category', 'employee_category', 'equals'),
+            ('status', 'status', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+            ('startDate', 'date_of_joining', 'from'),
+            ('endDate', 'date_of_separation', 'to'),
+        ],
+        'formats': {'joining_year': 'academic_year', 'date_of_joining': 'date', 'date_of_separation': 'date'},
+        'filename': 'jta_data',
+    },
+    'ta': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('ticket_no', 'Ticket No'), ('name', 'Name'), ('gender', 'Gender'),
+            ('joining_year', 'Academic Year'), ('date_of_joining', 'Date of Joining'),
+            ('ta_batch_number', 'TA Batch Number'), ('date_of_separation', 'Date of Separation'),
+            ('trade', 'Trade'), ('final_result', 'Final Result'), ('training_name', 'Training Name'),
+        ],
+        'filters': [
+            ('gender', 'gender', 'equals'),
+            ('academic_year', 'joining_year', 'academic_year'),
+            ('ta_batch', 'ta_batch_number', 'equals'),
+            ('trade', 'trade', 'equals'),
+            ('final_result', 'final_result', 'equals'),
+            ('training_name', 'training_name', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+            ('startDate', 'date_of_joining', 'from'),
+            ('endDate', 'date_of_separation', 'to'),
+        ],
+        'formats': {'joining_year': 'academic_year', 'date_of_joining': 'date', 'date_of_separation': 'date'},
+        'filename': 'ta_data',
+    },
+    'kaushalya': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('ticket_no', 'Ticket No'), ('name', 'Name'), ('gender', 'Gender'),
+            ('joining_year', 'Joining Year'), ('date_of_joining', 'Date of Joining'),
+            ('kaushalya_batch_no', 'Kaushalya Batch No'), ('trade', 'Trade'), ('dei_batch', 'DEI Batch'),
+            ('sem_1_pass_fail', 'Sem 1 Pass/Fail'), ('sem_2_pass_fail', 'Sem 2 Pass/Fail'),
+            ('sem_3_pass_fail', 'Sem 3 Pass/Fail'), ('sem_4_pass_fail', 'Sem 4 Pass/Fail'),
+            ('sem_5_pass_fail', 'Sem 5 Pass/Fail'), ('sem_6_pass_fail', 'Sem 6 Pass/Fail'),
+            ('final_result', 'Final Result'), ('placement_drive', 'Placement Drive'),
+            ('training_name', 'Training Name'), ('remark', 'Remark'),
+        ],
+        'filters': [
+            ('trade', 'trade', 'equals'),
+            ('batch', 'kaushalya_batch_no', 'equals'),
+            ('gender', 'gender', 'equals'),
+            ('dei_batch', 'dei_batch', 'equals'),
+            ('joining_year', 'joining_year', 'equals'),
+            ('final_result', 'final_result', 'equals'),
+            ('training', 'training_name', 'equals'),
+            ('placement_drive', 'placement_drive', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+            ('startDate', 'date_of_joining', 'from'),
+            ('endDate', 'date_of_joining', 'to'),
+        ],
+        'tabs': {
+            'live': _result_pending('final_result'),
+            'sem1': _result_pending('sem_1_pass_fail'),
+            'sem2': _stage_pending('sem_1_pass_fail', 'sem_2_pass_fail'),
+            'sem3': _stage_pending('sem_2_pass_fail', 'sem_3_pass_fail'),
+            'sem4': _stage_pending('sem_3_pass_fail', 'sem_4_pass_fail'),
+            'sem5': _stage_pending('sem_4_pass_fail', 'sem_5_pass_fail'),
+            'sem6': _stage_pending('sem_5_pass_fail', 'sem_6_pass_fail'),
+        },
+        'formats': {'date_of_joining': 'date'},
+        'filename': 'kaushalya_data',
+    },
+    'live_trainer': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('faculty_name', 'Faculty Name'), ('ticket_no', 'Ticket No'),
+            ('mail_id', 'Mail ID'), ('mobile_number', 'Mobile Number'), ('area', 'Area'),
+            ('dept', 'Department'), ('factory', 'Factory'),
+            ('reporting_manager_name', 'Reporting Manager Name'),
+            ('reporting_manager_mail_id', 'Reporting Manager Mail ID'),
+            ('expertise_area', 'Expertise Area'), ('expertise_category', 'Expertise Category'),
+            ('hr_coordinator_name', 'HR Coordinator Name'), ('remark', 'Remark'),
+        ],
+        'filters': [
+            ('area', 'area', 'equals'),
+            ('department', 'dept', 'equals'),
+            ('factory', 'factory', 'equals'),
+            ('expertise_area', 'expertise_area', 'equals'),
+            ('expertise_category', 'expertise_category', 'equals'),
+            ('faculty', 'faculty_name', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+        ],
+        'formats': {},
+        'filename': 'live_trainer_data',
+    },
+    'lakshya': {
+        'headings': [
+            ('sr_no', 'Sr No'), ('ticket_no', 'Ticket No'), ('name', 'Name'), ('gender', 'Gender'),
+            ('course_joining_year', 'Course Joining Year'), ('date_of_joining', 'Date of Joining'),
+            ('date_of_separation', 'Date of Separation'), ('lakshya_batch_no', 'Lakshya Batch No'),
+            ('diploma_name', 'Diploma Name'), ('diploma_trainee_inplant_shop', 'Diploma Trainee Inplant Shop'),
+            ('semester_1_pass_fail', 'Semester 1 Pass/Fail'), ('semester_2_pass_fail', 'Semester 2 Pass/Fail'),
+            ('second_year_pass_fail', 'Second Year Pass/Fail'), ('third_year_pass_fail', 'Third Year Pass/Fail'),
+            ('fourth_year_pass_fail', 'Fourth Year Pass/Fail'), ('final_result', 'Final Result'),
+            ('training_name', 'Training Name'), ('remark', 'Remark'),
+        ],
+        'filters': [
+            ('diploma', 'diploma_name', 'equals'),
+            ('batch', 'lakshya_batch_no', 'equals'),
+            ('gender', 'gender', 'equals'),
+            ('inplant_shop', 'diploma_trainee_inplant_shop', 'equals'),
+            ('joining_year', 'course_joining_year', 'equals'),
+            ('final_result', 'final_result', 'equals'),
+            ('training', 'training_name', 'equals'),
+            ('ticket', 'ticket_no', 'contains'),
+            ('startDate', 'date_of_joining', 'from'),
+            ('endDate', 'date_of_joining', 'to'),
+        ],
+        'tabs': {
+            'live': _result_pending('final_result'),
+            'sem1': _result_pending('semester_1_pass_fail'),
+            'sem2': _stage_pending('semester_1_pass_fail', 'semester_2_pass_fail'),
+            'year2': _stage_pending('semester_2_pass_fail', 'second_year_pass_fail'),
+            'year3': _stage_pending('second_year_pass_fail', 'third_year_pass_fail'),
+            'year4': _stage_pending('third_year_pass_fail', 'fourth_year_pass_fail'),
+        },
+        'formats': {'date_of_joining': 'date', 'date_of_separation': 'date'},
+        'filename': 'lakshya_data',
+    },
+}
+
+def build_export_query(table, args):
+    """SELECT of the table's configured columns with the download filters in `args` applied"""
+    spec = EXPORT_SPECS[table]
+    conditions = []
+    params = []
+    for arg, column, match in spec['filters']:
+        if match in ('contains', 'from', 'to'):
+            value = args.get(arg, '')
+            if not value:
+                continue
+        else:
+            value = args.get(arg, 'all')
+            if value == 'all':
+                continue
+
+        if match == 'contains':
+            conditions.append(f"{column} LIKE %s")
+            params.append(f"%{value}%")
+        elif match == 'from':
+            conditions.append(f"{column} >= %s")
+            params.append(value)
+        elif match == 'to':
+            conditions.append(f"{column} <= %s")
+            params.append(value)
+        elif match == 'number':
+            conditions.append(f"{column} = %s")
+            params.append(float(value))
+        elif match == 'academic_year':
+            conditions.append(f"{column} = %s")
+            params.append(value.split('/')[0])
+        else:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+
+    tab_condition = spec.get('tabs', {}).get(args.get('tab', 'overall'))
+    if tab_condition:
+        conditions.append(tab_condition)
+
+    where_clause = " AND ".join(conditions) if conditions else "1=1"
+    columns = ', '.join(TABLE_CONFIGS[table]['columns'])
+    return f"SELECT {columns} FROM {table} WHERE {where_clause} ORDER BY sr_no DESC", params
+
+def _format_date(value):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    try:
+        return pd.to_datetime(value).strftime('%Y-%m-%d')
+    except (ValueError, TypeError):
+        return str(value)
+
+def _format_academic_year(value):
+    """2023 -> '2023/24'"""
+    if value is None or value == '':
+        return ''
+    try:
+        year = int(value)
+    except (ValueError, TypeError):
+        return str(value)
+    return f"{year}/{str(year + 1)[2:]}"
+
+def _format_integer(value):
+    return int(float(value)) if value is not None and value != '' else 0
+
+FORMATTERS = {
+    'date': _format_date,
+    'academic_year': _format_academic_year,
+    'integer': _format_integer,
+}
+
+def iter_export_records(table, rows):
+    """Apply the table's value formats to each row; NULLs are written as empty cells"""
+    formats = [(column, FORMATTERS[kind]) for column, kind in EXPORT_SPECS[table]['formats'].items()]
+    for row in rows:
+        record = {key: ('' if value is None else value) for key, value in row.items()}
+        for column, formatter in formats:
+            record[column] = formatter(row.get(column))
+        yield record
+
+def export_table(table, args, export_format='xlsx'):
+    """Download response for `table` filtered by the query-string `args`"""
+    spec = EXPORT_SPECS[table]
+    query, params = build_export_query(table, args)
+    records = iter_export_records(table, stream_query(query, params))
+    column_headings = dict(spec['headings'])
+    return export_response(records, column_headings, spec['filename'], export_format,
+                           TABLE_CONFIGS[table]['display_name'], as_text=False)
@@ -3,6 +3,7 @@ import pandas as pd
 from datetime import datetime
 from collections import defaultdict
 from utils import Config, get_db_connection  # Removed get_month_index and format_program_dates
+from data_cache import bump_data_version
 
 target_bp = Blueprint('target', __name__, url_prefix='/target')
 
@@ -57,6 +58,7 @@ def initialize_new_year(target_year, conn, source_year=None):
                     batch_size = VALUES(batch_size)
             """, (target_year, source_year))
             conn.commit()
+            bump_data_version('training_targets')
             return True
     except Exception as e:
         print(f"Error initializing new year: {e}")
@@ -92,6 +94,7 @@ def sync_training_data_from_master(target_year, conn):
                 ))
             
             conn.commit()
+            bump_data_version('training_targets')
             return True, f"Synced {len(training_data)} training records"
             
     except Exception as e:
@@ -589,6 +592,7 @@ def edit_data():
                     """, (target, batch_size, ytd_target, ytd_actual, balance, programs_to_run, training_id, target_year))
 
                 conn.commit()
+                bump_data_version('training_targets')
                 flash('Data updated successfully', 'success')
                 return redirect(url_for('target.dashboard', target_year=target_year))
 
@@ -1,26 +1,22 @@
 from flask import Blueprint, render_template, request, current_app, flash, redirect, url_for
 import pandas as pd
-import mysql.connector
+import pymysql.cursors
 import os
 import math
 from werkzeug.utils import secure_filename
 from datetime import datetime
+from utils import get_db_connection
+from data_cache import bump_data_version
 
 tni_shared_bp = Blueprint('training', __name__, template_folder='templates/admin')
 
-# Database configuration
-db_config = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'pratik',
-    'database': 'masterdata',
-    'charset': 'utf8mb4',
-    'collation': 'utf8mb4_bin'
-}
+def get_tni_connection():
+    """Pooled connection returning tuple rows, as the TNI queries unpack them positionally"""
+    return get_db_connection(pymysql.cursors.Cursor)
 
 def get_available_years():
     """Get all available years from the database"""
-    conn = mysql.connector.connect(**db_config)
+    conn = get_tni_connection()
     try:
         cursor = conn.cursor()
         cursor.execute("""
@@ -37,7 +33,7 @@ def get_available_years():
         conn.close()
 
 def create_final_tni_data_table():
-    conn = mysql.connector.connect(**db_config)
+    conn = get_tni_connection()
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -62,7 +58,7 @@ def process_training_data(year=None):
     if year is None:
         year = datetime.now().year
     
-    conn = mysql.connector.connect(**db_config)
+    conn = get_tni_connection()
     cursor = conn.cursor()
     
     try:
@@ -240,13 +236,15 @@ def process_training_data(year=None):
         print(f"Final grand total: {grand_total}")
         
     finally:
+        # Committed per training as it goes, so invalidate even if a later step failed
+        bump_data_version('final_tni_data')
         cursor.close()
         conn.close()
 def get_training_summary(year=None):
     if year is None:
         year = datetime.now().year
     
-    conn = mysql.connector.connect(**db_config)
+    conn = get_tni_connection()
     
     try:
         query = """
@@ -307,7 +305,7 @@ def get_final_factory_summary(year=None):
     if year is None:
         year = datetime.now().year
     
-    conn = mysql.connector.connect(**db_config)
+    conn = get_tni_connection()
     
     try:
         training_query = """
@@ -350,7 +348,7 @@ def get_original_factory_summary(year=None):
     if year is None:
         year = datetime.now().year
     
-    conn = mysql.connector.connect(**db_config)
+    conn = get_tni_connection()
     
     try:
         training_query = """
@@ -461,9 +459,12 @@ def upload_and_summary():
 
 
             # Store in database
-            conn = mysql.connector.connect(**db_config)
+            conn = get_tni_connection()
             cursor = conn.cursor()
             
+            # Pooled connections autocommit; keep the delete + reload atomic
+            conn.begin()
+            
             # Delete existing data for this year
             cursor.execute("DELETE FROM tni_data WHERE year = %s", (upload_year,))
             
@@ -477,12 +478,13 @@ def upload_and_summary():
                     row['factory'], 
                     row['bc_no'], 
                     row['training_name'], 
-                    row['hours'],
-                    row['year']
+                    float(row['hours']),
+                    int(row['year'])
                 ))
 
             
             conn.commit()
+            bump_data_version('tni_data')
             cursor.close()
             conn.close()
             
@@ -1,12 +1,22 @@
-from flask import Blueprint, render_template, request, jsonify, send_file
+from flask import Blueprint, render_template, request, jsonify
 from utils import get_db_connection
 import json
-import pandas as pd
-from io import BytesIO
+from cd_data_store import TABLE_CONFIGS
+from exports import get_export_format
+from table_exports import export_table
+from http_cache import conditional_on
 
 # Blueprint definition
 user_tech_bp = Blueprint('user_tech_bp', __name__, url_prefix='/user_tech')
 
+def download_table(table):
+    """Filtered download of a program table as xlsx, or csv with ?format=csv"""
+    try:
+        return export_table(table, request.args, get_export_format(request.args))
+    except Exception as e:
+        print(f"Error generating {TABLE_CONFIGS[table]['display_name']} export: {e}")
+        return jsonify({"error": str(e)}), 500
+
 # Induction Main Page
 @user_tech_bp.route('/induction', methods=['GET'])
 def induction_list():
@@ -26,6 +36,7 @@ def induction_list():
 
 # Induction Filter Options API
 @user_tech_bp.route('/api/induction/filter-options', methods=['GET'])
+@conditional_on('induction')
 def get_filter_options():
     try:
         conn = get_db_connection()
@@ -90,6 +101,7 @@ def get_filter_options():
 
 # Induction Data API
 @user_tech_bp.route('/api/induction/data', methods=['GET'])
+@conditional_on('induction')
 def get_induction_data():
     try:
         # Get filter parameters from request
@@ -247,168 +259,7 @@ def get_induction_data():
 # Induction Download Excel API
 @user_tech_bp.route('/api/induction/download', methods=['GET'])
 def download_induction_data():
-    try:
-        # Get filter parameters from request
-        plant = request.args.get('plant', 'all')
-        batch = request.args.get('batch', 'all')
-        hours = request.args.get('hours', 'all')
-        gender = request.args.get('gender', 'all')
-        category = request.args.get('category', 'all')
-        academic_year = request.args.get('academic_year', 'all')
-        faculty = request.args.get('faculty', 'all')
-        shift = request.args.get('shift', 'all')
-        ticket = request.args.get('ticket', '')
-        start_date = request.args.get('startDate', '')
-        end_date = request.args.get('endDate', '')
-        
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
-            
-            if plant != 'all':
-                where_conditions.append("plant_location = %s")
-                params.append(plant)
-            
-            if batch != 'all':
-                where_conditions.append("batch_number = %s")
-                params.append(batch)
-            
-            if hours != 'all':
-                where_conditions.append("learning_hours = %s")
-                params.append(float(hours))
-            
-            if gender != 'all':
-                where_conditions.append("gender = %s")
-                params.append(gender)
-            
-            if category != 'all':
-                where_conditions.append("employee_category = %s")
-                params.append(category)
-            
-            # Handle academic year filter
-            if academic_year != 'all':
-                base_year = academic_year.split('/')[0]
-                where_conditions.append("joined_year = %s")
-                params.append(base_year)
-            
-            if faculty != 'all':
-                where_conditions.append("faculty_name = %s")
-                params.append(faculty)
-            
-            if shift != 'all':
-                where_conditions.append("shift = %s")
-                params.append(shift)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            if start_date:
-                where_conditions.append("date_from >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                where_conditions.append("date_to <= %s")
-                params.append(end_date)
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM induction WHERE {where_clause} ORDER BY sr_no DESC"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'ticket_no': 'Ticket No',
-                'name': 'Name',
-                'gender': 'Gender',
-                'employee_category': 'Employee Category',
-                'plant_location': 'Plant Location',
-                'date_from': 'Date From',
-                'date_to': 'Date To',
-                'shift': 'Shift',
-                'learning_hours': 'Learning Hours',
-                'training_name': 'Training Name',
-                'batch_number': 'Batch Number',
-                'training_venue_name': 'Training Venue Name',
-                'faculty_name': 'Faculty Name',
-                'subject_name': 'Subject Name',
-                'remark': 'Remark'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Create Academic Year column from joined_year and format it
-            if 'joined_year' in df.columns:
-                df['Academic Year'] = df['joined_year'].apply(
-                    lambda x: f"{int(x)}/{str(int(x)+1)[2:]}" if pd.notnull(x) else ''
-                )
-                # Drop the original joined_year column
-                df = df.drop(columns=['joined_year'])
-            
-            # Format dates
-            date_columns = ['Date From', 'Date To']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            
-            # Convert learning_hours to int
-            if 'Learning Hours' in df.columns:
-                df['Learning Hours'] = df['Learning Hours'].apply(
-                    lambda x: int(x) if pd.notnull(x) else 0
-                )
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Ticket No', 'Name', 'Gender', 'Employee Category', 
-                'Plant Location', 'Academic Year', 'Date From', 
-                'Date To', 'Shift', 'Learning Hours', 'Training Name', 
-                'Batch Number', 'Training Venue Name', 'Faculty Name', 
-                'Subject Name', 'Remark'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Induction Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['Induction Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='induction_data.xlsx'
-            )
-            
-    except Exception as e:
-        print(f"Error generating Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    return download_table('induction')
 
 # FST Main Page
 @user_tech_bp.route('/fst', methods=['GET'])
@@ -429,6 +280,7 @@ def fst_list():
 
 # FST Filter Options API
 @user_tech_bp.route('/api/fst/filter-options', methods=['GET'])
+@conditional_on('fst')
 def get_fst_filter_options():
     try:
         conn = get_db_connection()
@@ -499,6 +351,7 @@ def get_fst_filter_options():
 
 # FST Data API
 @user_tech_bp.route('/api/fst/data', methods=['GET'])
+@conditional_on('fst')
 def get_fst_data():
     try:
         # Get filter parameters from request
@@ -661,167 +514,7 @@ def get_fst_data():
 # FST Download Excel API
 @user_tech_bp.route('/api/fst/download', methods=['GET'])
 def download_fst_data():
-    try:
-        # Get filter parameters from request
-        plant = request.args.get('plant', 'all')
-        batch = request.args.get('batch', 'all')
-        hours = request.args.get('hours', 'all')
-        gender = request.args.get('gender', 'all')
-        category = request.args.get('category', 'all')
-        academic_year = request.args.get('academic_year', 'all')
-        faculty = request.args.get('faculty', 'all')
-        shift = request.args.get('shift', 'all')
-        fst_cell = request.args.get('fst_cell', 'all')
-        ticket = request.args.get('ticket', '')
-        start_date = request.args.get('startDate', '')
-        end_date = request.args.get('endDate', '')
-        
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
-            
-            if plant != 'all':
-                where_conditions.append("plant_location = %s")
-                params.append(plant)
-            
-            if batch != 'all':
-                where_conditions.append("batch_number = %s")
-                params.append(batch)
-            
-            if hours != 'all':
-                where_conditions.append("learning_hours = %s")
-                params.append(hours)
-            
-            if gender != 'all':
-                where_conditions.append("gender = %s")
-                params.append(gender)
-            
-            if category != 'all':
-                where_conditions.append("employee_category = %s")
-                params.append(category)
-            
-            # Handle academic year filter
-            if academic_year != 'all':
-                base_year = academic_year.split('/')[0]
-                where_conditions.append("joined_year = %s")
-                params.append(base_year)
-            
-            if faculty != 'all':
-                where_conditions.append("faculty_name = %s")
-                params.append(faculty)
-            
-            if shift != 'all':
-                where_conditions.append("shift = %s")
-                params.append(shift)
-            
-            if fst_cell != 'all':
-                where_conditions.append("fst_cell_name = %s")
-                params.append(fst_cell)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            if start_date:
-                where_conditions.append("date_from >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                where_conditions.append("date_to <= %s")
-                params.append(end_date)
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM fst WHERE {where_clause} ORDER BY sr_no DESC"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'ticket_no': 'Ticket No',
-                'name': 'Name',
-                'gender': 'Gender',
-                'employee_category': 'Employee Category',
-                'plant_location': 'Plant Location',
-                'date_from': 'Date From',
-                'date_to': 'Date To',
-                'shift': 'Shift',
-                'learning_hours': 'Learning Hours',
-                'training_name': 'Training Name',
-                'batch_number': 'Batch Number',
-                'training_venue_name': 'Training Venue Name',
-                'faculty_name': 'Faculty Name',
-                'fst_cell_name': 'FST Cell Name',
-                'remark': 'Remark'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Create Academic Year column from joined_year and format it
-            if 'joined_year' in df.columns:
-                df['Academic Year'] = df['joined_year'].apply(
-                    lambda x: f"{int(x)}/{str(int(x)+1)[2:]}" if pd.notnull(x) else ''
-                )
-                # Drop the original joined_year column
-                df = df.drop(columns=['joined_year'])
-            
-            # Format dates
-            date_columns = ['Date From', 'Date To']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Ticket No', 'Name', 'Gender', 'Employee Category', 
-                'Plant Location', 'Academic Year', 'Date From', 
-                'Date To', 'Shift', 'Learning Hours', 'Training Name', 
-                'Batch Number', 'Training Venue Name', 'Faculty Name', 
-                'FST Cell Name', 'Remark'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='FST Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['FST Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='fst_data.xlsx'
-            )
-            
-    except Exception as e:
-        print(f"Error generating FST Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    return download_table('fst')
 # Pragati Main Page
 @user_tech_bp.route('/pragati', methods=['GET'])
 def pragati_list():
@@ -841,6 +534,7 @@ def pragati_list():
 
 # Pragati Filter Options API
 @user_tech_bp.route('/api/pragati/filter-options', methods=['GET'])
+@conditional_on('pragati')
 def get_pragati_filter_options():
     try:
         conn = get_db_connection()
@@ -900,6 +594,7 @@ def get_pragati_filter_options():
 
 # Pragati Data API
 @user_tech_bp.route('/api/pragati/data', methods=['GET'])
+@conditional_on('pragati')
 def get_pragati_data():
     try:
         # Get filter parameters from request
@@ -1070,232 +765,70 @@ def get_pragati_data():
 # Pragati Download Excel API
 @user_tech_bp.route('/api/pragati/download', methods=['GET'])
 def download_pragati_data():
+    return download_table('pragati')
+
+import datetime
+
+# FTA Main Page
+@user_tech_bp.route('/fta', methods=['GET'])
+def fta_list():
     try:
-        # Get filter parameters from request
-        factory = request.args.get('factory', 'all')
-        batch = request.args.get('batch', 'all')
-        diploma = request.args.get('diploma', 'all')
-        gender = request.args.get('gender', 'all')
-        category = request.args.get('category', 'all')
-        course_year = request.args.get('course_year', 'all')
-        final_result = request.args.get('final_result', 'all')
-        training = request.args.get('training', 'all')
-        ticket = request.args.get('ticket', '')
-        start_date = request.args.get('startDate', '')
-        end_date = request.args.get('endDate', '')
-        tab = request.args.get('tab', 'overall')
-        
         conn = get_db_connection()
         with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
+            sql = "SELECT * FROM fta ORDER BY sr_no DESC"
+            cursor.execute(sql)
+            fta_data = cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching FTA data: {e}")
+        fta_data = []
+    finally:
+        conn.close()
+
+    return render_template("user/fta.html", fta_data=fta_data)
+
+# FTA Filter Options API
+@user_tech_bp.route('/api/fta/filter-options', methods=['GET'])
+@conditional_on('fta')
+def get_fta_filter_options():
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            # Get unique values for each filter
+            cursor.execute("SELECT DISTINCT gender FROM fta WHERE gender IS NOT NULL ORDER BY gender")
+            genders = [row['gender'] for row in cursor.fetchall()]
             
-            if factory != 'all':
-                where_conditions.append("factory = %s")
-                params.append(factory)
+            # Get distinct academic years from joining_year
+            cursor.execute("SELECT DISTINCT joining_year FROM fta WHERE joining_year IS NOT NULL ORDER BY joining_year")
+            academic_years = []
+            for row in cursor.fetchall():
+                year = row['joining_year']
+                # Format as "YYYY/YY"
+                formatted_year = f"{int(year)}/{str(int(year)+1)[2:]}"
+                academic_years.append(formatted_year)
             
-            if batch != 'all':
-                where_conditions.append("pragati_batch_number = %s")
-                params.append(batch)
+            # Get distinct faculty names
+            cursor.execute("SELECT DISTINCT faculty_name FROM fta WHERE faculty_name IS NOT NULL ORDER BY faculty_name")
+            faculties = [row['faculty_name'] for row in cursor.fetchall()]
             
-            if diploma != 'all':
-                where_conditions.append("diploma_name = %s")
-                params.append(diploma)
+            # Get distinct FTA batch numbers
+            cursor.execute("SELECT DISTINCT fta_batch_number FROM fta WHERE fta_batch_number IS NOT NULL ORDER BY fta_batch_number")
+            fta_batches = [row['fta_batch_number'] for row in cursor.fetchall()]
             
-            if gender != 'all':
-                where_conditions.append("gender = %s")
-                params.append(gender)
+            # Get distinct trades
+            cursor.execute("SELECT DISTINCT trade FROM fta WHERE trade IS NOT NULL ORDER BY trade")
+            trades = [row['trade'] for row in cursor.fetchall()]
             
-            if category != 'all':
-                where_conditions.append("employee_category = %s")
-                params.append(category)
+            # Get distinct all_women_batch values
+            cursor.execute("SELECT DISTINCT all_women_batch FROM fta WHERE all_women_batch IS NOT NULL ORDER BY all_women_batch")
+            all_women_batches = [row['all_women_batch'] for row in cursor.fetchall()]
             
-            if course_year != 'all':
-                where_conditions.append("course_joining_year = %s")
-                params.append(course_year)
+            # Get distinct second_year_inplant_shop values
+            cursor.execute("SELECT DISTINCT second_year_inplant_shop FROM fta WHERE second_year_inplant_shop IS NOT NULL ORDER BY second_year_inplant_shop")
+            second_year_inplants = [row['second_year_inplant_shop'] for row in cursor.fetchall()]
             
-            if final_result != 'all':
-                where_conditions.append("final_result = %s")
-                params.append(final_result)
-            
-            if training != 'all':
-                where_conditions.append("training_name = %s")
-                params.append(training)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            if start_date:
-                where_conditions.append("date_of_joining >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                where_conditions.append("date_of_joining <= %s")
-                params.append(end_date)
-            
-            # Add tab-specific conditions based on result columns
-            if tab == 'live':
-                # Students whose final result is not yet declared
-                where_conditions.append("(final_result IS NULL OR final_result = '')")
-            elif tab == 'first-year':
-                # Students in first year: all three result columns are empty
-                where_conditions.append("""
-                    (first_year_result IS NULL OR first_year_result = '') 
-                    AND (second_year_result IS NULL OR second_year_result = '') 
-                    AND (final_result IS NULL OR final_result = '')
-                """)
-            elif tab == 'second-year':
-                # Students in second year: first year result filled, second and final empty
-                where_conditions.append("""
-                    (first_year_result IS NOT NULL AND first_year_result != '') 
-                    AND (second_year_result IS NULL OR second_year_result = '') 
-                    AND (final_result IS NULL OR final_result = '')
-                """)
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM pragati WHERE {where_clause} ORDER BY sr_no DESC"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'ticket_no': 'Ticket No',
-                'name': 'Name',
-                'gender': 'Gender',
-                'employee_category': 'Employee Category',
-                'factory': 'Factory',
-                'course_joining_year': 'Course Joining Year',
-                'date_of_joining': 'Date of Joining',
-                'pragati_batch_number': 'Pragati Batch No',
-                'diploma_name': 'Diploma Name',
-                'first_year_result': '1st Year Result',
-                'second_year_result': '2nd Year Result',
-                'final_result': 'Final Result',
-                'training_name': 'Training Name',
-                'remark': 'Remark'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Format dates
-            date_columns = ['Date of Joining']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Ticket No', 'Name', 'Gender', 'Employee Category', 
-                'Factory', 'Course Joining Year', 'Date of Joining', 
-                'Pragati Batch No', 'Diploma Name', '1st Year Result', 
-                '2nd Year Result', 'Final Result', 'Training Name', 'Remark'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Pragati Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['Pragati Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='pragati_data.xlsx'
-            )
-            
-    except Exception as e:
-        print(f"Error generating Pragati Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
-
-import datetime
-
-# FTA Main Page
-@user_tech_bp.route('/fta', methods=['GET'])
-def fta_list():
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            sql = "SELECT * FROM fta ORDER BY sr_no DESC"
-            cursor.execute(sql)
-            fta_data = cursor.fetchall()
-    except Exception as e:
-        print(f"Error fetching FTA data: {e}")
-        fta_data = []
-    finally:
-        conn.close()
-
-    return render_template("user/fta.html", fta_data=fta_data)
-
-# FTA Filter Options API
-@user_tech_bp.route('/api/fta/filter-options', methods=['GET'])
-def get_fta_filter_options():
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Get unique values for each filter
-            cursor.execute("SELECT DISTINCT gender FROM fta WHERE gender IS NOT NULL ORDER BY gender")
-            genders = [row['gender'] for row in cursor.fetchall()]
-            
-            # Get distinct academic years from joining_year
-            cursor.execute("SELECT DISTINCT joining_year FROM fta WHERE joining_year IS NOT NULL ORDER BY joining_year")
-            academic_years = []
-            for row in cursor.fetchall():
-                year = row['joining_year']
-                # Format as "YYYY/YY"
-                formatted_year = f"{int(year)}/{str(int(year)+1)[2:]}"
-                academic_years.append(formatted_year)
-            
-            # Get distinct faculty names
-            cursor.execute("SELECT DISTINCT faculty_name FROM fta WHERE faculty_name IS NOT NULL ORDER BY faculty_name")
-            faculties = [row['faculty_name'] for row in cursor.fetchall()]
-            
-            # Get distinct FTA batch numbers
-            cursor.execute("SELECT DISTINCT fta_batch_number FROM fta WHERE fta_batch_number IS NOT NULL ORDER BY fta_batch_number")
-            fta_batches = [row['fta_batch_number'] for row in cursor.fetchall()]
-            
-            # Get distinct trades
-            cursor.execute("SELECT DISTINCT trade FROM fta WHERE trade IS NOT NULL ORDER BY trade")
-            trades = [row['trade'] for row in cursor.fetchall()]
-            
-            # Get distinct all_women_batch values
-            cursor.execute("SELECT DISTINCT all_women_batch FROM fta WHERE all_women_batch IS NOT NULL ORDER BY all_women_batch")
-            all_women_batches = [row['all_women_batch'] for row in cursor.fetchall()]
-            
-            # Get distinct second_year_inplant_shop values
-            cursor.execute("SELECT DISTINCT second_year_inplant_shop FROM fta WHERE second_year_inplant_shop IS NOT NULL ORDER BY second_year_inplant_shop")
-            second_year_inplants = [row['second_year_inplant_shop'] for row in cursor.fetchall()]
-            
-            # Get distinct final_result values
-            cursor.execute("SELECT DISTINCT final_result FROM fta WHERE final_result IS NOT NULL ORDER BY final_result")
-            final_results = [row['final_result'] for row in cursor.fetchall()]
+            # Get distinct final_result values
+            cursor.execute("SELECT DISTINCT final_result FROM fta WHERE final_result IS NOT NULL ORDER BY final_result")
+            final_results = [row['final_result'] for row in cursor.fetchall()]
             
             # Get distinct training names
             cursor.execute("SELECT DISTINCT training_name FROM fta WHERE training_name IS NOT NULL ORDER BY training_name")
@@ -1330,6 +863,7 @@ def get_fta_filter_options():
 
 # FTA Data API
 @user_tech_bp.route('/api/fta/data', methods=['GET'])
+@conditional_on('fta')
 def get_fta_data():
     try:
         # Get filter parameters from request
@@ -1492,164 +1026,7 @@ def get_fta_data():
 # FTA Download Excel API
 @user_tech_bp.route('/api/fta/download', methods=['GET'])
 def download_fta_data():
-    try:
-        # Get filter parameters from request
-        gender = request.args.get('gender', 'all')
-        academic_year = request.args.get('academic_year', 'all')
-        faculty = request.args.get('faculty', 'all')
-        fta_batch = request.args.get('fta_batch', 'all')
-        trade = request.args.get('trade', 'all')
-        all_women_batch = request.args.get('all_women_batch', 'all')
-        second_year_inplant = request.args.get('second_year_inplant', 'all')
-        final_result = request.args.get('final_result', 'all')
-        training_name = request.args.get('training_name', 'all')
-        ticket = request.args.get('ticket', '')
-        start_date = request.args.get('startDate', '')
-        end_date = request.args.get('endDate', '')
-        
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
-            
-            if gender != 'all':
-                where_conditions.append("gender = %s")
-                params.append(gender)
-            
-            # Handle academic year filter
-            if academic_year != 'all':
-                base_year = academic_year.split('/')[0]
-                where_conditions.append("joining_year = %s")
-                params.append(base_year)
-            
-            if faculty != 'all':
-                where_conditions.append("faculty_name = %s")
-                params.append(faculty)
-            
-            if fta_batch != 'all':
-                where_conditions.append("fta_batch_number = %s")
-                params.append(fta_batch)
-            
-            if trade != 'all':
-                where_conditions.append("trade = %s")
-                params.append(trade)
-            
-            if all_women_batch != 'all':
-                where_conditions.append("all_women_batch = %s")
-                params.append(all_women_batch)
-            
-            if second_year_inplant != 'all':
-                where_conditions.append("second_year_inplant_shop = %s")
-                params.append(second_year_inplant)
-            
-            if final_result != 'all':
-                where_conditions.append("final_result = %s")
-                params.append(final_result)
-            
-            if training_name != 'all':
-                where_conditions.append("training_name = %s")
-                params.append(training_name)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            if start_date:
-                where_conditions.append("date_of_joining >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                where_conditions.append("date_of_separation <= %s")
-                params.append(end_date)
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM fta WHERE {where_clause} ORDER BY sr_no DESC"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'ticket_no': 'Ticket No',
-                'name': 'Name',
-                'gender': 'Gender',
-                'joining_year': 'Joining Year',
-                'date_of_joining': 'Date of Joining',
-                'fta_batch_number': 'FTA Batch Number',
-                'date_of_separation': 'Date of Separation',
-                'trade': 'Trade',
-                'all_women_batch': 'All Women Batch',
-                'second_year_inplant_shop': 'Second Year Implant Shop',
-                'faculty_name': 'Faculty Name',
-                'final_result': 'Final Result',
-                'training_name': 'Training Name'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Create Academic Year column from joining_year and format it
-            if 'Joining Year' in df.columns:
-                df['Academic Year'] = df['Joining Year'].apply(
-                    lambda x: f"{int(x)}/{str(int(x)+1)[2:]}" if pd.notnull(x) else ''
-                )
-                # Drop the original joining_year column
-                df = df.drop(columns=['Joining Year'])
-            
-            # Format dates
-            date_columns = ['Date of Joining', 'Date of Separation']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Ticket No', 'Name', 'Gender', 'Academic Year', 
-                'Date of Joining', 'FTA Batch Number', 'Date of Separation', 
-                'Trade', 'All Women Batch', 'Second Year Implant Shop', 
-                'Faculty Name', 'Final Result', 'Training Name'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='FTA Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['FTA Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='fta_data.xlsx'
-            )
-            
-    except Exception as e:
-        print(f"Error generating FTA Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    return download_table('fta')
 
 # JTA Main Page
 @user_tech_bp.route('/jta', methods=['GET'])
@@ -1670,6 +1047,7 @@ def jta_list():
 
 # JTA Filter Options API
 @user_tech_bp.route('/api/jta/filter-options', methods=['GET'])
+@conditional_on('jta')
 def get_jta_filter_options():
     try:
         conn = get_db_connection()
@@ -1738,6 +1116,7 @@ def get_jta_filter_options():
 
 # JTA Data API
 @user_tech_bp.route('/api/jta/data', methods=['GET'])
+@conditional_on('jta')
 def get_jta_data():
     try:
         # Get filter parameters from request
@@ -1894,200 +1273,51 @@ def get_jta_data():
 # JTA Download Excel API
 @user_tech_bp.route('/api/jta/download', methods=['GET'])
 def download_jta_data():
+    return download_table('jta')
+# TA Main Page
+@user_tech_bp.route('/ta', methods=['GET'])
+def ta_list():
     try:
-        # Get filter parameters from request
-        gender = request.args.get('gender', 'all')
-        academic_year = request.args.get('academic_year', 'all')
-        jta_batch = request.args.get('jta_batch', 'all')
-        trade = request.args.get('trade', 'all')
-        final_result = request.args.get('final_result', 'all')
-        training_name = request.args.get('training_name', 'all')
-        employee_category = request.args.get('employee_category', 'all')
-        status = request.args.get('status', 'all')
-        ticket = request.args.get('ticket', '')
-        start_date = request.args.get('startDate', '')
-        end_date = request.args.get('endDate', '')
-        
         conn = get_db_connection()
         with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
-            
-            if gender != 'all':
-                where_conditions.append("gender = %s")
-                params.append(gender)
+            sql = "SELECT * FROM ta ORDER BY sr_no DESC"
+            cursor.execute(sql)
+            ta_data = cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching TA data: {e}")
+        ta_data = []
+    finally:
+        conn.close()
+
+    return render_template("user/ta.html", ta_data=ta_data)
+
+# TA Filter Options API
+@user_tech_bp.route('/api/ta/filter-options', methods=['GET'])
+@conditional_on('ta')
+def get_ta_filter_options():
+    try:
+        conn = get_db_connection()
+        with conn.cursor() as cursor:
+            # Get unique values for each filter
+            cursor.execute("SELECT DISTINCT gender FROM ta WHERE gender IS NOT NULL ORDER BY gender")
+            genders = [row['gender'] for row in cursor.fetchall()]
             
-            # Handle academic year filter
-            if academic_year != 'all':
-                base_year = academic_year.split('/')[0]
-                where_conditions.append("joining_year = %s")
-                params.append(base_year)
+            # Get distinct academic years from joining_year
+            cursor.execute("SELECT DISTINCT joining_year FROM ta WHERE joining_year IS NOT NULL ORDER BY joining_year")
+            academic_years = []
+            for row in cursor.fetchall():
+                year = row['joining_year']
+                # Format as "YYYY/YY"
+                formatted_year = f"{int(year)}/{str(int(year)+1)[2:]}"
+                academic_years.append(formatted_year)
             
-            if jta_batch != 'all':
-                where_conditions.append("jta_batch_number = %s")
-                params.append(jta_batch)
+            # Get distinct TA batch numbers
+            cursor.execute("SELECT DISTINCT ta_batch_number FROM ta WHERE ta_batch_number IS NOT NULL ORDER BY ta_batch_number")
+            ta_batches = [row['ta_batch_number'] for row in cursor.fetchall()]
             
-            if trade != 'all':
-                where_conditions.append("trade = %s")
-                params.append(trade)
-            
-            if final_result != 'all':
-                where_conditions.append("final_result = %s")
-                params.append(final_result)
-            
-            if training_name != 'all':
-                where_conditions.append("training_name = %s")
-                params.append(training_name)
-            
-            if employee_category != 'all':
-                where_conditions.append("employee_category = %s")
-                params.append(employee_category)
-            
-            if status != 'all':
-                where_conditions.append("status = %s")
-                params.append(status)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            if start_date:
-                where_conditions.append("date_of_joining >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                where_conditions.append("date_of_separation <= %s")
-                params.append(end_date)
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM jta WHERE {where_clause} ORDER BY sr_no DESC"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'ticket_no': 'Ticket No',
-                'name': 'Name',
-                'gender': 'Gender',
-                'joining_year': 'Joining Year',
-                'date_of_joining': 'Date of Joining',
-                'jta_batch_number': 'JTA Batch Number',
-                'date_of_separation': 'Date of Separation',
-                'trade': 'Trade',
-                'final_result': 'Final Result',
-                'training_name': 'Training Name',
-                'employee_category': 'Employee Category',
-                'status': 'Status'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Create Academic Year column from joining_year and format it
-            if 'Joining Year' in df.columns:
-                df['Academic Year'] = df['Joining Year'].apply(
-                    lambda x: f"{int(x)}/{str(int(x)+1)[2:]}" if pd.notnull(x) else ''
-                )
-                # Drop the original joining_year column
-                df = df.drop(columns=['Joining Year'])
-            
-            # Format dates
-            date_columns = ['Date of Joining', 'Date of Separation']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Ticket No', 'Name', 'Gender', 'Academic Year', 
-                'Date of Joining', 'JTA Batch Number', 'Date of Separation', 
-                'Trade', 'Final Result', 'Training Name', 'Employee Category', 'Status'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='JTA Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['JTA Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='jta_data.xlsx'
-            )
-            
-    except Exception as e:
-        print(f"Error generating JTA Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
-# TA Main Page
-@user_tech_bp.route('/ta', methods=['GET'])
-def ta_list():
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            sql = "SELECT * FROM ta ORDER BY sr_no DESC"
-            cursor.execute(sql)
-            ta_data = cursor.fetchall()
-    except Exception as e:
-        print(f"Error fetching TA data: {e}")
-        ta_data = []
-    finally:
-        conn.close()
-
-    return render_template("user/ta.html", ta_data=ta_data)
-
-# TA Filter Options API
-@user_tech_bp.route('/api/ta/filter-options', methods=['GET'])
-def get_ta_filter_options():
-    try:
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Get unique values for each filter
-            cursor.execute("SELECT DISTINCT gender FROM ta WHERE gender IS NOT NULL ORDER BY gender")
-            genders = [row['gender'] for row in cursor.fetchall()]
-            
-            # Get distinct academic years from joining_year
-            cursor.execute("SELECT DISTINCT joining_year FROM ta WHERE joining_year IS NOT NULL ORDER BY joining_year")
-            academic_years = []
-            for row in cursor.fetchall():
-                year = row['joining_year']
-                # Format as "YYYY/YY"
-                formatted_year = f"{int(year)}/{str(int(year)+1)[2:]}"
-                academic_years.append(formatted_year)
-            
-            # Get distinct TA batch numbers
-            cursor.execute("SELECT DISTINCT ta_batch_number FROM ta WHERE ta_batch_number IS NOT NULL ORDER BY ta_batch_number")
-            ta_batches = [row['ta_batch_number'] for row in cursor.fetchall()]
-            
-            # Get distinct trades
-            cursor.execute("SELECT DISTINCT trade FROM ta WHERE trade IS NOT NULL ORDER BY trade")
-            trades = [row['trade'] for row in cursor.fetchall()]
+            # Get distinct trades
+            cursor.execute("SELECT DISTINCT trade FROM ta WHERE trade IS NOT NULL ORDER BY trade")
+            trades = [row['trade'] for row in cursor.fetchall()]
             
             # Get distinct final_result values
             cursor.execute("SELECT DISTINCT final_result FROM ta WHERE final_result IS NOT NULL ORDER BY final_result")
@@ -2120,6 +1350,7 @@ def get_ta_filter_options():
 
 # TA Data API
 @user_tech_bp.route('/api/ta/data', methods=['GET'])
+@conditional_on('ta')
 def get_ta_data():
     try:
         # Get filter parameters from request
@@ -2264,145 +1495,7 @@ def get_ta_data():
 # TA Download Excel API
 @user_tech_bp.route('/api/ta/download', methods=['GET'])
 def download_ta_data():
-    try:
-        # Get filter parameters from request
-        gender = request.args.get('gender', 'all')
-        academic_year = request.args.get('academic_year', 'all')
-        ta_batch = request.args.get('ta_batch', 'all')
-        trade = request.args.get('trade', 'all')
-        final_result = request.args.get('final_result', 'all')
-        training_name = request.args.get('training_name', 'all')
-        ticket = request.args.get('ticket', '')
-        start_date = request.args.get('startDate', '')
-        end_date = request.args.get('endDate', '')
-        
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
-            
-            if gender != 'all':
-                where_conditions.append("gender = %s")
-                params.append(gender)
-            
-            # Handle academic year filter
-            if academic_year != 'all':
-                base_year = academic_year.split('/')[0]
-                where_conditions.append("joining_year = %s")
-                params.append(base_year)
-            
-            if ta_batch != 'all':
-                where_conditions.append("ta_batch_number = %s")
-                params.append(ta_batch)
-            
-            if trade != 'all':
-                where_conditions.append("trade = %s")
-                params.append(trade)
-            
-            if final_result != 'all':
-                where_conditions.append("final_result = %s")
-                params.append(final_result)
-            
-            if training_name != 'all':
-                where_conditions.append("training_name = %s")
-                params.append(training_name)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            if start_date:
-                where_conditions.append("date_of_joining >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                where_conditions.append("date_of_separation <= %s")
-                params.append(end_date)
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM ta WHERE {where_clause} ORDER BY sr_no DESC"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'ticket_no': 'Ticket No',
-                'name': 'Name',
-                'gender': 'Gender',
-                'joining_year': 'Joining Year',
-                'date_of_joining': 'Date of Joining',
-                'ta_batch_number': 'TA Batch Number',
-                'date_of_separation': 'Date of Separation',
-                'trade': 'Trade',
-                'final_result': 'Final Result',
-                'training_name': 'Training Name'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Create Academic Year column from joining_year and format it
-            if 'Joining Year' in df.columns:
-                df['Academic Year'] = df['Joining Year'].apply(
-                    lambda x: f"{int(x)}/{str(int(x)+1)[2:]}" if pd.notnull(x) else ''
-                )
-                # Drop the original joining_year column
-                df = df.drop(columns=['Joining Year'])
-            
-            # Format dates
-            date_columns = ['Date of Joining', 'Date of Separation']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Ticket No', 'Name', 'Gender', 'Academic Year', 
-                'Date of Joining', 'TA Batch Number', 'Date of Separation', 
-                'Trade', 'Final Result', 'Training Name'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='TA Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['TA Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='ta_data.xlsx'
-            )
-            
-    except Exception as e:
-        print(f"Error generating TA Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    return download_table('ta')
 # Kaushalya Main Page
 @user_tech_bp.route('/kaushalya', methods=['GET'])
 def kaushalya_list():
@@ -2422,6 +1515,7 @@ def kaushalya_list():
 
 # Kaushalya Filter Options API
 @user_tech_bp.route('/api/kaushalya/filter-options', methods=['GET'])
+@conditional_on('kaushalya')
 def get_kaushalya_filter_options():
     try:
         conn = get_db_connection()
@@ -2462,218 +1556,28 @@ def get_kaushalya_filter_options():
             'dei_batches': dei_batches,
             'joining_years': joining_years,
             'final_results': final_results,
-            'trainings': trainings,
-            'placement_drives': placement_drives
-        })
-    except Exception as e:
-        print(f"Error fetching Kaushalya filter options: {e}")
-        return jsonify({
-            'trades': [],
-            'batches': [],
-            'genders': [],
-            'dei_batches': [],
-            'joining_years': [],
-            'final_results': [],
-            'trainings': [],
-            'placement_drives': []
-        }), 500
-    finally:
-        conn.close()
-
-# Kaushalya Data API
-@user_tech_bp.route('/api/kaushalya/data', methods=['GET'])
-def get_kaushalya_data():
-    try:
-        # Get filter parameters from request
-        trade = request.args.get('trade', 'all')
-        batch = request.args.get('batch', 'all')
-        gender = request.args.get('gender', 'all')
-        dei_batch = request.args.get('dei_batch', 'all')
-        joining_year = request.args.get('joining_year', 'all')
-        final_result = request.args.get('final_result', 'all')
-        training = request.args.get('training', 'all')
-        placement_drive = request.args.get('placement_drive', 'all')
-        ticket = request.args.get('ticket', '')
-        start_date = request.args.get('startDate', '')
-        end_date = request.args.get('endDate', '')
-        tab = request.args.get('tab', 'overall')
-        
-        # Pagination parameters
-        limit = int(request.args.get('limit', 50))
-        offset = int(request.args.get('offset', 0))
-        
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
-            
-            if trade != 'all':
-                where_conditions.append("trade = %s")
-                params.append(trade)
-            
-            if batch != 'all':
-                where_conditions.append("kaushalya_batch_no = %s")
-                params.append(batch)
-            
-            if gender != 'all':
-                where_conditions.append("gender = %s")
-                params.append(gender)
-            
-            if dei_batch != 'all':
-                where_conditions.append("dei_batch = %s")
-                params.append(dei_batch)
-            
-            if joining_year != 'all':
-                where_conditions.append("joining_year = %s")
-                params.append(joining_year)
-            
-            if final_result != 'all':
-                where_conditions.append("final_result = %s")
-                params.append(final_result)
-            
-            if training != 'all':
-                where_conditions.append("training_name = %s")
-                params.append(training)
-            
-            if placement_drive != 'all':
-                where_conditions.append("placement_drive = %s")
-                params.append(placement_drive)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            if start_date:
-                where_conditions.append("date_of_joining >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                where_conditions.append("date_of_joining <= %s")
-                params.append(end_date)
-            
-            # Add tab-specific conditions
-            if tab == 'live':
-                # Students whose final result is not yet declared
-                where_conditions.append("(final_result IS NULL OR final_result = '' OR final_result IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester'))")
-            elif tab == 'sem1':
-                # Students in semester 1: 
-                # sem_1_pass_fail is not 'Pass' or 'Fail' (it's pending, incomplete, or empty)
-                where_conditions.append("(sem_1_pass_fail IS NULL OR sem_1_pass_fail = '' OR sem_1_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester'))")
-            elif tab == 'sem2':
-                # Students in semester 2:
-                # sem_1_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # sem_2_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(sem_1_pass_fail IN ('Pass', 'Fail') AND (sem_2_pass_fail IS NULL OR sem_2_pass_fail = '' OR sem_2_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            elif tab == 'sem3':
-                # Students in semester 3:
-                # sem_2_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # sem_3_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(sem_2_pass_fail IN ('Pass', 'Fail') AND (sem_3_pass_fail IS NULL OR sem_3_pass_fail = '' OR sem_3_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            elif tab == 'sem4':
-                # Students in semester 4:
-                # sem_3_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # sem_4_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(sem_3_pass_fail IN ('Pass', 'Fail') AND (sem_4_pass_fail IS NULL OR sem_4_pass_fail = '' OR sem_4_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            elif tab == 'sem5':
-                # Students in semester 5:
-                # sem_4_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # sem_5_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(sem_4_pass_fail IN ('Pass', 'Fail') AND (sem_5_pass_fail IS NULL OR sem_5_pass_fail = '' OR sem_5_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            elif tab == 'sem6':
-                # Students in semester 6:
-                # sem_5_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # sem_6_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(sem_5_pass_fail IN ('Pass', 'Fail') AND (sem_6_pass_fail IS NULL OR sem_6_pass_fail = '' OR sem_6_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM kaushalya WHERE {where_clause} ORDER BY sr_no DESC LIMIT {limit} OFFSET {offset}"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Get total count for pagination
-            count_sql = f"SELECT COUNT(*) as total FROM kaushalya WHERE {where_clause}"
-            cursor.execute(count_sql, params)
-            total_count = cursor.fetchone()['total']
-            
-            # Calculate statistics
-            stats_sql = f"""
-                SELECT 
-                    COUNT(DISTINCT kaushalya_batch_no) as batch_count,
-                    COUNT(*) as coverage_count,
-                    COUNT(CASE WHEN gender = 'Male' THEN 1 END) as male_count,
-                    COUNT(CASE WHEN gender = 'Female' THEN 1 END) as female_count,
-                    COUNT(CASE WHEN final_result = 'Pass' THEN 1 END) as pass_count,
-                    COUNT(CASE WHEN final_result = 'Fail' THEN 1 END) as fail_count,
-                    COUNT(CASE WHEN placement_drive = 'Placed' THEN 1 END) as placed_count
-                FROM kaushalya 
-                WHERE {where_clause}
-            """
-            cursor.execute(stats_sql, params)
-            stats = cursor.fetchone()
-            
-        # Convert records to list of dictionaries for JSON serialization
-        records_list = []
-        for record in records:
-            records_list.append({
-                'sr_no': record['sr_no'],
-                'ticket_no': record['ticket_no'],
-                'name': record['name'],
-                'gender': record['gender'],
-                'joining_year': record['joining_year'],
-                'date_of_joining': record['date_of_joining'].strftime('%Y-%m-%d') if record['date_of_joining'] else '',
-                'kaushalya_batch_no': record['kaushalya_batch_no'],
-                'trade': record['trade'],
-                'dei_batch': record['dei_batch'],
-                'sem_1_pass_fail': record['sem_1_pass_fail'],
-                'sem_2_pass_fail': record['sem_2_pass_fail'],
-                'sem_3_pass_fail': record['sem_3_pass_fail'],
-                'sem_4_pass_fail': record['sem_4_pass_fail'],
-                'sem_5_pass_fail': record['sem_5_pass_fail'],
-                'sem_6_pass_fail': record['sem_6_pass_fail'],
-                'final_result': record['final_result'],
-                'placement_drive': record['placement_drive'],
-                'training_name': record['training_name'],
-                'remark': record['remark']
-            })
-        
-        return jsonify({
-            'records': records_list,
-            'stats': {
-                'batch_count': stats['batch_count'] if stats else 0,
-                'coverage_count': stats['coverage_count'] if stats else 0,
-                'male_count': stats['male_count'] if stats else 0,
-                'female_count': stats['female_count'] if stats else 0,
-                'pass_count': stats['pass_count'] if stats else 0,
-                'fail_count': stats['fail_count'] if stats else 0,
-                'placed_count': stats['placed_count'] if stats else 0
-            },
-            'total_records': total_count
-        })
-        
-    except Exception as e:
-        print(f"Error fetching Kaushalya data: {e}")
-        return jsonify({
-            'records': [],
-            'stats': {
-                'batch_count': 0,
-                'coverage_count': 0,
-                'male_count': 0,
-                'female_count': 0,
-                'pass_count': 0,
-                'fail_count': 0,
-                'placed_count': 0
-            },
-            'total_records': 0
+            'trainings': trainings,
+            'placement_drives': placement_drives
+        })
+    except Exception as e:
+        print(f"Error fetching Kaushalya filter options: {e}")
+        return jsonify({
+            'trades': [],
+            'batches': [],
+            'genders': [],
+            'dei_batches': [],
+            'joining_years': [],
+            'final_results': [],
+            'trainings': [],
+            'placement_drives': []
         }), 500
     finally:
         conn.close()
 
-# Kaushalya Download Excel API
-@user_tech_bp.route('/api/kaushalya/download', methods=['GET'])
-def download_kaushalya_data():
+# Kaushalya Data API
+@user_tech_bp.route('/api/kaushalya/data', methods=['GET'])
+@conditional_on('kaushalya')
+def get_kaushalya_data():
     try:
         # Get filter parameters from request
         trade = request.args.get('trade', 'all')
@@ -2689,6 +1593,10 @@ def download_kaushalya_data():
         end_date = request.args.get('endDate', '')
         tab = request.args.get('tab', 'overall')
         
+        # Pagination parameters
+        limit = int(request.args.get('limit', 50))
+        offset = int(request.args.get('offset', 0))
+        
         conn = get_db_connection()
         with conn.cursor() as cursor:
             # Build WHERE clause based on filters
@@ -2775,89 +1683,93 @@ def download_kaushalya_data():
             
             # Build the SQL query
             where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM kaushalya WHERE {where_clause} ORDER BY sr_no DESC"
+            sql = f"SELECT * FROM kaushalya WHERE {where_clause} ORDER BY sr_no DESC LIMIT {limit} OFFSET {offset}"
             
             cursor.execute(sql, params)
             records = cursor.fetchall()
             
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'ticket_no': 'Ticket No',
-                'name': 'Name',
-                'gender': 'Gender',
-                'joining_year': 'Joining Year',
-                'date_of_joining': 'Date of Joining',
-                'kaushalya_batch_no': 'Kaushalya Batch No',
-                'trade': 'Trade',
-                'dei_batch': 'DEI Batch',
-                'sem_1_pass_fail': 'Sem 1 Pass/Fail',
-                'sem_2_pass_fail': 'Sem 2 Pass/Fail',
-                'sem_3_pass_fail': 'Sem 3 Pass/Fail',
-                'sem_4_pass_fail': 'Sem 4 Pass/Fail',
-                'sem_5_pass_fail': 'Sem 5 Pass/Fail',
-                'sem_6_pass_fail': 'Sem 6 Pass/Fail',
-                'final_result': 'Final Result',
-                'placement_drive': 'Placement Drive',
-                'training_name': 'Training Name',
-                'remark': 'Remark'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Format dates
-            date_columns = ['Date of Joining']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Ticket No', 'Name', 'Gender', 'Joining Year', 
-                'Date of Joining', 'Kaushalya Batch No', 'Trade', 'DEI Batch',
-                'Sem 1 Pass/Fail', 'Sem 2 Pass/Fail', 'Sem 3 Pass/Fail', 
-                'Sem 4 Pass/Fail', 'Sem 5 Pass/Fail', 'Sem 6 Pass/Fail',
-                'Final Result', 'Placement Drive', 'Training Name', 'Remark'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Kaushalya Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['Kaushalya Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='kaushalya_data.xlsx'
-            )
+            # Get total count for pagination
+            count_sql = f"SELECT COUNT(*) as total FROM kaushalya WHERE {where_clause}"
+            cursor.execute(count_sql, params)
+            total_count = cursor.fetchone()['total']
+            
+            # Calculate statistics
+            stats_sql = f"""
+                SELECT 
+                    COUNT(DISTINCT kaushalya_batch_no) as batch_count,
+                    COUNT(*) as coverage_count,
+                    COUNT(CASE WHEN gender = 'Male' THEN 1 END) as male_count,
+                    COUNT(CASE WHEN gender = 'Female' THEN 1 END) as female_count,
+                    COUNT(CASE WHEN final_result = 'Pass' THEN 1 END) as pass_count,
+                    COUNT(CASE WHEN final_result = 'Fail' THEN 1 END) as fail_count,
+                    COUNT(CASE WHEN placement_drive = 'Placed' THEN 1 END) as placed_count
+                FROM kaushalya 
+                WHERE {where_clause}
+            """
+            cursor.execute(stats_sql, params)
+            stats = cursor.fetchone()
             
+        # Convert records to list of dictionaries for JSON serialization
+        records_list = []
+        for record in records:
+            records_list.append({
+                'sr_no': record['sr_no'],
+                'ticket_no': record['ticket_no'],
+                'name': record['name'],
+                'gender': record['gender'],
+                'joining_year': record['joining_year'],
+                'date_of_joining': record['date_of_joining'].strftime('%Y-%m-%d') if record['date_of_joining'] else '',
+                'kaushalya_batch_no': record['kaushalya_batch_no'],
+                'trade': record['trade'],
+                'dei_batch': record['dei_batch'],
+                'sem_1_pass_fail': record['sem_1_pass_fail'],
+                'sem_2_pass_fail': record['sem_2_pass_fail'],
+                'sem_3_pass_fail': record['sem_3_pass_fail'],
+                'sem_4_pass_fail': record['sem_4_pass_fail'],
+                'sem_5_pass_fail': record['sem_5_pass_fail'],
+                'sem_6_pass_fail': record['sem_6_pass_fail'],
+                'final_result': record['final_result'],
+                'placement_drive': record['placement_drive'],
+                'training_name': record['training_name'],
+                'remark': record['remark']
+            })
+        
+        return jsonify({
+            'records': records_list,
+            'stats': {
+                'batch_count': stats['batch_count'] if stats else 0,
+                'coverage_count': stats['coverage_count'] if stats else 0,
+                'male_count': stats['male_count'] if stats else 0,
+                'female_count': stats['female_count'] if stats else 0,
+                'pass_count': stats['pass_count'] if stats else 0,
+                'fail_count': stats['fail_count'] if stats else 0,
+                'placed_count': stats['placed_count'] if stats else 0
+            },
+            'total_records': total_count
+        })
+        
     except Exception as e:
-        print(f"Error generating Kaushalya Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
+        print(f"Error fetching Kaushalya data: {e}")
+        return jsonify({
+            'records': [],
+            'stats': {
+                'batch_count': 0,
+                'coverage_count': 0,
+                'male_count': 0,
+                'female_count': 0,
+                'pass_count': 0,
+                'fail_count': 0,
+                'placed_count': 0
+            },
+            'total_records': 0
+        }), 500
     finally:
         conn.close()
+
+# Kaushalya Download Excel API
+@user_tech_bp.route('/api/kaushalya/download', methods=['GET'])
+def download_kaushalya_data():
+    return download_table('kaushalya')
 # Live Trainer Main Page
 @user_tech_bp.route('/live_trainer', methods=['GET'])
 def live_trainer_list():
@@ -2877,6 +1789,7 @@ def live_trainer_list():
 
 # Live Trainer Filter Options API
 @user_tech_bp.route('/api/live_trainer/filter-options', methods=['GET'])
+@conditional_on('live_trainer')
 def get_live_trainer_filter_options():
     try:
         conn = get_db_connection()
@@ -2923,6 +1836,7 @@ def get_live_trainer_filter_options():
 
 # Live Trainer Data API
 @user_tech_bp.route('/api/live_trainer/data', methods=['GET'])
+@conditional_on('live_trainer')
 def get_live_trainer_data():
     try:
         # Get filter parameters from request
@@ -3046,123 +1960,7 @@ def get_live_trainer_data():
 # Live Trainer Download Excel API
 @user_tech_bp.route('/api/live_trainer/download', methods=['GET'])
 def download_live_trainer_data():
-    try:
-        # Get filter parameters from request
-        area = request.args.get('area', 'all')
-        department = request.args.get('department', 'all')
-        factory = request.args.get('factory', 'all')
-        expertise_area = request.args.get('expertise_area', 'all')
-        expertise_category = request.args.get('expertise_category', 'all')
-        faculty = request.args.get('faculty', 'all')
-        ticket = request.args.get('ticket', '')
-        
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
-            
-            if area != 'all':
-                where_conditions.append("area = %s")
-                params.append(area)
-            
-            if department != 'all':
-                where_conditions.append("dept = %s")
-                params.append(department)
-            
-            if factory != 'all':
-                where_conditions.append("factory = %s")
-                params.append(factory)
-            
-            if expertise_area != 'all':
-                where_conditions.append("expertise_area = %s")
-                params.append(expertise_area)
-            
-            if expertise_category != 'all':
-                where_conditions.append("expertise_category = %s")
-                params.append(expertise_category)
-            
-            if faculty != 'all':
-                where_conditions.append("faculty_name = %s")
-                params.append(faculty)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM live_trainer WHERE {where_clause} ORDER BY sr_no DESC"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'faculty_name': 'Faculty Name',
-                'ticket_no': 'Ticket No',
-                'mail_id': 'Mail ID',
-                'mobile_number': 'Mobile Number',
-                'area': 'Area',
-                'dept': 'Department',
-                'factory': 'Factory',
-                'reporting_manager_name': 'Reporting Manager Name',
-                'reporting_manager_mail_id': 'Reporting Manager Mail ID',
-                'expertise_area': 'Expertise Area',
-                'expertise_category': 'Expertise Category',
-                'hr_coordinator_name': 'HR Coordinator Name',
-                'remark': 'Remark'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Faculty Name', 'Ticket No', 'Mail ID', 'Mobile Number',
-                'Area', 'Department', 'Factory', 'Reporting Manager Name',
-                'Reporting Manager Mail ID', 'Expertise Area', 'Expertise Category',
-                'HR Coordinator Name', 'Remark'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Live Trainer Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['Live Trainer Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='live_trainer_data.xlsx'
-            )
-            
-    except Exception as e:
-        print(f"Error generating Live Trainer Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()        
+    return download_table('live_trainer')
 # Lakshya Main Page
 @user_tech_bp.route('/lakshya', methods=['GET'])
 def lakshya_list():
@@ -3182,6 +1980,7 @@ def lakshya_list():
 
 # Lakshya Filter Options API
 @user_tech_bp.route('/api/lakshya/filter-options', methods=['GET'])
+@conditional_on('lakshya')
 def get_lakshya_filter_options():
     try:
         conn = get_db_connection()
@@ -3236,6 +2035,7 @@ def get_lakshya_filter_options():
 
 # Lakshya Data API
 @user_tech_bp.route('/api/lakshya/data', methods=['GET'])
+@conditional_on('lakshya')
 def get_lakshya_data():
     try:
         # Get filter parameters from request
@@ -3414,177 +2214,4 @@ def get_lakshya_data():
 # Lakshya Download Excel API
 @user_tech_bp.route('/api/lakshya/download', methods=['GET'])
 def download_lakshya_data():
-    try:
-        # Get filter parameters from request
-        diploma = request.args.get('diploma', 'all')
-        batch = request.args.get('batch', 'all')
-        gender = request.args.get('gender', 'all')
-        inplant_shop = request.args.get('inplant_shop', 'all')
-        joining_year = request.args.get('joining_year', 'all')
-        final_result = request.args.get('final_result', 'all')
-        training = request.args.get('training', 'all')
-        ticket = request.args.get('ticket', '')
-        start_date = request.args.get('startDate', '')
-        end_date = request.args.get('endDate', '')
-        tab = request.args.get('tab', 'overall')
-        
-        conn = get_db_connection()
-        with conn.cursor() as cursor:
-            # Build WHERE clause based on filters
-            where_conditions = []
-            params = []
-            
-            if diploma != 'all':
-                where_conditions.append("diploma_name = %s")
-                params.append(diploma)
-            
-            if batch != 'all':
-                where_conditions.append("lakshya_batch_no = %s")
-                params.append(batch)
-            
-            if gender != 'all':
-                where_conditions.append("gender = %s")
-                params.append(gender)
-            
-            if inplant_shop != 'all':
-                where_conditions.append("diploma_trainee_inplant_shop = %s")
-                params.append(inplant_shop)
-            
-            if joining_year != 'all':
-                where_conditions.append("course_joining_year = %s")
-                params.append(joining_year)
-            
-            if final_result != 'all':
-                where_conditions.append("final_result = %s")
-                params.append(final_result)
-            
-            if training != 'all':
-                where_conditions.append("training_name = %s")
-                params.append(training)
-            
-            if ticket:
-                where_conditions.append("ticket_no LIKE %s")
-                params.append(f"%{ticket}%")
-            
-            if start_date:
-                where_conditions.append("date_of_joining >= %s")
-                params.append(start_date)
-            
-            if end_date:
-                where_conditions.append("date_of_joining <= %s")
-                params.append(end_date)
-            
-            # Add tab-specific conditions
-            if tab == 'live':
-                # Students whose final result is not yet declared
-                where_conditions.append("(final_result IS NULL OR final_result = '' OR final_result IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester'))")
-            elif tab == 'sem1':
-                # Students in semester 1: 
-                # semester_1_pass_fail is not 'Pass' or 'Fail' (it's pending, incomplete, or empty)
-                where_conditions.append("(semester_1_pass_fail IS NULL OR semester_1_pass_fail = '' OR semester_1_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester'))")
-            elif tab == 'sem2':
-                # Students in semester 2:
-                # semester_1_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # semester_2_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(semester_1_pass_fail IN ('Pass', 'Fail') AND (semester_2_pass_fail IS NULL OR semester_2_pass_fail = '' OR semester_2_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            elif tab == 'year2':
-                # Students in second year:
-                # semester_2_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # second_year_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(semester_2_pass_fail IN ('Pass', 'Fail') AND (second_year_pass_fail IS NULL OR second_year_pass_fail = '' OR second_year_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            elif tab == 'year3':
-                # Students in third year:
-                # second_year_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # third_year_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(second_year_pass_fail IN ('Pass', 'Fail') AND (third_year_pass_fail IS NULL OR third_year_pass_fail = '' OR third_year_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            elif tab == 'year4':
-                # Students in fourth year:
-                # third_year_pass_fail is 'Pass' or 'Fail' (completed) AND
-                # fourth_year_pass_fail is not 'Pass' or 'Fail' (pending, incomplete, or empty)
-                where_conditions.append("(third_year_pass_fail IN ('Pass', 'Fail') AND (fourth_year_pass_fail IS NULL OR fourth_year_pass_fail = '' OR fourth_year_pass_fail IN ('Pending', 'Incomplete', 'Exam pending due to Incomplete Semester')))")
-            
-            # Build the SQL query
-            where_clause = " AND ".join(where_conditions) if where_conditions else "1=1"
-            sql = f"SELECT * FROM lakshya WHERE {where_clause} ORDER BY sr_no DESC"
-            
-            cursor.execute(sql, params)
-            records = cursor.fetchall()
-            
-            # Convert records to DataFrame
-            df = pd.DataFrame(records)
-            
-            # Rename columns to proper names
-            column_mapping = {
-                'sr_no': 'Sr No',
-                'ticket_no': 'Ticket No',
-                'name': 'Name',
-                'gender': 'Gender',
-                'course_joining_year': 'Course Joining Year',
-                'date_of_joining': 'Date of Joining',
-                'date_of_separation': 'Date of Separation',
-                'lakshya_batch_no': 'Lakshya Batch No',
-                'diploma_name': 'Diploma Name',
-                'diploma_trainee_inplant_shop': 'Diploma Trainee Inplant Shop',
-                'semester_1_pass_fail': 'Semester 1 Pass/Fail',
-                'semester_2_pass_fail': 'Semester 2 Pass/Fail',
-                'second_year_pass_fail': 'Second Year Pass/Fail',
-                'third_year_pass_fail': 'Third Year Pass/Fail',
-                'fourth_year_pass_fail': 'Fourth Year Pass/Fail',
-                'final_result': 'Final Result',
-                'training_name': 'Training Name',
-                'remark': 'Remark'
-            }
-            
-            # Rename the columns
-            df = df.rename(columns=column_mapping)
-            
-            # Format dates
-            date_columns = ['Date of Joining', 'Date of Separation']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col]).dt.strftime('%Y-%m-%d')
-            
-            # Reorder columns to match the desired order
-            desired_columns = [
-                'Sr No', 'Ticket No', 'Name', 'Gender', 'Course Joining Year', 
-                'Date of Joining', 'Date of Separation', 'Lakshya Batch No', 
-                'Diploma Name', 'Diploma Trainee Inplant Shop',
-                'Semester 1 Pass/Fail', 'Semester 2 Pass/Fail', 
-                'Second Year Pass/Fail', 'Third Year Pass/Fail', 'Fourth Year Pass/Fail',
-                'Final Result', 'Training Name', 'Remark'
-            ]
-            
-            # Filter to only include columns that exist in the dataframe
-            columns_to_use = [col for col in desired_columns if col in df.columns]
-            df = df[columns_to_use]
-            
-            # Create an Excel file in memory
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='Lakshya Data')
-                
-                # Adjust column widths for better readability
-                worksheet = writer.sheets['Lakshya Data']
-                for idx, col in enumerate(df.columns):
-                    # Set column width based on content length
-                    max_length = max(
-                        df[col].astype(str).apply(len).max(),
-                        len(col)
-                    ) + 2  # Add some padding
-                    worksheet.column_dimensions[chr(65 + idx)].width = min(max_length, 50)  # Cap width at 50
-            
-            output.seek(0)
-            
-            # Return the Excel file as a response
-            return send_file(
-                output,
-                mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                as_attachment=True,
-                download_name='lakshya_data.xlsx'
-            )
-            
-    except Exception as e:
-        print(f"Error generating Lakshya Excel file: {e}")
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
\ No newline at end of file
+    return download_table('lakshya')
@@ -1,14 +1,35 @@
 import os
+import threading
 import pymysql
 from datetime import datetime, timedelta
 import pandas as pd
-from flask import flash
+from flask import flash, g, has_app_context
+from db_pool import ConnectionPool
+from db_metrics import instrument_cursor, record_connection_opened
+from data_cache import bump_data_version
 
 class Config:
     DB_HOST = 'localhost'
     DB_USER = 'root'
     DB_PASSWORD = 'pratik'
     DB_NAME = 'masterdata'
+    DB_POOL_SIZE = 20  # Max open connections per worker process
+    DB_POOL_TIMEOUT = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = 1800  # Reopen connections older than this (seconds)
+    DB_POOL_PING_INTERVAL = 60  # Ping idle connections older than this before reuse
+    DASHBOARD_CACHE_SIZE = 64  # Distinct filter combinations kept in the dashboard cache
+    DASHBOARD_CACHE_TTL = 300  # Seconds a cached dashboard stays valid without any writes
+    DASHBOARD_WORKERS = 8  # Threads computing dashboard widgets concurrently (each holds a connection)
+    DASHBOARD_WIDGET_TIMEOUT = 20  # Seconds a widget may run before it falls back to its zero default
+    DASHBOARD_WIDGET_QUEUE_TIMEOUT = 60  # Seconds a widget may wait for a free worker before it falls back
+    FACET_CACHE_TTL = 900  # Seconds filter dropdown values stay cached without any writes
+    HOURS_CACHE_SIZE = 16  # Filter combinations whose per-employee hours are kept for the hours downloads
+    HOURS_CACHE_TTL = 120  # Seconds a per-employee hours aggregation is reused without any writes
+    REPORT_JOB_WORKERS = 2  # Background threads generating queued report downloads
+    REPORT_JOB_DIR = 'report_jobs'  # Finished report files, reused until the data changes
+    REPORT_JOB_TTL = 3600  # Seconds a finished report is reused when no write has been seen
+    REPORT_JOB_TIMEOUT = 1800  # Seconds before a queued/running job is treated as abandoned
+    ETAG_TTL = 300  # Seconds a response ETag stays valid without writes seen by this process
     PROGRAM_DATA_FILE = 'training_data.xlsx'  # Add this
     EOR_FILENAME = 'eor_data.xlsx'  # Add this
     QR_FOLDER = 'static/qrcodes'
@@ -48,7 +69,10 @@ class Constants:
     TNI_OPTIONS = ['TNI', 'NON-TNI']
     TIME_SLOTS = [f"{h:02d}:{m:02d}" for h in range(5, 23) for m in [0, 30]]
 
-def get_db_connection():
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+def _connect():
     return pymysql.connect(
         host=Config.DB_HOST,
         user=Config.DB_USER,
@@ -57,9 +81,72 @@ def get_db_connection():
         charset='utf8mb4',
         cursorclass=pymysql.cursors.DictCursor,
         autocommit=True  # Enable autocommit to ensure immediate commits
-    
     )
 
+def get_db_pool():
+    """Return the process-wide connection pool, creating it on first use"""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = ConnectionPool(
+                    _connect,
+                    max_size=Config.DB_POOL_SIZE,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    recycle=Config.DB_POOL_RECYCLE,
+                    ping_interval=Config.DB_POOL_PING_INTERVAL,
+                    on_open=record_connection_opened,
+                    cursor_wrapper=instrument_cursor
+                )
+    return _db_pool
+
+def get_db_connection(cursorclass=None):
+    """Borrow a connection from the pool; conn.close() returns it for reuse.
+
+    Rows come back as dicts unless `cursorclass` is given, e.g.
+    get_db_connection(pymysql.cursors.Cursor) for positional (tuple) rows.
+    """
+    return get_db_pool().get_connection(cursorclass)
+
+class RequestConnection:
+    """Request-scoped view of a pooled connection; close() is deferred to teardown"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def get_request_connection():
+    """Connection shared by every helper in the current request.
+
+    Released by release_request_connection() at teardown. Outside an app context this
+    falls back to a regular pooled connection that the caller must close.
+    """
+    if not has_app_context():
+        return get_db_connection()
+    if g.get('_db_conn') is None:
+        g._db_conn = get_db_connection()
+    return RequestConnection(g._db_conn)
+
+def release_request_connection(exc=None):
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        conn.close()
+
+def init_request_db(app):
+    """Register request-scoped connection cleanup on the Flask app"""
+    app.teardown_request(release_request_connection)
+
 def load_training_data(tni_status='TNI'):
     """Load training data from database filtered by TNI status"""
     try:
@@ -217,6 +304,7 @@ def process_eor_excel(file_stream):
                     ))
                 
                 conn.commit()
+                bump_data_version('eor_data')
                 return True, f"Successfully processed {len(df)} EOR records"
                 
         except Exception as e:
@@ -292,6 +380,7 @@ def process_training_excel(file_stream):
                     ))
                 
                 conn.commit()
+                bump_data_version('training_names')
                 return True, f"Successfully processed {len(df)} training records"
                 
         except Exception as e:
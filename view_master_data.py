@@ -1,11 +1,19 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, session, make_response
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, send_file, session, make_response, g, copy_current_request_context
 from admin_app import get_db_connection
 from datetime import datetime, timedelta, date, time
-from utils import Config, Constants, load_training_data
+from utils import Config, Constants, load_training_data, get_request_connection
+from data_cache import TTLCache, normalize_filters
+from http_cache import conditional_on
+from exports import GOLD_FILL, PROGRESS_ROWS, XLSX_MIMETYPE, stream_query, export_response, get_export_format, file_response, write_xlsx_sheets, xlsx_response
+from report_jobs import note_progress
+from pending_eor import get_pending_eor_counts, list_pending_eor, iter_pending_eor
+from rollups import LEARNING_HOURS_SQL, ROLLUP_TABLE, EMPLOYEE_HOURS_TABLE, rollup_supports, ledger_supports, rollups_available
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 from io import BytesIO
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from time import monotonic, perf_counter
 import pandas as pd
 import os
 from flask import current_app
@@ -16,6 +24,30 @@ view_bp = Blueprint('view_bp', __name__)
 
 RECORDS_PER_PAGE = 200
 
+# Tables the /master_data widgets read; a write to any of them invalidates cached bundles
+DASHBOARD_TABLES = ('master_data', 'eor_data', 'tni_data', 'final_tni_data', 'training_targets',
+                    'training_names', 'training_programs')
+dashboard_cache = TTLCache(maxsize=Config.DASHBOARD_CACHE_SIZE, ttl=Config.DASHBOARD_CACHE_TTL)
+
+# Filter dropdown values only change when these tables are written
+FACET_TABLES = ('master_data', 'training_names')
+facet_cache = TTLCache(maxsize=4, ttl=Config.FACET_CACHE_TTL)
+
+# Per-employee hours behind the hours downloads; pulling several buckets for the same filters
+# aggregates once while the entry lives
+HOURS_TABLES = ('master_data',)
+hours_cache = TTLCache(maxsize=Config.HOURS_CACHE_SIZE, ttl=Config.HOURS_CACHE_TTL)
+
+# Shared by all requests, so it also caps how many pooled connections widgets hold at once
+_widget_executor = ThreadPoolExecutor(max_workers=Config.DASHBOARD_WORKERS, thread_name_prefix='dashboard-widget')
+
+FISCAL_MONTH_ORDER = ['April', 'May', 'June', 'July', 'August', 'September',
+                      'October', 'November', 'December', 'January', 'February', 'March']
+
+# Filters the month-wise and annual YTD charts ignore
+MONTH_FILTER_KEYS = ('calendar_month', 'month_range_start', 'month_range_end',
+                     'month_report_pmo_21_20', 'month_cd_key_26_25')
+
 def is_logged_in():
     return 'logged_in' in session and session['logged_in']
 
@@ -140,9 +172,22 @@ def add_cache_headers(response):
     if request.endpoint and request.endpoint == 'static':
         return response
     
-    response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
-    response.headers['Pragma'] = 'no-cache'
-    response.headers['Expires'] = '-1'
+    # Responses validated by http_cache.conditional_on keep their revalidation headers;
+    # no-store would stop the browser from ever sending If-None-Match back
+    if not response.get_etag()[0]:
+        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, post-check=0, pre-check=0, max-age=0'
+        response.headers['Pragma'] = 'no-cache'
+        response.headers['Expires'] = '-1'
+    
+    # Per-widget durations for the browser's network panel; empty when served from cache
+    widget_timings = g.get('_widget_timings')
+    if widget_timings is not None:
+        if widget_timings:
+            response.headers['Server-Timing'] = ', '.join(
+                f"{name};dur={seconds * 1000:.1f}" for name, seconds in widget_timings.items()
+            )
+        else:
+            response.headers['Server-Timing'] = 'dashboard-cache;desc="hit"'
     
     return response
 
@@ -226,7 +271,7 @@ def format_time(time_val):
         except (ValueError, TypeError):
             return time_val
 
-def apply_fiscal_year_filter(query, params, fiscal_year):
+def apply_fiscal_year_filter(query, params, fiscal_year, table='master_data'):
     if not fiscal_year:
         return query, params
     
@@ -235,13 +280,17 @@ def apply_fiscal_year_filter(query, params, fiscal_year):
     else:
         fiscal_year = int(fiscal_year)
     
-    query += """
-        AND (
-            (start_date IS NOT NULL AND 
-             (YEAR(start_date) + IF(MONTH(start_date) >= 4, 0, -1)) = %s)
-        )
-    """
-    params.extend([fiscal_year])
+    if table != 'master_data':
+        # The summary tables always carry fiscal_year
+        query += " AND fiscal_year = %s"
+        params.extend([fiscal_year])
+        return query, params
+    
+    # A start_date range (indexed by idx_master_start_factory_group) rather than the generated
+    # fiscal_year column, which only exists once db_migrations has been run
+    start_date, end_date = get_fiscal_year_range(fiscal_year)
+    query += " AND start_date >= %s AND start_date <= %s"
+    params.extend([start_date, end_date])
     return query, params
 
 def apply_date_range_filter(query, params, start_date_str, end_date_str):
@@ -305,8 +354,8 @@ def apply_pl_category_filter(query, params, pl_category):
     params.append(pl_category)
     return query, params
 
-def apply_standard_filters(query, params, filters):
-    query, params = apply_fiscal_year_filter(query, params, filters.get('fiscal_year'))
+def apply_standard_filters(query, params, filters, table='master_data'):
+    query, params = apply_fiscal_year_filter(query, params, filters.get('fiscal_year'), table)
     
     if filters.get('per_no'):
         query += " AND per_no = %s"
@@ -365,7 +414,14 @@ def apply_standard_filters(query, params, filters):
     
     return query, params
 
-def build_base_query(filters, for_export=False):
+def build_base_query(filters, for_export=False, after_id=None, before_id=None):
+    """SELECT for the filtered master_data rows, newest first.
+
+    For the table view (not `for_export`) this is one keyset page: rows older than `after_id`,
+    or newer than `before_id` (returned oldest first; the caller reverses them). One extra row
+    is fetched so the caller can tell whether another page follows. Only the legacy `page`
+    argument without a cursor still pages by OFFSET.
+    """
     if for_export:
         base_query = """
             SELECT 
@@ -454,15 +510,51 @@ def build_base_query(filters, for_export=False):
     
     base_query, query_params = apply_standard_filters(base_query, query_params, filters)
     
-    base_query += " ORDER BY id DESC"
-    
-    if not for_export:
+    if for_export:
+        base_query += " ORDER BY id DESC"
+        return base_query, query_params
+    
+    if before_id is not None:
+        base_query += " AND id > %s ORDER BY id ASC"
+        query_params.append(before_id)
+    elif after_id is not None:
+        base_query += " AND id < %s ORDER BY id DESC"
+        query_params.append(after_id)
+    else:
+        base_query += " ORDER BY id DESC"
         page = request.args.get('page', 1, type=int)
-        offset = (page - 1) * RECORDS_PER_PAGE
-        base_query += f" LIMIT {RECORDS_PER_PAGE} OFFSET {offset}"
+        if page > 1:
+            base_query += f" LIMIT {RECORDS_PER_PAGE + 1} OFFSET {(page - 1) * RECORDS_PER_PAGE}"
+            return base_query, query_params
     
+    base_query += f" LIMIT {RECORDS_PER_PAGE + 1}"
     return base_query, query_params
 
+def fetch_master_data_page(cursor, filters, after_id=None, before_id=None):
+    """One table page plus its keyset cursors.
+
+    Returns (raw_records, next_cursor, prev_cursor): pass next_cursor as `after` and
+    prev_cursor as `before` to move one page; either is None at that end of the data.
+    """
+    base_query, query_params = build_base_query(filters, after_id=after_id, before_id=before_id)
+    cursor.execute(base_query, query_params)
+    rows = list(cursor.fetchall())
+    
+    has_more = len(rows) > RECORDS_PER_PAGE
+    rows = rows[:RECORDS_PER_PAGE]
+    if before_id is not None:
+        rows.reverse()
+    if not rows:
+        return rows, None, None
+    
+    if before_id is not None:
+        # Paging backwards: the extra row lies before this page, and we came from a later one
+        has_prev, has_next = has_more, True
+    else:
+        has_next = has_more
+        has_prev = after_id is not None or request.args.get('page', 1, type=int) > 1
+    return rows, rows[-1]['sr_no'] if has_next else None, rows[0]['sr_no'] if has_prev else None
+
 def get_column_headings():
     return {
         'sr_no': 'SR.No',
@@ -571,125 +663,232 @@ def get_training_programs():
         if conn:
             conn.close()
 
+def has_month_filters(filters):
+    return any(filters.get(key) for key in MONTH_FILTER_KEYS)
+
+def without_month_filters(filters):
+    chart_filters = filters.copy()
+    for key in MONTH_FILTER_KEYS:
+        chart_filters.pop(key, None)
+    return chart_filters
+
+def _aggregate_query(filters, select_sql, table, group_by):
+    query = f"SELECT {''.join(f'{column}, ' for column in group_by)} {select_sql} FROM {table} WHERE 1=1"
+    if table == ROLLUP_TABLE:
+        # Rows taken out by attendance edits leave their cells behind with no participants
+        query += " AND participant_count > 0"
+    query_params = []
+    query, query_params = apply_standard_filters(query, query_params, filters, table)
+    if group_by:
+        query += " GROUP BY " + ", ".join(group_by)
+    
+    conn = get_request_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, query_params)
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    if not group_by:
+        return {None: rows[0]}
+    return {
+        row[group_by[0]] if len(group_by) == 1 else tuple(row[column] for column in group_by): row
+        for row in rows
+    }
+
+def aggregate_master_data(filters, group_by=None, monthly_counts=False, distinct_counts=True):
+    """Participant count, learning hours, unique permanent learners, programs conducted and
+    training covers for the filtered master_data rows.
+
+    Without `group_by` returns one metrics dict. With `group_by` (list of master_data columns)
+    returns {group value: metrics}, keyed by tuple when grouping on more than one column.
+    `monthly_counts` adds a {calendar month: row count} breakdown.
+
+    When the filters and grouping only involve rollup dimensions, counts, hours and covers are
+    read from master_data_rollup. Unique learners and programs conducted are not additive over
+    rollup cells, so they still take a master_data pass; callers that do not need them pass
+    `distinct_counts=False` and skip it (they are then reported as 0).
+    """
+    group_by = list(group_by or [])
+    use_rollup = rollup_supports(filters, group_by)
+    
+    count_sql = 'participant_count' if use_rollup else '1'
+    month_columns = ''.join(
+        f"SUM(CASE WHEN calendar_month = '{month}' THEN {count_sql} ELSE 0 END) as month_{month.lower()},"
+        for month in FISCAL_MONTH_ORDER
+    ) if monthly_counts else ''
+    covers_sql = """
+        COUNT(DISTINCT CASE WHEN training_name IS NOT NULL AND training_name != ''
+                            THEN training_name END) as unique_training_covers
+    """
+    distinct_sql = """
+        COUNT(DISTINCT CASE WHEN employee_group = 'PERMANENT' AND per_no IS NOT NULL AND per_no != ''
+                            THEN per_no END) as unique_learners,
+        COUNT(DISTINCT CASE WHEN start_date <= CURDATE()
+                            THEN CONCAT(training_name, '_', start_date) END) as total_programs_conducted
+    """
+    
+    if use_rollup:
+        rows = _aggregate_query(filters, f"""{month_columns}
+            COALESCE(SUM(participant_count), 0) as total_records,
+            COALESCE(SUM(learning_hours), 0) as learning_hours,
+            {covers_sql}
+        """, ROLLUP_TABLE, group_by)
+        distinct_rows = _aggregate_query(filters, distinct_sql, 'master_data', group_by) if distinct_counts else {}
+    else:
+        rows = _aggregate_query(filters, f"""{month_columns}
+            COUNT(id) as total_records,
+            COALESCE(SUM({LEARNING_HOURS_SQL}), 0) as learning_hours,
+            {distinct_sql},
+            {covers_sql}
+        """, 'master_data', group_by)
+        distinct_rows = rows
+    
+    def to_metrics(row, distinct_row):
+        metrics = {
+            'total_records': int(row['total_records'] or 0),
+            'learning_hours': int(row['learning_hours'] or 0),
+            'unique_learners': int(distinct_row.get('unique_learners') or 0),
+            'total_programs_conducted': int(distinct_row.get('total_programs_conducted') or 0),
+            'unique_training_covers': int(row['unique_training_covers'] or 0)
+        }
+        if monthly_counts:
+            metrics['monthly_counts'] = {
+                month: int(row[f"month_{month.lower()}"] or 0) for month in FISCAL_MONTH_ORDER
+            }
+        return metrics
+    
+    results = {key: to_metrics(row, distinct_rows.get(key, {})) for key, row in rows.items()}
+    return results if group_by else results[None]
+
+def normalize_training_name(name):
+    return (name or '').strip().lower()
+
+def build_target_query(filters, group_by_training=False):
+    """Annual target query: final_tni_data rows joined with training_targets for the filters"""
+    target_query = f"""
+        SELECT {'t.training_name as training_name,' if group_by_training else ''}
+            SUM(t.hours) as target_hours,
+            COUNT(DISTINCT t.per_no) as target_unique_learners,
+            COUNT(*) as target
+        FROM final_tni_data t
+        JOIN training_targets tt ON t.training_name = tt.training_name
+        WHERE 1=1
+    """
+    target_params = []
+    
+    if filters.get('fiscal_year'):
+        fiscal_year = int(filters['fiscal_year'])
+        target_query += " AND t.year = %s AND tt.target_year = %s"
+        target_params.extend([fiscal_year, fiscal_year])
+    
+    if filters.get('factory'):
+        target_query += " AND t.factory = %s"
+        target_params.append(filters['factory'])
+    
+    if filters.get('training_name'):
+        target_query += " AND t.training_name = %s"
+        target_params.append(filters['training_name'])
+    
+    if filters.get('bc_no'):
+        target_query += " AND t.bc_no = %s"
+        target_params.append(filters['bc_no'])
+    
+    if filters.get('pmo_training_category'):
+        if filters['pmo_training_category'] == 'PMO':
+            target_query += " AND tt.pmo_category != 'SHE (Safety+Health)'"
+        elif filters['pmo_training_category'] != 'All':
+            target_query += " AND tt.pmo_category = %s"
+            target_params.append(filters['pmo_training_category'])
+    
+    if filters.get('pl_category') and filters['pl_category'] != 'All':
+        target_query += " AND tt.pl_category = %s"
+        target_params.append(filters['pl_category'])
+    
+    if group_by_training:
+        target_query += " GROUP BY t.training_name"
+    
+    return target_query, target_params
+
+def _target_metrics_from_row(row):
+    return {
+        'target_hours': row['target_hours'] if row and row['target_hours'] else 0,
+        'target_unique_learners': row['target_unique_learners'] if row and row['target_unique_learners'] else 0,
+        'target': row['target'] if row and row['target'] else 0
+    }
+
+def get_target_metrics(filters, by_training=False):
+    """Target hours, learners and count for the filters.
+
+    With `by_training` returns {normalized training name: metrics} from a single grouped query.
+    """
+    target_query, target_params = build_target_query(filters, group_by_training=by_training)
+    
+    conn = get_request_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(target_query, target_params)
+            if not by_training:
+                return _target_metrics_from_row(cursor.fetchone())
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    results = {}
+    for row in rows:
+        key = normalize_training_name(row['training_name'])
+        metrics = _target_metrics_from_row(row)
+        if key in results:
+            for field, value in metrics.items():
+                results[key][field] += value
+        else:
+            results[key] = metrics
+    return results
+
+def calculate_ytd_metrics(annual_target, ytd_actual, filters):
+    """YTD target, balance and adherence for an annual target, pro-rated by the filtered month"""
+    target_month = None
+    if filters.get('calendar_month'):
+        target_month = filters['calendar_month']
+    elif filters.get('month_range_end'):
+        target_month = filters['month_range_end']
+    
+    month_index = get_month_index(target_month)
+    
+    ytd_target = (annual_target // 10) * month_index
+    balance = max(ytd_target - ytd_actual, 0)
+    
+    percentage_adherence = 0
+    if annual_target > 0 and ytd_target > 0:
+        raw_adherence = ytd_actual / ytd_target * 100
+        percentage_adherence = round(raw_adherence, 1)
+    
+    return {
+        'month_index': month_index,
+        'ytd_target': ytd_target,
+        'ytd_actual': ytd_actual,
+        'balance': balance,
+        'annual_target': annual_target,
+        'percentage_adherence': percentage_adherence
+    }
+
 def calculate_dashboard_metrics(filters):
-    conn = get_db_connection()
+    conn = get_request_connection()
     if not conn:
         return None
     
     try:
-        count_query = "SELECT COUNT(id) as total_records FROM master_data WHERE 1=1"
-        query_params = []
-        
-        count_query, query_params = apply_standard_filters(count_query, query_params, filters)
-        
-        with conn.cursor() as cursor:
-            cursor.execute(count_query, query_params)
-            count_result = cursor.fetchone()
-            total_records = count_result['total_records'] if count_result else 0
-            
-        base_query, base_query_params = build_base_query(filters, for_export=True)
+        # Without month filters the YTD charts share this pass for their month-wise actuals
+        aggregates = aggregate_master_data(filters, monthly_counts=not has_month_filters(filters))
+        total_records = aggregates['total_records']
+        learning_hours = aggregates['learning_hours']
+        unique_learners = aggregates['unique_learners']
+        total_programs_conducted = aggregates['total_programs_conducted']
+        unique_training_covers = aggregates['unique_training_covers']
         
         with conn.cursor() as cursor:
-            cursor.execute(base_query, base_query_params)
-            all_records = cursor.fetchall()
-            
-            learning_hours = 0
-            for record in all_records:
-                record_dict = dict(record)
-                learning_hours += calculate_learning_hours(record_dict)
-                
-            unique_query = """
-                SELECT COUNT(DISTINCT per_no) as unique_permanent_learners 
-                FROM master_data 
-                WHERE employee_group = 'PERMANENT' 
-                AND per_no IS NOT NULL
-                AND per_no != ''
-            """
-            unique_params = []
-            
-            unique_query, unique_params = apply_standard_filters(unique_query, unique_params, filters)
-            
-            cursor.execute(unique_query, unique_params)
-            unique_result = cursor.fetchone()
-            unique_learners = unique_result['unique_permanent_learners'] if unique_result else 0
-            
-            programs_query = """
-                SELECT COUNT(DISTINCT CONCAT(training_name, '_', start_date)) as total_programs_conducted
-                FROM master_data
-                WHERE 1=1
-            """
-            programs_params = []
-            
-            programs_query, programs_params = apply_standard_filters(programs_query, programs_params, filters)
-            programs_query += " AND start_date <= CURDATE()"
-            
-            cursor.execute(programs_query, programs_params)
-            programs_result = cursor.fetchone()
-            total_programs_conducted = programs_result['total_programs_conducted'] if programs_result else 0
-            
-            # Calculate unique training covers count
-            training_covers_query = """
-                SELECT COUNT(DISTINCT training_name) as unique_training_covers
-                FROM master_data
-                WHERE 1=1
-                AND training_name IS NOT NULL
-                AND training_name != ''
-            """
-            training_covers_params = []
-            
-            training_covers_query, training_covers_params = apply_standard_filters(training_covers_query, training_covers_params, filters)
-            
-            cursor.execute(training_covers_query, training_covers_params)
-            training_covers_result = cursor.fetchone()
-            unique_training_covers = training_covers_result['unique_training_covers'] if training_covers_result else 0
-            
-            target_query = """
-                SELECT 
-                    SUM(t.hours) as target_hours,
-                    COUNT(DISTINCT t.per_no) as target_unique_learners,
-                    COUNT(*) as target
-                FROM final_tni_data t
-                JOIN training_targets tt ON t.training_name = tt.training_name
-                WHERE 1=1
-            """
-            target_params = []
-            
-            if filters.get('fiscal_year'):
-                fiscal_year = int(filters['fiscal_year'])
-                target_query += " AND t.year = %s AND tt.target_year = %s"
-                target_params.extend([fiscal_year, fiscal_year])
-            
-            if filters.get('factory'):
-                target_query += " AND t.factory = %s"
-                target_params.append(filters['factory'])
-            
-            if filters.get('training_name'):
-                target_query += " AND t.training_name = %s"
-                target_params.append(filters['training_name'])
-            
-            if filters.get('bc_no'):
-                target_query += " AND t.bc_no = %s"
-                target_params.append(filters['bc_no'])
-            
-            if filters.get('pmo_training_category'):
-                if filters['pmo_training_category'] == 'PMO':
-                    target_query += " AND tt.pmo_category != 'SHE (Safety+Health)'"
-                elif filters['pmo_training_category'] != 'All':
-                    target_query += " AND tt.pmo_category = %s"
-                    target_params.append(filters['pmo_training_category'])
-            
-            if filters.get('pl_category') and filters['pl_category'] != 'All':
-                target_query += " AND tt.pl_category = %s"
-                target_params.append(filters['pl_category'])
-            
-            cursor.execute(target_query, target_params)
-            target_result = cursor.fetchone()
-            
-            target_metrics = {
-                'target_hours': target_result['target_hours'] if target_result and target_result['target_hours'] else 0,
-                'target_unique_learners': target_result['target_unique_learners'] if target_result and target_result['target_unique_learners'] else 0,
-                'target': target_result['target'] if target_result and target_result['target'] else 0
-            }
+            target_metrics = get_target_metrics(filters)
             
             tni_query = """
                 SELECT 
@@ -761,14 +960,9 @@ def calculate_dashboard_metrics(filters):
                 if filters.get('fiscal_year'):
                     fiscal_year = int(filters['fiscal_year'])
                     
-                    match_query += """
-                        AND (
-                            (m.start_date IS NOT NULL AND 
-                             (YEAR(m.start_date) + IF(MONTH(m.start_date) >= 4, 0, -1)) = %s)
-                        )
-                        AND t.year = %s
-                    """
-                    match_params.extend([fiscal_year, fiscal_year])
+                    fy_start, fy_end = get_fiscal_year_range(fiscal_year)
+                    match_query += " AND m.start_date >= %s AND m.start_date <= %s AND t.year = %s"
+                    match_params.extend([fy_start, fy_end, fiscal_year])
                 
                 if filters.get('factory'):
                     match_query += " AND t.factory = %s"
@@ -876,95 +1070,15 @@ def calculate_dashboard_metrics(filters):
                 tni_metrics['matched_count'] = 0
                 tni_metrics['remaining_count'] = 0
             
-            target_month = None
-            if filters.get('calendar_month'):
-                target_month = filters['calendar_month']
-            elif filters.get('month_range_end'):
-                target_month = filters['month_range_end']
-            
-            month_index = get_month_index(target_month)
+            ytd_metrics = calculate_ytd_metrics(target_metrics['target'], total_records, filters)
             
-            annual_target = target_metrics['target']
-            ytd_target = (annual_target // 10) * month_index
-            ytd_actual = total_records
-            balance = max(ytd_target - ytd_actual, 0)
-            
-            percentage_adherence = 0
-            if annual_target > 0 and ytd_target > 0:
-                raw_adherence = total_records / ytd_target * 100
-                percentage_adherence = round(raw_adherence, 1)
-            
-        eor_per_nos = set()
-        conn_eor = get_db_connection()
-        if conn_eor:
-            try:
-                query = "SELECT DISTINCT per_no FROM eor_data WHERE 1=1"
-                query_params = []
-                
-                factory_filter = filters.get('factory')
-                if factory_filter and factory_filter != 'All':
-                    query += " AND factory = %s"
-                    query_params.append(factory_filter)
-                
-                gender_filter = filters.get('gender')
-                if gender_filter and gender_filter != 'All':
-                    query += " AND gender = %s"
-                    query_params.append(gender_filter)
-                
-                employee_group_filter = filters.get('employee_group')
-                if employee_group_filter:
-                    query += " AND employee_group = %s"
-                    query_params.append(employee_group_filter)
-                
-                bc_no_filter = filters.get('bc_no')
-                if bc_no_filter:
-                    query += " AND bc_no = %s"
-                    query_params.append(bc_no_filter)
-                
-                with conn_eor.cursor() as cursor:
-                    cursor.execute(query, query_params)
-                    eor_results = cursor.fetchall()
-                    eor_per_nos = {row['per_no'] for row in eor_results if row['per_no']}
-                    
-            except Exception as e:
-                print(f"Error fetching EOR data: {str(e)}")
-            finally:
-                conn_eor.close()
-                
-        trained_per_nos_any = set()
-        conn_any = get_db_connection()
-        if conn_any:
-            try:
-                query = "SELECT DISTINCT per_no FROM master_data WHERE employee_group = 'PERMANENT' AND per_no IS NOT NULL AND per_no != ''"
-                query_params = []
-                
-                if factory_filter and factory_filter != 'All':
-                    query += " AND factory = %s"
-                    query_params.append(factory_filter)
-                
-                if gender_filter and gender_filter != 'All':
-                    query += " AND gender = %s"
-                    query_params.append(gender_filter)
-                
-                if employee_group_filter:
-                    query += " AND employee_group = %s"
-                    query_params.append(employee_group_filter)
-                
-                if bc_no_filter:
-                    query += " AND bc_no = %s"
-                    query_params.append(bc_no_filter)
-                
-                with conn_any.cursor() as cursor_any:
-                    cursor_any.execute(query, query_params)
-                    results = cursor_any.fetchall()
-                    trained_per_nos_any = {row['per_no'] for row in results}
-            except Exception as e:
-                print(f"Error fetching unique permanent learners for pending EOR: {str(e)}")
-            finally:
-                conn_any.close()
-                
-        actual_pending_eor = len(eor_per_nos - trained_per_nos_any) if eor_per_nos else 0
-        eor_count = len(eor_per_nos) if eor_per_nos else 0
+        try:
+            eor_counts = get_pending_eor_counts(filters)
+        except Exception as e:
+            print(f"Error counting pending EOR: {str(e)}")
+            eor_counts = {'eor_count': 0, 'pending_eor_count': 0}
+        actual_pending_eor = eor_counts['pending_eor_count']
+        eor_count = eor_counts['eor_count']
         
         hours_metrics = calculate_hours_metrics(filters, actual_pending_eor)
         
@@ -980,15 +1094,9 @@ def calculate_dashboard_metrics(filters):
             'current_fiscal_year': get_fiscal_year(),
             'target_metrics': target_metrics,
             'tni_metrics': tni_metrics,
-            'ytd_metrics': {
-                'month_index': month_index,
-                'ytd_target': ytd_target,
-                'ytd_actual': ytd_actual,
-                'balance': balance,
-                'annual_target': annual_target,
-                'percentage_adherence': percentage_adherence
-            },
-            'hours_metrics': hours_metrics
+            'ytd_metrics': ytd_metrics,
+            'hours_metrics': hours_metrics,
+            'monthly_counts': aggregates.get('monthly_counts')
             }
             
     except Exception as e:
@@ -1019,7 +1127,72 @@ def get_current_filters(args):
         'fiscal_year': args.get('fiscal_year', str(get_fiscal_year()))
     }
 
+def apply_ledger_filters(query, params, filters):
+    """Filters of apply_standard_filters that the employee_hours ledger can answer"""
+    query, params = apply_fiscal_year_filter(query, params, filters.get('fiscal_year'), EMPLOYEE_HOURS_TABLE)
+    
+    if filters.get('per_no'):
+        query += " AND per_no = %s"
+        params.append(filters['per_no'])
+    
+    if filters.get('factory'):
+        query += " AND factory = %s"
+        params.append(filters['factory'])
+    
+    query, params = apply_pmo_training_category_filter(query, params, 
+                                                     filters.get('pmo_training_category'))
+    return query, params
+
+def get_ledger_employee_hours(filters):
+    """get_employee_hours_breakdown() read from the employee_hours ledger"""
+    query = f"""
+        SELECT 
+            per_no,
+            MAX(participants_name) as participants_name,
+            MAX(bc_no) as bc_no,
+            MAX(gender) as gender,
+            MAX(employee_group) as employee_group,
+            MAX(department) as department,
+            MAX(factory) as factory,
+            SUM(she_hours) as she_hours,
+            SUM(pmo_hours) as pmo_hours,
+            SUM(total_hours) as total_hours
+        FROM {EMPLOYEE_HOURS_TABLE}
+        WHERE 1=1
+    """
+    query_params = []
+    query, query_params = apply_ledger_filters(query, query_params, filters)
+    query += " GROUP BY per_no ORDER BY per_no"
+    
+    conn = get_request_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, query_params)
+            rows = cursor.fetchall()
+    finally:
+        conn.close()
+    
+    employees = {}
+    for row in rows:
+        employee = dict(row)
+        for key in ('she_hours', 'pmo_hours', 'total_hours'):
+            employee[key] = int(employee[key] or 0)
+        employees[row['per_no']] = employee
+    return employees
+
 def get_employee_hours_breakdown(filters):
+    """SHE, PMO and total learning hours per permanent employee, keyed by per_no.
+
+    Read from the employee_hours ledger when the filters allow; filters finer than
+    employee / fiscal year / factory / PMO category walk the matching master_data rows.
+    """
+    if ledger_supports(filters):
+        try:
+            return get_ledger_employee_hours(filters)
+        except Exception as e:
+            print(f"Error in get_employee_hours_breakdown: {str(e)}")
+            return {}
+    
     modified_filters = filters.copy()
     modified_filters['employee_group'] = 'PERMANENT'
     expected_keys = [
@@ -1031,7 +1204,7 @@ def get_employee_hours_breakdown(filters):
     for key in expected_keys:
         modified_filters.setdefault(key, None)
     base_query, query_params = build_base_query(modified_filters, for_export=True)
-    conn = get_db_connection()
+    conn = get_request_connection()
     if not conn:
         return {}
     try:
@@ -1073,7 +1246,61 @@ def get_employee_hours_breakdown(filters):
         if conn:
             conn.close()
 
+def get_cached_employee_hours(filters):
+    """get_employee_hours_breakdown() shared by the hours downloads for HOURS_CACHE_TTL seconds"""
+    return hours_cache.get_or_compute(
+        ('employee_hours', normalize_filters(filters)), HOURS_TABLES,
+        lambda: get_employee_hours_breakdown(filters),
+        # An empty breakdown may be a swallowed query error, so it is not kept
+        cache_if=bool
+    )
+
+def count_ledger_hours_metrics(filters):
+    """Threshold counts of calculate_hours_metrics() as one aggregate over the ledger"""
+    query = f"""
+        SELECT 
+            COUNT(*) as employees,
+            COALESCE(SUM(she_hours >= 6), 0) as she_6plus,
+            COALESCE(SUM(pmo_hours >= 10), 0) as pmo_10plus,
+            COALESCE(SUM(she_hours >= 6 AND pmo_hours >= 1), 0) as completed_16,
+            COALESCE(SUM(she_hours + pmo_hours >= 16), 0) as cumulative_16plus
+        FROM (
+            SELECT per_no, SUM(she_hours) as she_hours, SUM(pmo_hours) as pmo_hours
+            FROM {EMPLOYEE_HOURS_TABLE}
+            WHERE 1=1
+    """
+    query_params = []
+    query, query_params = apply_ledger_filters(query, query_params, filters)
+    query += " GROUP BY per_no) employee_totals"
+    
+    conn = get_request_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(query, query_params)
+            row = cursor.fetchone()
+    finally:
+        conn.close()
+    return {key: int(value or 0) for key, value in row.items()}
+
 def calculate_hours_metrics(filters, pending_eor_count=0):
+    if ledger_supports(filters):
+        try:
+            counts = count_ledger_hours_metrics(filters)
+        except Exception as e:
+            print(f"Error counting ledger hours metrics: {str(e)}")
+            counts = dict.fromkeys(('employees', 'she_6plus', 'pmo_10plus', 'completed_16', 'cumulative_16plus'), 0)
+        employees = counts['employees']
+        return {
+            'completed_16_count': counts['completed_16'],
+            'below_16_count': employees - counts['completed_16'] + pending_eor_count,
+            'she_6plus_count': counts['she_6plus'],
+            'she_below_6_count': employees - counts['she_6plus'] + pending_eor_count,
+            'pmo_10plus_count': counts['pmo_10plus'],
+            'pmo_below_10_count': employees - counts['pmo_10plus'] + pending_eor_count,
+            'cumulative_16plus_count': counts['cumulative_16plus'],
+            'total_permanent': employees + pending_eor_count
+        }
+    
     employees = get_employee_hours_breakdown(filters)
     
     completed_16 = 0
@@ -1138,6 +1365,162 @@ def get_month_index(month_name=None):
     else:
         return min(current_month + 9, 10)
 
+def load_facet_options():
+    """Distinct values behind the master data filter dropdowns; None if the queries fail.
+
+    Fiscal years and calendar months come from the rollup when it exists, which holds the
+    same values in a few thousand rows.
+    """
+    summary_table = ROLLUP_TABLE if rollups_available() else 'master_data'
+    # master_data may predate its generated fiscal_year column (see db_migrations.COLUMNS)
+    fiscal_year_sql = 'fiscal_year' if summary_table == ROLLUP_TABLE else "YEAR(start_date) + IF(MONTH(start_date) >= 4, 0, -1)"
+    # Rollup cells emptied by attendance edits stay behind with no participants
+    non_empty = " AND participant_count > 0" if summary_table == ROLLUP_TABLE else ""
+    queries = {
+        'fiscal_years': f"SELECT DISTINCT {fiscal_year_sql} as fiscal_year FROM {summary_table} WHERE {fiscal_year_sql} IS NOT NULL{non_empty} ORDER BY fiscal_year DESC",
+        'calendar_months': f"SELECT DISTINCT calendar_month FROM {summary_table} WHERE calendar_month IS NOT NULL{non_empty} ORDER BY calendar_month",
+        'month_report_pmo': "SELECT DISTINCT month_report_pmo_21_20 FROM master_data WHERE month_report_pmo_21_20 IS NOT NULL ORDER BY month_report_pmo_21_20",
+        'month_cd_key': "SELECT DISTINCT month_cd_key_26_25 FROM master_data WHERE month_cd_key_26_25 IS NOT NULL ORDER BY month_cd_key_26_25",
+        'learning_hours': "SELECT DISTINCT learning_hours FROM master_data WHERE learning_hours IS NOT NULL ORDER BY learning_hours",
+        'training_names': "SELECT DISTINCT Training_Name FROM training_names ORDER BY Training_Name"
+    }
+    
+    conn = get_db_connection()
+    try:
+        facets = {}
+        with conn.cursor() as cursor:
+            for name, query in queries.items():
+                cursor.execute(query)
+                facets[name] = [next(iter(row.values())) for row in cursor.fetchall()]
+        return facets
+    except Exception as e:
+        print(f"Error fetching filter options: {str(e)}")
+        return None
+    finally:
+        conn.close()
+
+def get_facet_options():
+    """Cached filter dropdown values; recomputed after any write to FACET_TABLES"""
+    facets = facet_cache.get_or_compute(
+        'master_data_facets', FACET_TABLES, load_facet_options,
+        cache_if=lambda result: result is not None
+    )
+    return facets or {
+        'fiscal_years': [], 'calendar_months': [], 'month_report_pmo': [],
+        'month_cd_key': [], 'learning_hours': [], 'training_names': []
+    }
+
+def get_fiscal_year_options():
+    return get_facet_options()['fiscal_years'] or [get_fiscal_year()]
+
+def get_widget_default(name):
+    """Zero value a dashboard widget falls back to when it fails or times out"""
+    zero_ytd = {'unique_learners_count': 0, 'annual_target': 0, 'ytd_coverage': 0, 'ytd_target': 0, 'adherence': 0}
+    defaults = {
+        'dashboard_metrics': None,
+        'fiscal_years': [get_fiscal_year()],
+        'category_metrics': [],
+        'monthwise_metrics': [],
+        'training_metrics': [],
+        'annual_metrics': {'annual_target': 0, 'ytd_coverage': 0, 'ytd_target': 0, 'month_index': get_month_index()},
+        'pl_category_counts': {pl: dict(zero_ytd) for pl in ('PL1', 'PL2', 'PL3')},
+        'eor_stats': {'total_eor_count': 0, 'employee_category_breakdown': {}},
+        'unique_learners_stats': {
+            'total_unique_learners': 0, 'male_count': 0, 'female_count': 0,
+            'total_eor_count': 0, 'male_eor_count': 0, 'female_eor_count': 0,
+            'eor_ytd_target': 0
+        },
+        'factory_learners_stats': []
+    }
+    return defaults[name]
+
+def _timed_widget(func, filters, started):
+    # Runs in a worker under a copy of the request context. The copy gets its own app
+    # context and `g`, so get_request_connection() checks out a separate pooled connection
+    # here, released when the context is popped.
+    started['at'] = monotonic()
+    g._fanout_worker = True
+    # A widget that overruns cannot be cancelled once it runs, so its statements are capped
+    # at the widget timeout; the pool resets the variable when the connection is released
+    try:
+        with get_request_connection().cursor() as cursor:
+            cursor.execute("SET SESSION max_execution_time = %s", (Config.DASHBOARD_WIDGET_TIMEOUT * 1000,))
+    except Exception as e:
+        print(f"Error limiting dashboard widget statements: {str(e)}")
+    start = perf_counter()
+    value = func(filters)
+    return value, perf_counter() - start
+
+def _widget_result(future, started, queued_until):
+    """Wait for a widget until DASHBOARD_WIDGET_TIMEOUT seconds after it started running.
+
+    A widget still queued behind other requests' widgets at `queued_until` is cancelled.
+    """
+    while True:
+        if 'at' in started:
+            timeout = started['at'] + Config.DASHBOARD_WIDGET_TIMEOUT - monotonic()
+        else:
+            timeout = min(queued_until - monotonic(), Config.DASHBOARD_WIDGET_TIMEOUT)
+        try:
+            return future.result(timeout=max(timeout, 0))
+        except FuturesTimeoutError:
+            if 'at' in started and monotonic() >= started['at'] + Config.DASHBOARD_WIDGET_TIMEOUT:
+                raise
+            if 'at' not in started and monotonic() >= queued_until and future.cancel():
+                raise
+
+def build_dashboard_bundle(filters, timings=None):
+    """All dashboard widgets for the filters, i.e. everything /master_data shows except the page of records.
+
+    The independent widgets run concurrently on the widget pool. A widget that raises, is
+    still running DASHBOARD_WIDGET_TIMEOUT seconds after it started, or never got a worker
+    within DASHBOARD_WIDGET_QUEUE_TIMEOUT seconds degrades to get_widget_default();
+    its name is listed under 'degraded_widgets' and the bundle is not cached. Per-widget
+    seconds are written to `timings`.
+    """
+    timings = timings if timings is not None else {}
+    widgets = [
+        ('dashboard_metrics', calculate_dashboard_metrics),
+        ('fiscal_years', lambda widget_filters: get_fiscal_year_options()),
+        ('category_metrics', get_category_metrics),
+        ('training_metrics', get_training_wise_metrics),
+        ('pl_category_counts', get_pl_category_counts),
+        ('eor_stats', get_employee_group_eor_stats),
+        ('unique_learners_stats', get_unique_learners_permanent),
+        ('factory_learners_stats', get_factory_unique_learners_permanent)
+    ]
+    
+    started = {name: {} for name, _ in widgets}
+    queued_until = monotonic() + Config.DASHBOARD_WIDGET_QUEUE_TIMEOUT
+    futures = {
+        name: _widget_executor.submit(copy_current_request_context(_timed_widget), func, filters.copy(), started[name])
+        for name, func in widgets
+    }
+    
+    bundle = {'degraded_widgets': []}
+    for name, future in futures.items():
+        try:
+            bundle[name], timings[name] = _widget_result(future, started[name], queued_until)
+        except FuturesTimeoutError:
+            print(f"Error: dashboard widget {name} timed out "
+                  f"({'running' if 'at' in started[name] else 'queued'})")
+            bundle[name] = get_widget_default(name)
+            bundle['degraded_widgets'].append(name)
+            timings[name] = Config.DASHBOARD_WIDGET_TIMEOUT
+        except Exception as e:
+            print(f"Error in dashboard widget {name}: {str(e)}")
+            bundle[name] = get_widget_default(name)
+            bundle['degraded_widgets'].append(name)
+            timings[name] = 0
+    
+    # The YTD charts reuse the dashboard metrics, so they run once those are in
+    for name, func in (('monthwise_metrics', get_monthwise_ytd_metrics), ('annual_metrics', get_annual_ytd_metrics)):
+        start = perf_counter()
+        bundle[name] = func(filters, bundle['dashboard_metrics'])
+        timings[name] = perf_counter() - start
+    
+    return bundle
+
 @view_bp.route('/master_data')
 def view_master_data():
     current_fiscal_year = get_fiscal_year()
@@ -1165,9 +1548,21 @@ def view_master_data():
     
     filters = apply_user_factory_filter(filters)
     
-    page = request.args.get('page', 1, type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    after_id = request.args.get('after', type=int)
+    before_id = request.args.get('before', type=int)
+    
+    # Every factory head's default view shares one cached bundle until its tables change
+    widget_timings = {}
+    bundle = dashboard_cache.get_or_compute(
+        ('master_data', normalize_filters(filters), date.today().isoformat()),
+        DASHBOARD_TABLES,
+        lambda: build_dashboard_bundle(filters, widget_timings),
+        cache_if=lambda result: result['dashboard_metrics'] is not None and not result['degraded_widgets']
+    )
+    g._widget_timings = widget_timings
     
-    dashboard_metrics = calculate_dashboard_metrics(filters) or {
+    dashboard_metrics = bundle['dashboard_metrics'] or {
     'participant_count': 0,
     'learning_hours': 0,
     'unique_learners': 0,
@@ -1208,43 +1603,19 @@ def view_master_data():
     }
 }
     
+    # The row count comes from the cached dashboard bundle, not a COUNT per page click
     total_pages = (dashboard_metrics['total_records'] + RECORDS_PER_PAGE - 1) // RECORDS_PER_PAGE
     
-    conn = get_db_connection()
-    fiscal_years = []
-    if conn:
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute("""
-                    SELECT DISTINCT YEAR(start_date) as year 
-                    FROM master_data 
-                    WHERE start_date IS NOT NULL
-                    ORDER BY year DESC
-                """)
-                years = [row['year'] for row in cursor.fetchall()]
-                
-                fiscal_years = list({get_fiscal_year(datetime(year, 4, 1)) for year in years})
-                fiscal_years.sort(reverse=True)
-                
-                if not fiscal_years:
-                    fiscal_years = [current_fiscal_year]
-        except Exception as e:
-            print(f"Error fetching fiscal years: {str(e)}")
-            fiscal_years = [current_fiscal_year]
-        finally:
-            conn.close()
-    else:
-        fiscal_years = [current_fiscal_year]
-        
-    category_metrics = get_category_metrics(filters)
-    monthwise_metrics = get_monthwise_ytd_metrics(filters)
-    training_metrics = get_training_wise_metrics(filters)
-    annual_metrics = get_annual_ytd_metrics(filters)
-    pl_category_counts = get_pl_category_counts(filters)
+    fiscal_years = bundle['fiscal_years']
+    category_metrics = bundle['category_metrics']
+    monthwise_metrics = bundle['monthwise_metrics']
+    training_metrics = bundle['training_metrics']
+    annual_metrics = bundle['annual_metrics']
+    pl_category_counts = bundle['pl_category_counts']
 
-    eor_stats = get_employee_group_eor_stats(filters)
-    unique_learners_stats = get_unique_learners_permanent(filters)
-    factory_learners_stats = get_factory_unique_learners_permanent(filters)
+    eor_stats = bundle['eor_stats']
+    unique_learners_stats = bundle['unique_learners_stats']
+    factory_learners_stats = bundle['factory_learners_stats']
     
     template_vars = {
         'records': [],
@@ -1275,48 +1646,37 @@ def view_master_data():
         'current_page': page,
         'records_per_page': RECORDS_PER_PAGE,
         'total_pages': total_pages,
+        'next_cursor': None,
+        'prev_cursor': None,
         'total_records': dashboard_metrics['total_records'],
         'fiscal_year_options': fiscal_years,
         'current_fiscal_year': current_fiscal_year,
+        'widget_timings': widget_timings,
+        'degraded_widgets': bundle['degraded_widgets'],
         'timestamp': int(datetime.now().timestamp()),
         'user': get_current_user()
     }
    
-    conn = get_db_connection()
+    conn = get_request_connection()
     if not conn:
         flash("Database connection failed.", "error")
         return render_template('admin/master_data_table.html', **template_vars)
     try:
-        base_query, query_params = build_base_query(filters)
-        
         with conn.cursor() as cursor:
-            cursor.execute(base_query, query_params)
-            raw_records = cursor.fetchall()
+            raw_records, next_cursor, prev_cursor = fetch_master_data_page(cursor, filters, after_id, before_id)
             records = process_records(raw_records)
-            
-            cursor.execute("SELECT DISTINCT calendar_month FROM master_data WHERE calendar_month IS NOT NULL ORDER BY calendar_month")
-            calendar_month_options = [row['calendar_month'] for row in cursor.fetchall()]
-            
-            cursor.execute("SELECT DISTINCT month_report_pmo_21_20 FROM master_data WHERE month_report_pmo_21_20 IS NOT NULL ORDER BY month_report_pmo_21_20")
-            month_report_pmo_options = [row['month_report_pmo_21_20'] for row in cursor.fetchall()]
-            
-            cursor.execute("SELECT DISTINCT month_cd_key_26_25 FROM master_data WHERE month_cd_key_26_25 IS NOT NULL ORDER BY month_cd_key_26_25")
-            month_cd_key_options = [row['month_cd_key_26_25'] for row in cursor.fetchall()]
-            
-            cursor.execute("SELECT DISTINCT learning_hours FROM master_data WHERE learning_hours IS NOT NULL ORDER BY learning_hours")
-            learning_hours_options = [row['learning_hours'] for row in cursor.fetchall()]
-            
-            cursor.execute("SELECT DISTINCT Training_Name FROM training_names ORDER BY Training_Name")
-            training_options = [row['Training_Name'] for row in cursor.fetchall()]
-            
-            template_vars.update({
-                'records': records,
-                'learning_hours_options': learning_hours_options,
-                'calendar_month_options': calendar_month_options,
-                'month_report_pmo_options': month_report_pmo_options,
-                'month_cd_key_options': month_cd_key_options,
-                'training_options': training_options
-            })
+        
+        facets = get_facet_options()
+        template_vars.update({
+            'records': records,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor,
+            'learning_hours_options': facets['learning_hours'],
+            'calendar_month_options': facets['calendar_months'],
+            'month_report_pmo_options': facets['month_report_pmo'],
+            'month_cd_key_options': facets['month_cd_key'],
+            'training_options': facets['training_names']
+        })
         return render_template('admin/master_data_table.html', **template_vars)
     except Exception as e:
         flash(f"Error fetching master data: {str(e)}", "error")
@@ -1325,6 +1685,11 @@ def view_master_data():
         if conn:
             conn.close()
 
+@view_bp.route('/master_data/facets')
+def master_data_facets():
+    """Filter dropdown values as JSON, served from the same cache as the page"""
+    return jsonify(get_facet_options())
+
 # Excel export helper functions
 def create_excel_workbook(records, column_headings, title="Report"):
     """Create an Excel workbook with the given records and column headings"""
@@ -1345,6 +1710,8 @@ def create_excel_workbook(records, column_headings, title="Report"):
         for col_num, key in enumerate(column_headings.keys(), 1):
             value = str(record.get(key, ''))  # Convert to string to prevent data shifting
             ws.cell(row=row_num, column=col_num, value=value)
+        if (row_num - 1) % PROGRESS_ROWS == 0:
+            note_progress(row_num - 1)
     
     # Auto-adjust column widths
     for col in ws.columns:
@@ -1357,10 +1724,41 @@ def create_excel_workbook(records, column_headings, title="Report"):
     
     return wb
 
+def format_export_record(record, row_num):
+    """Master data row as written to exports: serial number, computed hours, formatted dates"""
+    record_dict = dict(record)
+    
+    # Add sequential number starting from 1
+    record_dict['sr_no'] = row_num
+    
+    # Process the record with proper null checks
+    day1 = bool(record_dict.get('day_1_attendance', False))
+    day2 = bool(record_dict.get('day_2_attendance', False))
+    day3 = bool(record_dict.get('day_3_attendance', False))
+    
+    # Calculate learning hours with fallback to 0 if None
+    record_dict['learning_hours'] = calculate_learning_hours(record_dict) or 0
+    
+    # Format dates and times with null checks
+    record_dict['start_date'] = format_date(record_dict.get('start_date')) if record_dict.get('start_date') else ''
+    record_dict['end_date'] = format_date(record_dict.get('end_date')) if record_dict.get('end_date') else ''
+    record_dict['start_time'] = format_time(record_dict.get('start_time')) if record_dict.get('start_time') else ''
+    record_dict['end_time'] = format_time(record_dict.get('end_time')) if record_dict.get('end_time') else ''
+    
+    # Handle attendance fields
+    record_dict['day_1_attendance'] = 'Yes' if day1 else 'No'
+    record_dict['day_2_attendance'] = 'Yes' if day2 else 'No'
+    record_dict['day_3_attendance'] = 'Yes' if day3 else 'No'
+    
+    # Clean training name for export with null check
+    record_dict['training_name'] = clean_training_name(record_dict.get('training_name', ''))
+    
+    return record_dict
+
 @view_bp.route('/download_excel')
+@conditional_on('master_data')
 def download_excel():
     """Download filtered data as Excel file - exports ALL matching records without pagination"""
-    conn = None
     try:
         # Get current fiscal year
         current_fiscal_year = get_fiscal_year()
@@ -1389,76 +1787,25 @@ def download_excel():
         # Apply user factory filter based on role
         filters = apply_user_factory_filter(filters)
         
-        conn = get_db_connection()
-        if not conn:
-            flash("Database connection failed.", "error")
-            return redirect(url_for('view_bp.view_master_data'))
-            
         # Build query without pagination for export
         base_query, query_params = build_base_query(filters, for_export=True)
         
-        # Fetch and write data (all records matching filters)
-        with conn.cursor() as cursor:
-            cursor.execute(base_query, query_params)
-            records = cursor.fetchall()
-            
-            # Process records for export
-            processed_records = []
-            for row_num, record in enumerate(records, 1):
-                record_dict = dict(record)
-                
-                # Add sequential number starting from 1
-                record_dict['sr_no'] = row_num
-                
-                # Process the record with proper null checks
-                day1 = bool(record_dict.get('day_1_attendance', False))
-                day2 = bool(record_dict.get('day_2_attendance', False))
-                day3 = bool(record_dict.get('day_3_attendance', False))
-                
-                # Calculate learning hours with fallback to 0 if None
-                record_dict['learning_hours'] = calculate_learning_hours(record_dict) or 0
-                
-                # Format dates and times with null checks
-                record_dict['start_date'] = format_date(record_dict.get('start_date')) if record_dict.get('start_date') else ''
-                record_dict['end_date'] = format_date(record_dict.get('end_date')) if record_dict.get('end_date') else ''
-                record_dict['start_time'] = format_time(record_dict.get('start_time')) if record_dict.get('start_time') else ''
-                record_dict['end_time'] = format_time(record_dict.get('end_time')) if record_dict.get('end_time') else ''
-                
-                # Handle attendance fields
-                record_dict['day_1_attendance'] = 'Yes' if day1 else 'No'
-                record_dict['day_2_attendance'] = 'Yes' if day2 else 'No'
-                record_dict['day_3_attendance'] = 'Yes' if day3 else 'No'
-                
-                # Clean training name for export with null check
-                record_dict['training_name'] = clean_training_name(record_dict.get('training_name', ''))
-                
-                processed_records.append(record_dict)
-        
-        # Create workbook
-        wb = create_excel_workbook(processed_records, get_column_headings(), "Master Data Report")
-        
-        # Save workbook to a bytes buffer
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
+        # Rows stream from an unbuffered cursor into a write-only workbook on disk
+        records = (
+            format_export_record(record, row_num)
+            for row_num, record in enumerate(stream_query(base_query, query_params), 1)
+        )
         
         # Create a filename with timestamp and fiscal year
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"master_data_report_FY{filters['fiscal_year']}_{timestamp}.xlsx"
+        filename = f"master_data_report_FY{filters['fiscal_year']}_{timestamp}"
         
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        return export_response(records, get_column_headings(), filename,
+                               get_export_format(request.args), "Master Data Report")
         
     except Exception as e:
         flash(f"Error generating Excel report: {str(e)}", "error")
         return redirect(url_for('view_bp.view_master_data'))
-    finally:
-        if conn:
-            conn.close()
 
 def load_eor_data(factory=None):
     """
@@ -1470,7 +1817,7 @@ def load_eor_data(factory=None):
     Returns:
         pd.DataFrame: DataFrame containing EOR data
     """
-    conn = get_db_connection()
+    conn = get_request_connection()
     if not conn:
         return pd.DataFrame()
     
@@ -1540,52 +1887,11 @@ def get_pending_eor_employees(factory=None):
     Returns:
         list: List of dictionaries representing pending EOR employees.
     """
-    # Get EOR data
-    eor_df = load_eor_data(factory)
-    if eor_df.empty:
-        return []
-    
-    # Get unique learners from master_data (permanent) for the same factory
-    conn = get_db_connection()
-    if not conn:
-        return []
     try:
-        unique_query = """
-            SELECT DISTINCT per_no FROM master_data
-            WHERE employee_group = 'PERMANENT' 
-            AND per_no IS NOT NULL
-            AND per_no != ''
-        """
-        query_params = []
-        if factory and factory != 'All':
-            unique_query += " AND factory = %s"
-            query_params.append(factory)
-        with conn.cursor() as cursor:
-            cursor.execute(unique_query, query_params)
-            unique_learners = {row['per_no'] for row in cursor.fetchall()}
-        
-        # Filter EOR data to get pending records
-        pending_eor_df = eor_df[~eor_df['per_no'].isin(unique_learners)]
-        
-        # Convert to list of dictionaries
-        pending_employees = []
-        for _, row in pending_eor_df.iterrows():
-            emp = {
-                'per_no': row['per_no'],
-                'participants_name': row.get('participants_name', ''),
-                'bc_no': row.get('bc_no', ''),
-                'gender': row.get('gender', ''),
-                'employee_group': row.get('employee_group', ''),
-                'department': row.get('department', ''),
-                'factory': row.get('factory', '')
-            }
-            pending_employees.append(emp)
-        return pending_employees
+        return list_pending_eor({'factory': factory})
     except Exception as e:
         print(f"Error getting pending EOR employees: {str(e)}")
         return []
-    finally:
-        conn.close()
 
 @view_bp.route('/download_eor_data')
 def download_eor_data():
@@ -1658,7 +1964,6 @@ def download_eor_data():
 @view_bp.route('/download_pending_eor')
 def download_pending_eor():
     """Download Excel of pending EOR (EOR count - unique learners)"""
-    conn = None
     try:
         # Get current fiscal year
         current_fiscal_year = get_fiscal_year()
@@ -1672,62 +1977,11 @@ def download_pending_eor():
         # Apply user factory filter based on role
         filters = apply_user_factory_filter(filters)
         
-        # Get EOR data from database
-        conn_eor = get_db_connection()
-        if not conn_eor:
-            flash("Database connection failed", "error")
-            return redirect(url_for('view_bp.view_master_data'))
-        try:
-            query = "SELECT per_no, participants_name, bc_no, gender, employee_group, department, factory FROM eor_data WHERE 1=1"
-            query_params = []
-            
-            factory_filter = filters.get('factory')
-            if factory_filter and factory_filter != 'All':
-                query += " AND factory = %s"
-                query_params.append(factory_filter)
-                
-            with conn_eor.cursor() as cursor:
-                cursor.execute(query, query_params)
-                eor_records = cursor.fetchall()
-                
-            if not eor_records:
-                flash("EOR data not available", "error")
-                return redirect(url_for('view_bp.view_master_data'))
-                
-            # Convert to DataFrame for consistency with existing code
-            eor_df = pd.DataFrame(eor_records)
-            
-        finally:
-            conn_eor.close()
-        
-        # Get unique learners from master_data
-        unique_query = """
-            SELECT DISTINCT per_no, participants_name, bc_no, gender, 
-                   employee_group, department, factory
-            FROM master_data
-            WHERE employee_group = 'PERMANENT' 
-            AND per_no IS NOT NULL
-            AND per_no != ''
-        """
-        unique_params = []
-        
-        # Apply factory filter to unique learners query
-        if factory_filter and factory_filter != 'All':
-            unique_query += " AND factory = %s"
-            unique_params.append(factory_filter)
-        
-        conn = get_db_connection()
-        if not conn:
-            flash("Database connection failed.", "error")
+        factory_filter = filters.get('factory')
+        if not get_eor_count(factory_filter):
+            flash("EOR data not available", "error")
             return redirect(url_for('view_bp.view_master_data'))
         
-        with conn.cursor() as cursor:
-            cursor.execute(unique_query, unique_params)
-            unique_learners = {row['per_no'] for row in cursor.fetchall()}
-        
-        # Filter EOR data to get pending records (not in unique learners)
-        pending_eor_df = eor_df[~eor_df['per_no'].isin(unique_learners)]
-        
         # Define columns
         columns = [
             ('sr_no', 'SR.No'),
@@ -1740,130 +1994,160 @@ def download_pending_eor():
             ('factory', 'Factory')
         ]
         
-        # Process records for export
-        processed_records = []
-        for row_num, (_, row) in enumerate(pending_eor_df.iterrows(), 1):
-            record_dict = dict(row)
-            record_dict['sr_no'] = row_num
-            processed_records.append(record_dict)
+        # Pending rows are streamed from the anti-join straight into the sheet
+        processed_records = (
+            dict(row, sr_no=row_num)
+            for row_num, row in enumerate(iter_pending_eor({'factory': factory_filter}), 1)
+        )
         
-        # Create workbook
+        # Write-only workbook on disk, so only the width sample is held in memory
         column_headings = {key: header for key, header in columns}
-        wb = create_excel_workbook(processed_records, column_headings, "Pending EOR")
-        
-        # Apply gold color to headers
-        ws = wb.active
-        for cell in ws[1]:  # First row
-            cell.fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")  # Gold color
-        
-        # Create and return file
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"pending_eor_FY{filters['fiscal_year']}_{timestamp}.xlsx"
         
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        return xlsx_response(processed_records, column_headings, filename, "Pending EOR", header_fill=GOLD_FILL)
         
     except Exception as e:
         flash(f"Error generating pending EOR report: {str(e)}", "error")
         return redirect(url_for('view_bp.view_master_data'))
-    finally:
-        if conn:
-            conn.close()
             
 # Generic download functions to reduce code duplication
+HOURS_EMPLOYEE_COLUMNS = [
+    ('sr_no', 'SR.No'),
+    ('per_no', 'Per. No'),
+    ('participants_name', 'Participants Name'),
+    ('bc_no', 'BC No'),
+    ('gender', 'Gender'),
+    ('employee_group', 'Employee Group'),
+    ('department', 'Department'),
+    ('factory', 'Factory')
+]
+FILTERED_HOURS_COLUMNS = HOURS_EMPLOYEE_COLUMNS + [('learning_hours', 'Learning Hours')]
+COMBINED_HOURS_COLUMNS = HOURS_EMPLOYEE_COLUMNS + [
+    ('she_hours', 'SHE Hours'),
+    ('pmo_hours', 'PMO Hours'),
+    ('total_hours', 'Total Hours')
+]
+CUMULATIVE_HOURS_COLUMNS = HOURS_EMPLOYEE_COLUMNS + [
+    ('she_hours', 'SHE Hours'),
+    ('pmo_hours', 'PMO Hours'),
+    ('cumulative_hours', 'Cumulative Hours')
+]
+
+def employee_details(emp):
+    return {
+        'per_no': emp['per_no'],
+        'participants_name': emp.get('participants_name', ''),
+        'bc_no': emp.get('bc_no', ''),
+        'gender': emp.get('gender', ''),
+        'employee_group': emp.get('employee_group', ''),
+        'department': emp.get('department', ''),
+        'factory': emp.get('factory', '')
+    }
+
+def number_records(records):
+    """Copies of `records` with a 1-based sr_no"""
+    processed_records = []
+    for idx, emp in enumerate(records, 1):
+        record_dict = emp.copy()
+        record_dict['sr_no'] = idx
+        processed_records.append(record_dict)
+    return processed_records
+
+def filtered_hours_records(employees, min_hours=None, max_hours=None, category_filter=None,
+                           pending_employees=()):
+    """Permanent employees whose SHE, PMO or combined hours fall in [min_hours, max_hours)"""
+    filtered_records = []
+    for emp in employees.values():
+        # Determine hours to compare depending on category filter
+        if category_filter == "SHE (Safety+Health)":
+            hours = emp.get("she_hours", 0)
+        elif category_filter == "PMO":
+            hours = emp.get("pmo_hours", 0)
+        else:
+            # If no category filter, combine both
+            hours = emp.get("she_hours", 0) + emp.get("pmo_hours", 0)
+        # Apply permanent employee filter
+        if emp.get("employee_group") != "Permanent":
+            continue
+        # Apply hour filters
+        if min_hours is not None and hours < min_hours:
+            continue
+        if max_hours is not None and hours >= max_hours:
+            continue
+        filtered_records.append({**employee_details(emp), 'learning_hours': hours})
+    
+    # Pending EOR employees have no training, so no hours
+    for emp in pending_employees:
+        filtered_records.append({**employee_details(emp), 'learning_hours': 0})
+    return number_records(filtered_records)
+
+def combined_hours_records(employees, she_min_hours=6, pmo_min_hours=10, incomplete_only=False,
+                           pending_employees=()):
+    """Employees meeting both the SHE and PMO minimums, or with incomplete_only those who don't"""
+    filtered_employees = []
+    for emp in employees.values():
+        she_ok = emp['she_hours'] >= she_min_hours
+        pmo_ok = emp['pmo_hours'] >= pmo_min_hours
+        
+        if incomplete_only:
+            # Include if they DON'T meet both criteria
+            if not (she_ok and pmo_ok):
+                filtered_employees.append(emp)
+        else:
+            # Include if they meet BOTH criteria
+            if she_ok and pmo_ok:
+                filtered_employees.append(emp)
+    
+    for emp in pending_employees:
+        filtered_employees.append({**employee_details(emp), 'she_hours': 0, 'pmo_hours': 0, 'total_hours': 0})
+    return number_records(filtered_employees)
+
+def cumulative_hours_records(employees, min_hours=None):
+    """Permanent employees whose SHE + PMO hours reach min_hours"""
+    filtered_records = []
+    for emp in employees.values():
+        # Calculate cumulative hours (SHE + PMO)
+        cumulative_hours = emp.get("she_hours", 0) + emp.get("pmo_hours", 0)
+        
+        # Apply permanent employee filter
+        if emp.get("employee_group") != "Permanent":
+            continue
+        # Apply hour filter - only include 16+ hours
+        if min_hours is not None and cumulative_hours < min_hours:
+            continue
+        filtered_records.append({
+            **employee_details(emp),
+            'she_hours': emp.get('she_hours', 0),
+            'pmo_hours': emp.get('pmo_hours', 0),
+            'cumulative_hours': cumulative_hours
+        })
+    return number_records(filtered_records)
+
+def get_hours_report_filters():
+    """Dashboard filters of the current request, scoped to the user's factory"""
+    return apply_user_factory_filter(get_current_filters(request.args))
+
 def download_filtered_hours_report(min_hours=None, max_hours=None, category_filter=None,
                                    exclude_she=False, title=None, filename_prefix=None,
                                    include_pending_eor=False):
     """Download filtered hours reports using same aggregation logic as metrics (grouped per unique per_no)."""
-    conn = get_db_connection()
-    if not conn:
-        flash("Database connection failed.", "error")
-        return redirect(url_for('view_bp.view_master_data'))
-    try:
-        # Get current filters (fiscal year, etc.)
-        filters = get_current_filters(request.args)
-        
-        # Apply user factory filter based on role
-        filters = apply_user_factory_filter(filters)
-        
-        # Get aggregated employee hours (same logic as metrics)
-        employees = get_employee_hours_breakdown(filters)
-        filtered_records = []
-        for emp in employees.values():
-            # Determine hours to compare depending on category filter
-            if category_filter == "SHE (Safety+Health)":
-                hours = emp.get("she_hours", 0)
-            elif category_filter == "PMO":
-                hours = emp.get("pmo_hours", 0)
-            else:
-                # If no category filter, combine both
-                hours = emp.get("she_hours", 0) + emp.get("pmo_hours", 0)
-            # Apply permanent employee filter
-            if emp.get("employee_group") != "Permanent":
-                continue
-            # Apply hour filters
-            if min_hours is not None and hours < min_hours:
-                continue
-            if max_hours is not None and hours >= max_hours:
-                continue
-            filtered_records.append({
-                'per_no': emp['per_no'],
-                'participants_name': emp.get('participants_name', ''),
-                'bc_no': emp.get('bc_no', ''),
-                'gender': emp.get('gender', ''),
-                'employee_group': emp.get('employee_group', ''),
-                'department': emp.get('department', ''),
-                'factory': emp.get('factory', ''),
-                'learning_hours': hours
-            })
-        
-        # Include pending EOR employees if requested
-        if include_pending_eor:
-            factory = filters.get('factory')
-            pending_employees = get_pending_eor_employees(factory=factory)
-            for emp in pending_employees:
-                record = {
-                    'per_no': emp['per_no'],
-                    'participants_name': emp.get('participants_name', ''),
-                    'bc_no': emp.get('bc_no', ''),
-                    'gender': emp.get('gender', ''),
-                    'employee_group': emp.get('employee_group', ''),
-                    'department': emp.get('department', ''),
-                    'factory': emp.get('factory', ''),
-                    'learning_hours': 0   # because they have no training
-                }
-                filtered_records.append(record)
-        
-        # Define columns
-        columns = [
-            ('sr_no', 'SR.No'),
-            ('per_no', 'Per. No'),
-            ('participants_name', 'Participants Name'),
-            ('bc_no', 'BC No'),
-            ('gender', 'Gender'),
-            ('employee_group', 'Employee Group'),
-            ('department', 'Department'),
-            ('factory', 'Factory'),
-            ('learning_hours', 'Learning Hours')
-        ]
+    try:
+        filters = get_hours_report_filters()
         
-        # Process records for export
-        processed_records = []
-        for idx, emp in enumerate(filtered_records, 1):
-            record_dict = emp.copy()
-            record_dict['sr_no'] = idx
-            processed_records.append(record_dict)
+        # Get aggregated employee hours (same logic as metrics)
+        employees = get_cached_employee_hours(filters)
+        pending_employees = get_pending_eor_employees(factory=filters.get('factory')) if include_pending_eor else ()
+        processed_records = filtered_hours_records(employees, min_hours, max_hours, category_filter, pending_employees)
+        
+        column_headings = {key: header for key, header in FILTERED_HOURS_COLUMNS}
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        export_format = get_export_format(request.args)
+        if export_format != 'xlsx':
+            return export_response(processed_records, column_headings,
+                                   f"{filename_prefix}_FY{filters['fiscal_year']}_{timestamp}", export_format)
         
         # Create workbook
-        column_headings = {key: header for key, header in columns}
         wb = create_excel_workbook(processed_records, column_headings, title or "Hours Report")
         
         # Define color fills
@@ -1885,7 +2169,6 @@ def download_filtered_hours_report(min_hours=None, max_hours=None, category_filt
         buffer = BytesIO()
         wb.save(buffer)
         buffer.seek(0)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{filename_prefix}_FY{filters['fiscal_year']}_{timestamp}.xlsx"
         return send_file(
             buffer,
@@ -1897,93 +2180,37 @@ def download_filtered_hours_report(min_hours=None, max_hours=None, category_filt
         print(f"Error generating {title}: {str(e)}")
         flash(f"Error generating report: {str(e)}", "error")
         return redirect(url_for('view_bp.view_master_data'))
-    finally:
-        if conn:
-            conn.close()
 
 def download_combined_hours_report(she_min_hours=6, pmo_min_hours=10, incomplete_only=False,
                                  title=None, filename_prefix=None,
                                  include_pending_eor=False):
     """Download Excel of employees with combined SHE and PMO hours"""
-    conn = None
     try:
-        # Get current filters
-        filters = get_current_filters(request.args)
-        current_fiscal_year = get_fiscal_year()
-        
-        # Apply user factory filter based on role
-        filters = apply_user_factory_filter(filters)
+        filters = get_hours_report_filters()
         
         # Get all permanent employees with their SHE and PMO hours
-        employees = get_employee_hours_breakdown(filters)
+        employees = get_cached_employee_hours(filters)
         
         if not employees and not include_pending_eor:
             flash("No data found matching the criteria.", "warning")
             return redirect(url_for('view_bp.view_master_data'))
         
-        # Filter employees based on criteria
-        filtered_employees = []
-        for emp in employees.values():
-            she_ok = emp['she_hours'] >= she_min_hours
-            pmo_ok = emp['pmo_hours'] >= pmo_min_hours
-            
-            if incomplete_only:
-                # Include if they DON'T meet both criteria
-                if not (she_ok and pmo_ok):
-                    filtered_employees.append(emp)
-            else:
-                # Include if they meet BOTH criteria
-                if she_ok and pmo_ok:
-                    filtered_employees.append(emp)
-        
-        # Include pending EOR employees if requested
-        if include_pending_eor:
-            factory = filters.get('factory')
-            pending_employees = get_pending_eor_employees(factory=factory)
-            for emp in pending_employees:
-                # Create a record for pending EOR employee with 0 hours
-                record = {
-                    'per_no': emp['per_no'],
-                    'participants_name': emp.get('participants_name', ''),
-                    'bc_no': emp.get('bc_no', ''),
-                    'gender': emp.get('gender', ''),
-                    'employee_group': emp.get('employee_group', ''),
-                    'department': emp.get('department', ''),
-                    'factory': emp.get('factory', ''),
-                    'she_hours': 0,
-                    'pmo_hours': 0,
-                    'total_hours': 0
-                }
-                filtered_employees.append(record)
-        
-        if not filtered_employees:
+        pending_employees = get_pending_eor_employees(factory=filters.get('factory')) if include_pending_eor else ()
+        processed_records = combined_hours_records(employees, she_min_hours, pmo_min_hours, incomplete_only,
+                                                   pending_employees)
+        
+        if not processed_records:
             flash("No employees found matching the criteria.", "warning")
             return redirect(url_for('view_bp.view_master_data'))
         
-        # Define columns
-        columns = [
-            ('sr_no', 'SR.No'),
-            ('per_no', 'Per. No'),
-            ('participants_name', 'Participants Name'),
-            ('bc_no', 'BC No'),
-            ('gender', 'Gender'),
-            ('employee_group', 'Employee Group'),
-            ('department', 'Department'),
-            ('factory', 'Factory'),
-            ('she_hours', 'SHE Hours'),
-            ('pmo_hours', 'PMO Hours'),
-            ('total_hours', 'Total Hours')
-        ]
-        
-        # Process records for export
-        processed_records = []
-        for row_num, emp in enumerate(filtered_employees, 1):
-            record_dict = emp.copy()
-            record_dict['sr_no'] = row_num 
-            processed_records.append(record_dict)
+        column_headings = {key: header for key, header in COMBINED_HOURS_COLUMNS}
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        export_format = get_export_format(request.args)
+        if export_format != 'xlsx':
+            return export_response(processed_records, column_headings,
+                                   f"{filename_prefix}_FY{filters['fiscal_year']}_{timestamp}", export_format)
         
         # Create workbook
-        column_headings = {key: header for key, header in columns}
         wb = create_excel_workbook(processed_records, column_headings, title or "Combined Hours Report")
         
         # Apply color coding based on completion status
@@ -2006,7 +2233,6 @@ def download_combined_hours_report(she_min_hours=6, pmo_min_hours=10, incomplete
         wb.save(buffer)
         buffer.seek(0)
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{filename_prefix}_FY{filters['fiscal_year']}_{timestamp}.xlsx"
         
         return send_file(
@@ -2020,73 +2246,24 @@ def download_combined_hours_report(she_min_hours=6, pmo_min_hours=10, incomplete
         print(f"Error generating {title}: {str(e)}")  # Add debugging
         flash(f"Error generating report: {str(e)}", "error")
         return redirect(url_for('view_bp.view_master_data'))
-    finally:
-        if conn:
-            conn.close()
 
 def download_cumulative_hours_report(min_hours=None, title=None, filename_prefix=None):
     """Download cumulative hours reports (SHE + PMO) - Only for 16+ hours"""
-    conn = get_db_connection()
-    if not conn:
-        flash("Database connection failed.", "error")
-        return redirect(url_for('view_bp.view_master_data'))
     try:
-        # Get current filters
-        filters = get_current_filters(request.args)
-        
-        # Apply user factory filter based on role
-        filters = apply_user_factory_filter(filters)
+        filters = get_hours_report_filters()
         
         # Get aggregated employee hours
-        employees = get_employee_hours_breakdown(filters)
-        filtered_records = []
-        for emp in employees.values():
-            # Calculate cumulative hours (SHE + PMO)
-            cumulative_hours = emp.get("she_hours", 0) + emp.get("pmo_hours", 0)
-            
-            # Apply permanent employee filter
-            if emp.get("employee_group") != "Permanent":
-                continue
-            # Apply hour filter - only include 16+ hours
-            if min_hours is not None and cumulative_hours < min_hours:
-                continue
-            filtered_records.append({
-                'per_no': emp['per_no'],
-                'participants_name': emp.get('participants_name', ''),
-                'bc_no': emp.get('bc_no', ''),
-                'gender': emp.get('gender', ''),
-                'employee_group': emp.get('employee_group', ''),
-                'department': emp.get('department', ''),
-                'factory': emp.get('factory', ''),
-                'she_hours': emp.get('she_hours', 0),
-                'pmo_hours': emp.get('pmo_hours', 0),
-                'cumulative_hours': cumulative_hours
-            })
-        
-        # Define columns
-        columns = [
-            ('sr_no', 'SR.No'),
-            ('per_no', 'Per. No'),
-            ('participants_name', 'Participants Name'),
-            ('bc_no', 'BC No'),
-            ('gender', 'Gender'),
-            ('employee_group', 'Employee Group'),
-            ('department', 'Department'),
-            ('factory', 'Factory'), 
-            ('she_hours', 'SHE Hours'),
-            ('pmo_hours', 'PMO Hours'),
-            ('cumulative_hours', 'Cumulative Hours')
-        ]
+        employees = get_cached_employee_hours(filters)
+        processed_records = cumulative_hours_records(employees, min_hours)
         
-        # Process records for export
-        processed_records = []
-        for idx, emp in enumerate(filtered_records, 1):
-            record_dict = emp.copy()
-            record_dict['sr_no'] = idx
-            processed_records.append(record_dict)
+        column_headings = {key: header for key, header in CUMULATIVE_HOURS_COLUMNS}
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        export_format = get_export_format(request.args)
+        if export_format != 'xlsx':
+            return export_response(processed_records, column_headings,
+                                   f"{filename_prefix}_FY{filters['fiscal_year']}_{timestamp}", export_format)
         
         # Create workbook
-        column_headings = {key: header for key, header in columns}
         wb = create_excel_workbook(processed_records, column_headings, title or "Cumulative Hours Report")
         
         # Define color fill for 16+ hours (green)
@@ -2102,7 +2279,6 @@ def download_cumulative_hours_report(min_hours=None, title=None, filename_prefix
         buffer = BytesIO()
         wb.save(buffer)
         buffer.seek(0)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{filename_prefix}_FY{filters['fiscal_year']}_{timestamp}.xlsx"
         return send_file(
             buffer,
@@ -2114,9 +2290,24 @@ def download_cumulative_hours_report(min_hours=None, title=None, filename_prefix
         print(f"Error generating {title}: {str(e)}")
         flash(f"Error generating report: {str(e)}", "error")
         return redirect(url_for('view_bp.view_master_data'))
-    finally:
-        if conn:
-            conn.close()
+
+def hours_pack_sheets(employees, pending_employees):
+    """(sheet title, records, column headings) of every hours bucket, as the single downloads cut them"""
+    she = "SHE (Safety+Health)"
+    filtered = {key: header for key, header in FILTERED_HOURS_COLUMNS}
+    combined = {key: header for key, header in COMBINED_HOURS_COLUMNS}
+    cumulative = {key: header for key, header in CUMULATIVE_HOURS_COLUMNS}
+    return [
+        ("Completed 16 Hours", combined_hours_records(employees, 6, 1), combined),
+        ("Incomplete 16 Hours", combined_hours_records(employees, 6, 10, True, pending_employees), combined),
+        ("SHE 6+ Hours", filtered_hours_records(employees, min_hours=6, category_filter=she), filtered),
+        ("SHE Below 6 Hours", filtered_hours_records(employees, max_hours=6, category_filter=she,
+                                                     pending_employees=pending_employees), filtered),
+        ("PMO 10+ Hours", filtered_hours_records(employees, min_hours=10, category_filter="PMO"), filtered),
+        ("PMO Below 10 Hours", filtered_hours_records(employees, max_hours=10, category_filter="PMO",
+                                                      pending_employees=pending_employees), filtered),
+        ("Cumulative 16+ Hours", cumulative_hours_records(employees, 16), cumulative),
+    ]
 
 # Specific download routes using the generic functions
 @view_bp.route('/download_she_6plus_hours')
@@ -2194,10 +2385,25 @@ def download_cumulative_16plus_hours():
         filename_prefix="cumulative_16plus_hours"
     )
 
+@view_bp.route('/download_hours_pack')
+def download_hours_pack():
+    """Download every hours bucket as one workbook, one sheet per bucket, from a single aggregation"""
+    try:
+        filters = get_hours_report_filters()
+        employees = get_cached_employee_hours(filters)
+        pending_employees = get_pending_eor_employees(factory=filters.get('factory'))
+        
+        path = write_xlsx_sheets(hours_pack_sheets(employees, pending_employees))
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        return file_response(path, f"hours_pack_FY{filters['fiscal_year']}_{timestamp}.xlsx", XLSX_MIMETYPE)
+    except Exception as e:
+        print(f"Error generating hours pack: {str(e)}")
+        flash(f"Error generating report: {str(e)}", "error")
+        return redirect(url_for('view_bp.view_master_data'))
+
 @view_bp.route('/download_unique_learners')
 def download_unique_learners():
     """Download unique learners data as Excel file with proper handling of missing PER NO"""
-    conn = None
     try:
         # Get current fiscal year
         current_fiscal_year = get_fiscal_year()
@@ -2226,11 +2432,6 @@ def download_unique_learners():
         # Apply user factory filter based on role
         filters = apply_user_factory_filter(filters)
         
-        conn = get_db_connection()
-        if not conn:
-            flash("Database connection failed.", "error")
-            return redirect(url_for('view_bp.view_master_data'))
-            
         # Build query to get unique learners
         base_query = """
             SELECT 
@@ -2264,14 +2465,8 @@ def download_unique_learners():
             ('factory', 'Factory')
         ]
         
-        # Fetch and write data
-        with conn.cursor() as cursor:
-            cursor.execute(base_query, query_params)
-            records = cursor.fetchall()
-            
-            # Process records for export
-            processed_records = []
-            for row_num, record in enumerate(records, 1):
+        def unique_learner_records():
+            for row_num, record in enumerate(stream_query(base_query, query_params), 1):
                 record_dict = dict(record)
                 record_dict['sr_no'] = row_num
                 
@@ -2280,33 +2475,18 @@ def download_unique_learners():
                     if key not in record_dict:
                         record_dict[key] = ''
                 
-                processed_records.append(record_dict)
+                yield record_dict
         
-        # Create workbook
         column_headings = {key: header for key, header in columns}
-        wb = create_excel_workbook(processed_records, column_headings, "Unique Learners Report")
-        
-        # Create and return file
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"unique_learners_report_FY{filters['fiscal_year']}_{timestamp}.xlsx"
+        filename = f"unique_learners_report_FY{filters['fiscal_year']}_{timestamp}"
         
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        return export_response(unique_learner_records(), column_headings, filename,
+                               get_export_format(request.args), "Unique Learners Report")
         
     except Exception as e:
         flash(f"Error generating report: {str(e)}", "error")
         return redirect(url_for('view_bp.view_master_data'))
-    finally:
-        if conn:
-            conn.close()
 
 @view_bp.route('/download_tni_shared')
 def download_tni_shared():
@@ -2634,7 +2814,7 @@ def download_tni_remaining():
 
 def get_pl_category_counts(filters):
     """Get counts of unique permanent learners by PL category with annual targets and YTD metrics"""
-    conn = get_db_connection()
+    conn = get_request_connection()
     if not conn:
         return {
             'PL1': {
@@ -2780,7 +2960,7 @@ def get_category_metrics(filters):
     
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_request_connection()
         if not conn:
             return []
         
@@ -2789,39 +2969,14 @@ def get_category_metrics(filters):
         fiscal_year_start_month = 4  # April
         fiscal_month_index = (now.month - fiscal_year_start_month + 12) % 12 + 1
         
-        # Get Permanent EOR count
-        eor_per_nos = set()
-        query = "SELECT DISTINCT per_no FROM eor_data WHERE employee_group = 'Permanent'"
-        query_params = []
-        
+        # Permanent EOR headcount and how many of them have no training record yet
         factory_filter = filters.get('factory')
-        if factory_filter and factory_filter != 'All':
-            query += " AND factory = %s"
-            query_params.append(factory_filter)
-            
-        with conn.cursor() as cursor:
-            cursor.execute(query, query_params)
-            eor_results = cursor.fetchall()
-            eor_per_nos = {row['per_no'] for row in eor_results if row['per_no']}
-        
-        permanent_eor_count = len(eor_per_nos)
+        eor_counts = get_pending_eor_counts({'factory': factory_filter}, eor_employee_group='Permanent')
+        permanent_eor_count = eor_counts['eor_count']
         # ✅ Calculate EOR YTD Target
         eor_ytd_target = int((permanent_eor_count / 10) * fiscal_month_index)
         
-        # ---- Rest of your existing code ----
-        trained_per_nos_any = set()
-        query = "SELECT DISTINCT per_no FROM master_data WHERE employee_group = 'PERMANENT' AND per_no IS NOT NULL AND per_no != ''"
-        query_params = []
-        if factory_filter and factory_filter != 'All':
-            query += " AND factory = %s"
-            query_params.append(factory_filter)
-            
-        with conn.cursor() as cursor:
-            cursor.execute(query, query_params)
-            results = cursor.fetchall()
-            trained_per_nos_any = {row['per_no'] for row in results}
-        
-        actual_pending_eor = len(eor_per_nos - trained_per_nos_any) if eor_per_nos else 0
+        actual_pending_eor = eor_counts['pending_eor_count']
         all_employees = get_employee_hours_breakdown(filters)
         
         completed_16_employees = set()
@@ -2941,65 +3096,48 @@ def get_category_metrics(filters):
             conn.close()
 
 
-def get_monthwise_ytd_metrics(filters):
-    """Calculate month-wise YTD target and coverage for the fiscal year"""
-    # Create a copy of filters and remove month-specific filters for the chart
-    chart_filters = filters.copy()
-    chart_filters.pop('calendar_month', None)
-    chart_filters.pop('month_range_start', None)
-    chart_filters.pop('month_range_end', None)
-    chart_filters.pop('month_report_pmo_21_20', None)
-    chart_filters.pop('month_cd_key_26_25', None)
-    
-    # Get the annual target from dashboard metrics using modified filters
-    dashboard_metrics = calculate_dashboard_metrics(chart_filters)
-    annual_target = dashboard_metrics['target_metrics']['target'] if dashboard_metrics else 0
+def get_annual_target(filters, dashboard_metrics=None):
+    """Annual target count for the filters; reuses an already computed dashboard bundle.
+
+    The target query ignores month filters, so any dashboard_metrics computed for the same
+    non-month filters carries the right value.
+    """
+    if dashboard_metrics:
+        return dashboard_metrics['target_metrics']['target']
+    return get_target_metrics(filters)['target']
+
+def get_monthwise_ytd_metrics(filters, dashboard_metrics=None):
+    """Calculate month-wise YTD target and coverage for the fiscal year.
+
+    Pass the dashboard's metrics for the same filters to reuse its target and, when no month
+    filter is active, its month-wise counts; otherwise this costs one target query and one
+    count (read from the rollup when the filters allow).
+    """
+    # The chart always covers the whole fiscal year, so month-specific filters are dropped
+    chart_filters = without_month_filters(filters)
     
-    # Define fiscal year month order (April to March)
-    fiscal_month_order = ['April', 'May', 'June', 'July', 'August', 'September', 
-                          'October', 'November', 'December', 'January', 'February', 'March']
+    try:
+        annual_target = get_annual_target(chart_filters, dashboard_metrics)
+    except Exception as e:
+        print(f"Error fetching annual target: {str(e)}")
+        annual_target = 0
     
     # Initialize monthly counts
-    monthly_counts = {month: 0 for month in fiscal_month_order}
-    
-    # Get monthly actual counts from database
-    conn = get_db_connection()
-    if not conn:
-        return []
+    monthly_counts = {month: 0 for month in FISCAL_MONTH_ORDER}
     
     try:
-        # Build query to get monthly counts
-        query = """
-            SELECT calendar_month, COUNT(id) as count
-            FROM master_data
-            WHERE 1=1
-        """
-        query_params = []
-        
-        # Apply fiscal year filter
-        query, query_params = apply_fiscal_year_filter(query, query_params, chart_filters.get('fiscal_year'))
-        
-        # Apply other filters (using chart_filters which excludes month filters)
-        query, query_params = apply_standard_filters(query, query_params, chart_filters)
-        
-        # Group by calendar month
-        query += " GROUP BY calendar_month"
-        
-        with conn.cursor() as cursor:
-            cursor.execute(query, query_params)
-            results = cursor.fetchall()
-            
-            # Update monthly counts from results
-            for row in results:
-                month = row['calendar_month']
-                if month in monthly_counts:
-                    monthly_counts[month] = row['count']
+        if dashboard_metrics and dashboard_metrics.get('monthly_counts'):
+            monthly_counts.update(dashboard_metrics['monthly_counts'])
+        else:
+            # chart_filters excludes month filters
+            aggregates = aggregate_master_data(chart_filters, monthly_counts=True, distinct_counts=False)
+            monthly_counts.update(aggregates['monthly_counts'])
         
         # Calculate cumulative metrics for each month
         results = []
         cumulative_coverage = 0
         
-        for i, month in enumerate(fiscal_month_order, 1):
+        for i, month in enumerate(FISCAL_MONTH_ORDER, 1):
             # Get count for this month
             monthly_count = monthly_counts[month]
             cumulative_coverage += monthly_count
@@ -3033,13 +3171,14 @@ def get_monthwise_ytd_metrics(filters):
     except Exception as e:
         print(f"Error calculating month-wise YTD metrics: {str(e)}")
         return []
-    finally:
-        if conn:
-            conn.close()
             
 def get_training_wise_metrics(filters):
-    """Get metrics for each individual training name including annual target, YTD coverage, and adherence"""
-    conn = get_db_connection()
+    """Get metrics for each individual training name including annual target, YTD coverage, and adherence.
+
+    Targets and coverage for all trainings come from one grouped query each; names are matched
+    case- and whitespace-insensitively, as the per-training equality filters did in MySQL.
+    """
+    conn = get_request_connection()
     if not conn:
         return []
     
@@ -3053,46 +3192,36 @@ def get_training_wise_metrics(filters):
             """)
             trainings = cursor.fetchall()
         
+        # Every training replaces any training_name filter, so group across all of them
+        grouped_filters = filters.copy()
+        grouped_filters['training_name'] = None
+        
+        targets = get_target_metrics(grouped_filters, by_training=True)
+        
+        coverage = {}
+        per_training = aggregate_master_data(grouped_filters, group_by=['training_name'], distinct_counts=False)
+        for training_name, metrics in per_training.items():
+            key = normalize_training_name(training_name)
+            coverage[key] = coverage.get(key, 0) + metrics['total_records']
+        
         results = []
         
         for training in trainings:
             training_name = training['Training_Name']
-            pmo_category = training['PMO_Training_Category']
-            pl_category = training['PL_Category']
+            key = normalize_training_name(training_name)
             
-            # Create a copy of filters for this specific training
-            training_filters = filters.copy()
-            training_filters['training_name'] = training_name
+            annual_target = targets.get(key, {}).get('target', 0)
+            ytd_metrics = calculate_ytd_metrics(annual_target, coverage.get(key, 0), filters)
             
-            # Get metrics for this training
-            metrics = calculate_dashboard_metrics(training_filters)
-            
-            if metrics:
-                annual_target = metrics['target_metrics']['target']
-                ytd_actual = metrics['ytd_metrics']['ytd_actual']
-                ytd_target = metrics['ytd_metrics']['ytd_target']
-                adherence = metrics['ytd_metrics']['percentage_adherence']
-                
-                results.append({
-                    'training_name': training_name,
-                    'pmo_category': pmo_category,
-                    'pl_category': pl_category,
-                    'annual_target': annual_target,
-                    'ytd_coverage': ytd_actual,
-                    'ytd_target': ytd_target,
-                    'adherence': adherence
-                })
-            else:
-                # If no metrics available, use zeros
-                results.append({
-                    'training_name': training_name,
-                    'pmo_category': pmo_category,
-                    'pl_category': pl_category,
-                    'annual_target': 0,
-                    'ytd_coverage': 0,
-                    'ytd_target': 0,
-                    'adherence': 0
-                })
+            results.append({
+                'training_name': training_name,
+                'pmo_category': training['PMO_Training_Category'],
+                'pl_category': training['PL_Category'],
+                'annual_target': annual_target,
+                'ytd_coverage': ytd_metrics['ytd_actual'],
+                'ytd_target': ytd_metrics['ytd_target'],
+                'adherence': ytd_metrics['percentage_adherence']
+            })
         
         return results
         
@@ -3105,7 +3234,7 @@ def get_training_wise_metrics(filters):
             
 def get_employee_group_eor_stats(filters):
     """Get EOR count total and breakdown by employee category and gender"""
-    conn = get_db_connection()
+    conn = get_request_connection()
     if not conn:
         return {'total_eor_count': 0, 'employee_category_breakdown': {}}
     
@@ -3172,7 +3301,7 @@ def get_employee_group_eor_stats(filters):
 
 def get_unique_learners_permanent(filters):
     """Get unique learners count for permanent employees only, including EOR count"""
-    conn = get_db_connection()
+    conn = get_request_connection()
     if not conn:
         return {
             'total_unique_learners': 0, 'male_count': 0, 'female_count': 0,
@@ -3275,43 +3404,27 @@ def get_unique_learners_permanent(filters):
             conn.close()
 
 
-def get_annual_ytd_metrics(filters):
-    """Calculate overall annual target and YTD coverage for the fiscal year"""
-    chart_filters = filters.copy()
-    chart_filters.pop('calendar_month', None)
-    chart_filters.pop('month_range_start', None)
-    chart_filters.pop('month_range_end', None)
-    chart_filters.pop('month_report_pmo_21_20', None)
-    chart_filters.pop('month_cd_key_26_25', None)
-    
-    dashboard_metrics = calculate_dashboard_metrics(chart_filters)
-    annual_target = dashboard_metrics['target_metrics']['target'] if dashboard_metrics else 0
+def get_annual_ytd_metrics(filters, dashboard_metrics=None):
+    """Calculate overall annual target and YTD coverage for the fiscal year.
+
+    With the dashboard's metrics for the same filters the target is reused and, when no month
+    filter is active, so is its row count.
+    """
+    chart_filters = without_month_filters(filters)
+    
+    try:
+        annual_target = get_annual_target(chart_filters, dashboard_metrics)
+    except Exception as e:
+        print(f"Error fetching annual target: {str(e)}")
+        annual_target = 0
     month_index = get_month_index()
     ytd_coverage = 0
     
-    conn = get_db_connection()
-    if not conn:
-        return {
-            'annual_target': annual_target,
-            'ytd_coverage': 0,
-            'ytd_target': 0,
-            'month_index': month_index
-        }
-    
     try:
-        query = """
-            SELECT COUNT(id) as count
-            FROM master_data
-            WHERE 1=1
-        """
-        query_params = []
-        query, query_params = apply_fiscal_year_filter(query, query_params, chart_filters.get('fiscal_year'))
-        query, query_params = apply_standard_filters(query, query_params, chart_filters)
-        
-        with conn.cursor() as cursor:
-            cursor.execute(query, query_params)
-            result = cursor.fetchone()
-            ytd_coverage = result['count'] if result else 0
+        if dashboard_metrics and not has_month_filters(filters):
+            ytd_coverage = dashboard_metrics['total_records']
+        else:
+            ytd_coverage = aggregate_master_data(chart_filters, distinct_counts=False)['total_records']
         
         if annual_target > 0 and month_index > 0:
             ytd_target = (annual_target / 10) * month_index
@@ -3333,145 +3446,137 @@ def get_annual_ytd_metrics(filters):
             'ytd_target': 0,
             'month_index': month_index
         }
-    finally:
-        if conn:
-            conn.close()
+
 def get_factory_unique_learners_permanent(filters):
-    """Get unique learners and pending learners broken down by factory for permanent employees"""
-    conn = get_db_connection()
+    """Get unique learners and pending learners broken down by factory for permanent employees.
+
+    Uses a fixed number of grouped queries however many factories there are; pending learners
+    are EOR employees with no permanent training record in their factory (NOT EXISTS).
+    """
+    conn = get_request_connection()
     if not conn:
         return []
     
+    def factory_key(factory):
+        return (factory or '').strip().lower()
+    
     try:
+        specific_factory = filters.get('factory') if filters.get('factory') and filters['factory'] != 'All' else None
+        
         # Determine which factories to include
         factories = []
-        if filters.get('factory') and filters['factory'] != 'All':
-            factories = [filters['factory']]
+        if specific_factory:
+            factories = [specific_factory]
         else:
             # Get all factories from both master_data and eor_data
             with conn.cursor() as cursor:
-                cursor.execute("SELECT DISTINCT factory FROM master_data WHERE factory IS NOT NULL")
-                master_factories = {row['factory'] for row in cursor.fetchall()}
-                
-                cursor.execute("SELECT DISTINCT factory FROM eor_data WHERE factory IS NOT NULL")
-                eor_factories = {row['factory'] for row in cursor.fetchall()}
-                
-                factories = sorted(master_factories.union(eor_factories))
+                cursor.execute("""
+                    SELECT factory FROM master_data WHERE factory IS NOT NULL
+                    UNION
+                    SELECT factory FROM eor_data WHERE factory IS NOT NULL
+                """)
+                factories = sorted({row['factory'] for row in cursor.fetchall()})
         
         # Get current month index for YTD calculations
         month_index = get_month_index(filters.get('calendar_month'))
         
+        def empty_counts():
+            return {'total': 0, 'male': 0, 'female': 0}
+        
+        def add_count(counts, gender, count):
+            counts['total'] += count
+            if gender == 'Male':
+                counts['male'] += count
+            elif gender == 'Female':
+                counts['female'] += count
+        
+        # Trained unique permanent learners per factory and gender (with all filters)
+        trained_filters = filters.copy()
+        trained_filters['factory'] = specific_factory
+        trained_query = """
+            SELECT factory, gender, COUNT(DISTINCT per_no) as count
+            FROM master_data
+            WHERE employee_group = 'Permanent'
+            AND per_no IS NOT NULL AND per_no != ''
+            AND factory IS NOT NULL
+        """
+        trained_params = []
+        trained_query, trained_params = apply_standard_filters(trained_query, trained_params, trained_filters)
+        trained_query += " GROUP BY factory, gender"
+        
+        trained = {}
+        with conn.cursor() as cursor:
+            cursor.execute(trained_query, trained_params)
+            for row in cursor.fetchall():
+                counts = trained.setdefault(factory_key(row['factory']), empty_counts())
+                add_count(counts, row['gender'], row['count'] or 0)
+        
+        # EOR permanent employees per factory and gender, and how many of them have not
+        # attended any training in that factory. Only person-related filters apply to the
+        # "attended any training" check, not training-related ones.
+        person_filters = ""
+        person_params = []
+        if filters.get('gender') and filters['gender'] != 'All':
+            person_filters += " AND {alias}.gender = %s"
+            person_params.append(filters['gender'])
+        
+        if filters.get('bc_no'):
+            person_filters += " AND {alias}.bc_no = %s"
+            person_params.append(filters['bc_no'])
+        
+        eor_query = f"""
+            SELECT e.factory, e.gender,
+                COUNT(DISTINCT e.per_no) as eor_count,
+                COUNT(DISTINCT CASE WHEN NOT EXISTS (
+                    SELECT 1 FROM master_data m
+                    WHERE m.per_no = e.per_no
+                    AND m.factory = e.factory
+                    AND m.employee_group = 'Permanent'
+                    AND m.per_no != ''
+                    {person_filters.format(alias='m')}
+                ) THEN e.per_no END) as pending_count
+            FROM eor_data e
+            WHERE e.employee_group = 'Permanent'
+            AND e.factory IS NOT NULL
+            {person_filters.format(alias='e')}
+        """
+        eor_params = person_params + person_params
+        if specific_factory:
+            eor_query += " AND e.factory = %s"
+            eor_params.append(specific_factory)
+        eor_query += " GROUP BY e.factory, e.gender"
+        
+        eor = {}
+        pending = {}
+        with conn.cursor() as cursor:
+            cursor.execute(eor_query, eor_params)
+            for row in cursor.fetchall():
+                key = factory_key(row['factory'])
+                add_count(eor.setdefault(key, empty_counts()), row['gender'], row['eor_count'] or 0)
+                add_count(pending.setdefault(key, empty_counts()), row['gender'], row['pending_count'] or 0)
+        
         results = []
         
         for factory in factories:
-            # Create factory-specific filters
-            factory_filters = filters.copy()
-            factory_filters['factory'] = factory
-            
-            # Get trained unique permanent learners for this factory (with all filters)
-            trained_query = """
-                SELECT gender, COUNT(DISTINCT per_no) as count
-                FROM master_data
-                WHERE employee_group = 'Permanent'
-                AND per_no IS NOT NULL AND per_no != ''
-                AND factory = %s
-            """
-            trained_params = [factory]
-            trained_query, trained_params = apply_standard_filters(trained_query, trained_params, factory_filters)
-            trained_query += " GROUP BY gender"
-            
-            trained_total = trained_male = trained_female = 0
-            with conn.cursor() as cursor:
-                cursor.execute(trained_query, trained_params)
-                for row in cursor.fetchall():
-                    gender = row['gender']
-                    count = row['count'] or 0
-                    trained_total += count
-                    if gender == 'Male':
-                        trained_male = count
-                    elif gender == 'Female':
-                        trained_female = count
-            
-            # Get EOR unique permanent learners for this factory
-            eor_query = """
-                SELECT per_no, gender
-                FROM eor_data
-                WHERE employee_group = 'Permanent'
-                AND factory = %s
-            """
-            eor_params = [factory]
-            
-            # Apply relevant filters to EOR data
-            if filters.get('gender') and filters['gender'] != 'All':
-                eor_query += " AND gender = %s"
-                eor_params.append(filters['gender'])
-            
-            if filters.get('bc_no'):
-                eor_query += " AND bc_no = %s"
-                eor_params.append(filters['bc_no'])
-            
-            # Get all EOR permanent employees for this factory
-            eor_employees = {}
-            with conn.cursor() as cursor:
-                cursor.execute(eor_query, eor_params)
-                for row in cursor.fetchall():
-                    per_no = row['per_no']
-                    gender = row['gender']
-                    eor_employees[per_no] = gender
-            
-            # Get all trained permanent employees for this factory (without training-specific filters)
-            # This is to check which EOR employees have attended ANY training
-            trained_per_nos = set()
-            trained_any_query = """
-                SELECT DISTINCT per_no
-                FROM master_data
-                WHERE employee_group = 'Permanent'
-                AND per_no IS NOT NULL AND per_no != ''
-                AND factory = %s
-            """
-            trained_any_params = [factory]
-            
-            # Apply only person-related filters (not training-related)
-            if filters.get('gender') and filters['gender'] != 'All':
-                trained_any_query += " AND gender = %s"
-                trained_any_params.append(filters['gender'])
-            
-            if filters.get('bc_no'):
-                trained_any_query += " AND bc_no = %s"
-                trained_any_params.append(filters['bc_no'])
-            
-            with conn.cursor() as cursor:
-                cursor.execute(trained_any_query, trained_any_params)
-                for row in cursor.fetchall():
-                    trained_per_nos.add(row['per_no'])
-            
-            # Calculate EOR counts
-            eor_total = len(eor_employees)
-            eor_male = sum(1 for gender in eor_employees.values() if gender == 'Male')
-            eor_female = sum(1 for gender in eor_employees.values() if gender == 'Female')
-            
-            # Calculate pending learners (EOR employees who haven't attended any training)
-            pending_employees = {per_no: gender for per_no, gender in eor_employees.items() 
-                                if per_no not in trained_per_nos}
-            
-            pending_total = len(pending_employees)
-            pending_male = sum(1 for gender in pending_employees.values() if gender == 'Male')
-            pending_female = sum(1 for gender in pending_employees.values() if gender == 'Female')
+            key = factory_key(factory)
+            trained_counts = trained.get(key, empty_counts())
+            eor_counts = eor.get(key, empty_counts())
+            pending_counts = pending.get(key, empty_counts())
             
             # Calculate EOR YTD target for this factory
-            eor_ytd_target = (eor_total / 10) * month_index
+            eor_ytd_target = (eor_counts['total'] / 10) * month_index
             
             results.append({
                 'factory': factory,
-                'trained_total': trained_total,
-                'trained_male': trained_male,
-                'trained_female': trained_female,
-                'eor_total': eor_total,
-                'eor_male': eor_male,
-                'eor_female': eor_female,
-                'pending_total': pending_total,
-                'pending_male': pending_male,
-                'pending_female': pending_female,
+                'trained_total': trained_counts['total'],
+                'trained_male': trained_counts['male'],
+                'trained_female': trained_counts['female'],
+                'eor_total': eor_counts['total'],
+                'eor_male': eor_counts['male'],
+                'eor_female': eor_counts['female'],
+                'pending_total': pending_counts['total'],
+                'pending_male': pending_counts['male'],
+                'pending_female': pending_counts['female'],
                 'eor_ytd_target': int(eor_ytd_target)
             })
         